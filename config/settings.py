@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,13 +47,19 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "core.authentication.TokenCacheAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.JSONRapidoRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.CursorPaginacao",
+    "EXCEPTION_HANDLER": "core.exceptions.exception_handler",
 }
 
 SPECTACULAR_SETTINGS = {
@@ -62,6 +69,10 @@ SPECTACULAR_SETTINGS = {
         "### Autenticação\n"
         "- Token: `POST /api/auth/token/`\n"
         "- Envie o header: `Authorization: Token <seu_token>`\n\n"
+        "### Endpoints assíncronos (fora deste schema)\n"
+        "- `GET /api/entregas/{codigo_rastreio}/rastreamento/`\n"
+        "- `GET /api/rotas/{id}/dashboard/`\n"
+        "- `GET /api/rotas/{id}/eventos/` (SSE, exige servidor ASGI)\n\n"
         "### Documentação\n"
         "- Swagger: `/api/docs/`\n"
         "- Redoc: `/api/docs/redoc/`\n"
@@ -69,6 +80,13 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
     "COMPONENT_SPLIT_REQUEST": True,
+    # Campos "status"/"tipo" de modelos diferentes aparecem juntos nos serializers de
+    # parâmetros; nomes fixos evitam enums gerados com sufixo de hash.
+    "ENUM_NAME_OVERRIDES": {
+        "EntregaStatusEnum": "core.models.Entrega.STATUS_CHOICES",
+        "VeiculoStatusEnum": "core.models.Veiculo.STATUS_VEICULOS",
+        "VeiculoTipoEnum": "core.models.Veiculo.TIPO_VEICULOS",
+    },
     "SWAGGER_UI_SETTINGS": {
         "persistAuthorization": True,
         "displayRequestDuration": True,
@@ -76,6 +94,8 @@ SPECTACULAR_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    "core.middleware.InstrumentacaoSQLMiddleware",
+    "core.middleware.ReplicaLeituraMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -85,6 +105,27 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Instrumentação de SQL por requisição (core.middleware.InstrumentacaoSQLMiddleware).
+# Contagem e tempo são baratos e valem para todas as requisições; a análise de
+# consultas repetidas (N+1) só roda na fração AMOSTRAGEM.
+INSTRUMENTACAO_SQL = {
+    "HABILITADA": True,
+    "AMOSTRAGEM": 1.0 if DEBUG else 0.05,
+    "LIMITE_REPETICOES": 5,
+    "SERVER_TIMING": True,
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.sql": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+    },
+}
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -103,18 +144,126 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+# Perfil escolhido por variáveis de ambiente: DB_ENGINE=sqlite (padrão) ou postgresql.
+# Os valores padrão servem ao desenvolvimento local; veja "Banco de Dados" no README.
+
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+
+# SQLite: os PRAGMAs abaixo são aplicados a cada conexão nova (core.signals). WAL deixa
+# leituras e a escrita acontecerem ao mesmo tempo e, com busy_timeout, quem escreve
+# espera o lock em vez de falhar com "database is locked". DB_SQLITE_OTIMIZADO=0 volta
+# ao comportamento padrão do SQLite (útil para comparar no benchmark_escrita).
+SQLITE_OTIMIZADO = os.environ.get("DB_SQLITE_OTIMIZADO", "1") == "1"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.environ.get("DB_SQLITE_BUSY_TIMEOUT", 5000)),
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negativo: em KiB (64 MiB)
 }
 
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DB_NAME", "gestao_logistica"),
+            "USER": os.environ.get("DB_USER", "postgres"),
+            "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+            "HOST": os.environ.get("DB_HOST", "localhost"),
+            "PORT": os.environ.get("DB_PORT", "5432"),
+            # Conexões persistentes por worker, descartadas se o servidor as derrubar.
+            "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
+    }
+    if os.environ.get("DB_POOL", "0") == "1":
+        # Pool do psycopg 3 (pip install "psycopg[pool]"); substitui o CONN_MAX_AGE.
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DB_POOL_MIN", 2)),
+            "max_size": int(os.environ.get("DB_POOL_MAX", 10)),
+            "timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+            "OPTIONS": {
+                # BEGIN IMMEDIATE: a transação pega o lock de escrita logo no início,
+                # quando ainda pode esperar o busy_timeout. Com o padrão (DEFERRED), a
+                # promoção de leitura para escrita no meio da transação falha na hora.
+                "transaction_mode": "IMMEDIATE" if SQLITE_OTIMIZADO else "DEFERRED",
+            },
+        }
+    }
+
+# Réplica de leitura (opcional): com DB_REPLICA_NAME e/ou DB_REPLICA_HOST, os GETs vão
+# para o alias "replica" (core.roteamento.RoteadorReplica), exceto nas views marcadas
+# como somente primário e para quem escreveu há menos de REPLICA_JANELA_CONSISTENCIA
+# segundos. Localmente, a réplica pode ser um segundo arquivo SQLite atualizado pelo
+# comando sincronizar_replica.
+REPLICA_BANCO = "replica"
+REPLICA_JANELA_CONSISTENCIA = int(os.environ.get("DB_REPLICA_JANELA", 5))
+
+if os.environ.get("DB_REPLICA_NAME") or os.environ.get("DB_REPLICA_HOST"):
+    DATABASES[REPLICA_BANCO] = {
+        **DATABASES["default"],
+        "NAME": os.environ.get("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "HOST": os.environ.get("DB_REPLICA_HOST", DATABASES["default"].get("HOST", "")),
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        # Nos testes, a réplica aponta para o banco de teste do primário.
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["core.roteamento.RoteadorReplica"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# O cache local é por processo; em produção com vários workers defina CACHE_REDIS_URL
+# (pip install redis) para que as invalidações, as versões de token e as marcas de
+# escrita recente da réplica valham para todos.
+
+if os.environ.get("CACHE_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["CACHE_REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "gestao-logistica",
+        }
+    }
+
+DASHBOARD_ROTA_CACHE_TIMEOUT = 300
+
+RASTREAMENTO_CACHE_TIMEOUT = 300
+
+# Stream SSE de /api/rotas/{id}/eventos/: segundos entre os pings, quando o stream
+# também busca no banco as alterações feitas por outros processos.
+EVENTOS_SSE_INTERVALO = 15
+
+# Cache de autenticação por token (core.authentication.TokenCacheAuthentication).
+# O LRU é local ao processo; cada acerto é conferido contra a versão do token no cache
+# acima, que as invalidações apagam. Com vários workers, CACHES precisa ser um cache
+# compartilhado (Redis, Memcached) para a invalidação chegar a todos. Com
+# TOKEN_AUTH_CACHE_COMPARTILHADO = True os workers também reaproveitam a mesma entrada.
+TOKEN_AUTH_CACHE_TIMEOUT = 60
+TOKEN_AUTH_CACHE_MAXSIZE = 10_000
+TOKEN_AUTH_CACHE_COMPARTILHADO = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
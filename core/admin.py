@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Cliente, Motorista, Rota, Veiculo, Entrega
+from .busca import busca_disponivel, filtrar_busca
+from .models import Cliente, Motorista, Rota, Veiculo, Entrega, EntregaEvento
 
 try:
     from django.contrib.admin.sites import AlreadyRegistered
@@ -56,11 +57,17 @@ class VeiculoAdmin(admin.ModelAdmin):
 @admin.register(Rota)
 class RotaAdmin(admin.ModelAdmin):
     list_display = ("id", "nome", "status", "motorista", "veiculo", "data_rota")
-    search_fields = ("nome", "descricao", "motorista__nome", "motorista__cpf", "veiculo__placa")
+    search_fields = (
+        "nome",
+        "descricao",
+        "motorista__nome",
+        "motorista__cpf",
+        "veiculo__placa",
+    )
     list_filter = ("status", "data_rota")
     ordering = ("-data_rota", "id")
     date_hierarchy = "data_rota"
-    readonly_fields = ("data_rota",)
+    readonly_fields = ("data_rota", "capacidade_utilizada")
     autocomplete_fields = ("motorista", "veiculo")
     list_select_related = ("motorista", "veiculo")
 
@@ -90,9 +97,43 @@ class EntregaAdmin(admin.ModelAdmin):
         "endereco_origem",
         "endereco_destino",
     )
-    list_filter = ("status", "data_solicitacao", "data_entrega_prevista", "data_entrega_real")
+    list_filter = (
+        "status",
+        "data_solicitacao",
+        "data_entrega_prevista",
+        "data_entrega_real",
+    )
     ordering = ("-data_solicitacao", "id")
     date_hierarchy = "data_solicitacao"
     readonly_fields = ("data_solicitacao",)
     autocomplete_fields = ("cliente", "motorista", "rota")
     list_select_related = ("cliente", "motorista", "rota")
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Com o índice FTS5 disponível, a busca usa o índice (código, endereços e nome do
+        cliente) em vez do LIKE '%...%' sobre todos os search_fields.
+        """
+        if search_term and busca_disponivel(queryset.db):
+            return filtrar_busca(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(EntregaEvento)
+class EntregaEventoAdmin(admin.ModelAdmin):
+    """Log append-only: só consulta."""
+
+    list_display = ("id", "codigo_rastreio", "tipo", "usuario", "criado_em")
+    search_fields = ("codigo_rastreio",)
+    list_filter = ("tipo", "criado_em")
+    ordering = ("-id",)
+    list_select_related = ("usuario",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,54 @@
+import copy
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+
+from .cache import obter_token_autenticado, salvar_token_autenticado, versao_token
+from .perfil import RELACOES_PERFIL
+
+
+class TokenPerfilAuthentication(authentication.TokenAuthentication):
+    """
+    TokenAuthentication que já traz o usuário e seus perfis (motorista/cliente)
+    na mesma consulta do token.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        relacoes = ["user"] + [f"user__{nome}" for nome in RELACOES_PERFIL]
+
+        try:
+            token = model.objects.select_related(*relacoes).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        return (token.user, token)
+
+
+class TokenCacheAuthentication(TokenPerfilAuthentication):
+    """
+    Igual à TokenPerfilAuthentication, mas guarda o resultado num LRU com TTL
+    (TOKEN_AUTH_CACHE_*), eliminando a consulta do token nas requisições seguintes.
+
+    Cada acerto no LRU é conferido contra a versão do token no cache compartilhado,
+    que os signals de Token, User, Motorista e Cliente apagam; assim a invalidação vale
+    para todos os workers que usam o mesmo CACHES. Alterações que não disparam signals
+    (QuerySet.update, SQL direto) devem chamar signals.invalidar_tokens_do_usuario,
+    ou só valem quando a entrada expirar (TOKEN_AUTH_CACHE_TIMEOUT).
+    """
+
+    def authenticate_credentials(self, key):
+        item = obter_token_autenticado(key)
+        if item is None:
+            # A versão é lida antes da consulta: uma invalidação no meio do caminho
+            # apaga essa versão e a entrada gravada abaixo já nasce sem valer.
+            versao = versao_token(key, criar=True)
+            item = super().authenticate_credentials(key)
+            salvar_token_autenticado(key, versao, item)
+
+        user, token = item
+        # Cada requisição recebe sua própria cópia para não compartilhar estado entre threads.
+        return (copy.copy(user), token)
@@ -0,0 +1,105 @@
+from functools import reduce
+from operator import and_
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Tabela FTS5 criada pela migração 0006_busca_entregas (só existe no SQLite).
+TABELA = "core_entrega_busca"
+# Pesos do bm25 por coluna: codigo_rastreio, endereco_origem, endereco_destino, cliente_nome.
+PESOS = (10.0, 1.0, 2.0, 3.0)
+MAX_RESULTADOS = 1000
+
+CAMPOS_FALLBACK = (
+    "codigo_rastreio",
+    "endereco_origem",
+    "endereco_destino",
+    "cliente__nome",
+)
+
+_disponivel = {}
+
+
+def busca_disponivel(using="default"):
+    """Indica se o banco tem o índice FTS5 (consultado uma vez por banco)."""
+    connection = connections[using]
+    chave = (using, connection.settings_dict["NAME"])
+    if chave not in _disponivel:
+        _disponivel[chave] = (
+            connection.vendor == "sqlite"
+            and TABELA in connection.introspection.table_names()
+        )
+    return _disponivel[chave]
+
+
+def expressao_fts(texto):
+    """
+    Converte o texto digitado numa consulta FTS5: cada termo vira um prefixo entre
+    aspas ("rua"* "sao"*), então operadores e pontuação do usuário não são interpretados.
+    """
+    termos = [termo.replace('"', '""') for termo in texto.split()]
+    return " ".join(f'"{termo}"*' for termo in termos if termo)
+
+
+def _filtro_fallback(texto):
+    """Mesma busca com icontains, para bancos sem FTS5 (varre a tabela)."""
+    return reduce(
+        and_,
+        (
+            reduce(
+                Q.__or__,
+                (Q(**{f"{campo}__icontains": termo}) for campo in CAMPOS_FALLBACK),
+            )
+            for termo in texto.split()
+        ),
+    )
+
+
+def filtrar_busca(queryset, texto):
+    """Restringe o queryset de entregas às que casam com `texto`, sem ranquear."""
+    expressao = expressao_fts(texto)
+    if not expressao:
+        return queryset
+    if not busca_disponivel(queryset.db):
+        return queryset.filter(_filtro_fallback(texto))
+
+    return queryset.filter(
+        id__in=RawSQL(
+            f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s", (expressao,)
+        )
+    )
+
+
+def buscar_ids(queryset, texto, limite=MAX_RESULTADOS):
+    """
+    Ids das entregas do queryset que casam com `texto`, da mais relevante para a menos
+    relevante (bm25), limitados a `limite`. O queryset entra como subconsulta, então o
+    escopo do perfil é aplicado antes do corte.
+    """
+    expressao = expressao_fts(texto)
+    if not expressao:
+        return []
+
+    if not busca_disponivel(queryset.db):
+        return list(
+            queryset.filter(_filtro_fallback(texto))
+            .order_by("-data_solicitacao", "-id")
+            .values_list("id", flat=True)[:limite]
+        )
+
+    sql = f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s"
+    params = [expressao]
+    if queryset.query.where:
+        subconsulta, subparams = (
+            queryset.order_by().values("id").query.sql_with_params()
+        )
+        sql += f" AND rowid IN ({subconsulta})"
+        params.extend(subparams)
+    pesos = ", ".join(str(peso) for peso in PESOS)
+    sql += f" ORDER BY bm25({TABELA}, {pesos}), rowid DESC LIMIT %s"
+    params.append(limite)
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [rowid for (rowid,) in cursor.fetchall()]
@@ -0,0 +1,179 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+DASHBOARD_ROTA_TIMEOUT = getattr(settings, "DASHBOARD_ROTA_CACHE_TIMEOUT", 300)
+
+RASTREAMENTO_TIMEOUT = getattr(settings, "RASTREAMENTO_CACHE_TIMEOUT", 300)
+
+TOKEN_AUTH_TIMEOUT = getattr(settings, "TOKEN_AUTH_CACHE_TIMEOUT", 60)
+TOKEN_AUTH_MAXSIZE = getattr(settings, "TOKEN_AUTH_CACHE_MAXSIZE", 10_000)
+TOKEN_AUTH_COMPARTILHADO = getattr(settings, "TOKEN_AUTH_CACHE_COMPARTILHADO", False)
+
+REPLICA_JANELA_CONSISTENCIA = getattr(settings, "REPLICA_JANELA_CONSISTENCIA", 5)
+
+
+class CacheLRU:
+    """Cache em memória do processo, limitado em tamanho (LRU) e com expiração (TTL)."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+
+            expira_em, valor = item
+            if expira_em <= time.monotonic():
+                del self._dados[chave]
+                return None
+
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + self.timeout, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def delete(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+
+tokens_autenticados = CacheLRU(TOKEN_AUTH_MAXSIZE, TOKEN_AUTH_TIMEOUT)
+
+
+def chave_dashboard_rota(rota_id):
+    return f"rota:{rota_id}:dashboard"
+
+
+async def aobter_dashboard_rota(rota_id):
+    return await cache.aget(chave_dashboard_rota(rota_id))
+
+
+async def asalvar_dashboard_rota(rota_id, data, timeout=None):
+    await cache.aset(
+        chave_dashboard_rota(rota_id), data, timeout or DASHBOARD_ROTA_TIMEOUT
+    )
+
+
+def invalidar_dashboard_rota(*rota_ids):
+    """Remove do cache o dashboard das rotas informadas (ids nulos são ignorados)."""
+    chaves = [chave_dashboard_rota(rota_id) for rota_id in set(rota_ids) if rota_id]
+    if chaves:
+        cache.delete_many(chaves)
+
+
+def chave_rastreamento(codigo_rastreio, audiencia, versao):
+    # A versão faz parte da chave: qualquer alteração na entrega gera uma chave nova,
+    # então não é preciso invalidar nada (as versões antigas expiram sozinhas).
+    return f"entrega:{codigo_rastreio}:rastreamento:{audiencia}:{versao}"
+
+
+async def aobter_rastreamento(codigo_rastreio, audiencia, versao):
+    return await cache.aget(chave_rastreamento(codigo_rastreio, audiencia, versao))
+
+
+async def asalvar_rastreamento(codigo_rastreio, audiencia, versao, data):
+    await cache.aset(
+        chave_rastreamento(codigo_rastreio, audiencia, versao),
+        data,
+        RASTREAMENTO_TIMEOUT,
+    )
+
+
+def chave_token_autenticado(key):
+    return f"auth:token:{key}"
+
+
+def chave_versao_token(key):
+    return f"auth:token:{key}:versao"
+
+
+def versao_token(key, criar=False):
+    """
+    Versão atual do token no cache compartilhado (None se não houver). A invalidação
+    apaga a versão, então uma entrada do LRU de qualquer processo, gravada com a versão
+    anterior, deixa de valer já na próxima requisição.
+    """
+    chave = chave_versao_token(key)
+    versao = cache.get(chave)
+    if versao is None and criar:
+        cache.add(chave, uuid.uuid4().hex, None)
+        versao = cache.get(chave)
+    return versao
+
+
+def obter_token_autenticado(key):
+    """
+    Retorna (user, token) já autenticados, consultando primeiro o LRU do processo e,
+    se habilitado, o cache compartilhado do Django. Uma entrada só é aceita se foi
+    gravada com a versão atual do token (ver versao_token).
+    """
+    versao = versao_token(key)
+    if versao is None:
+        return None
+
+    entrada = tokens_autenticados.get(key)
+    if entrada is None and TOKEN_AUTH_COMPARTILHADO:
+        entrada = cache.get(chave_token_autenticado(key))
+        if entrada is not None:
+            tokens_autenticados.set(key, entrada)
+
+    if entrada is None or entrada[0] != versao:
+        return None
+    return entrada[1]
+
+
+def salvar_token_autenticado(key, versao, item):
+    """Guarda o item com a versão lida (versao_token) antes da consulta ao banco."""
+    if versao is None:
+        return
+    entrada = (versao, item)
+    tokens_autenticados.set(key, entrada)
+    if TOKEN_AUTH_COMPARTILHADO:
+        cache.set(chave_token_autenticado(key), entrada, TOKEN_AUTH_TIMEOUT)
+
+
+def invalidar_token_autenticado(*keys):
+    if not keys:
+        return
+    for key in keys:
+        tokens_autenticados.delete(key)
+    chaves = [chave_versao_token(key) for key in keys]
+    if TOKEN_AUTH_COMPARTILHADO:
+        chaves += [chave_token_autenticado(key) for key in keys]
+    cache.delete_many(chaves)
+
+
+def chave_escrita_recente(cliente):
+    return f"replica:escrita:{cliente}"
+
+
+def marcar_escrita_recente(cliente):
+    """O cliente lê do primário até a janela de consistência expirar."""
+    cache.set(chave_escrita_recente(cliente), True, REPLICA_JANELA_CONSISTENCIA)
+
+
+async def amarcar_escrita_recente(cliente):
+    await cache.aset(chave_escrita_recente(cliente), True, REPLICA_JANELA_CONSISTENCIA)
+
+
+def escrita_recente(cliente):
+    return cache.get(chave_escrita_recente(cliente)) is not None
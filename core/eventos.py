@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .exportacao import formatar_valor
+
+# Segundos entre os "pings" do stream SSE; a cada ping o stream também consulta o banco
+# atrás de alterações que não passaram por este processo.
+INTERVALO_SINCRONIZACAO = getattr(settings, "EVENTOS_SSE_INTERVALO", 15)
+TAMANHO_FILA = 256
+
+
+class CanalEventos:
+    """
+    Pub/sub em memória entre o código síncrono (signals, views DRF) e as conexões SSE.
+
+    Cada conexão registra uma asyncio.Queue junto com o loop em que ela vive; a
+    publicação usa call_soon_threadsafe, então pode vir de qualquer thread. Vale só
+    para o processo atual: alterações feitas em outros processos chegam pela
+    sincronização periódica do stream.
+    """
+
+    def __init__(self):
+        self._assinantes = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def assinar(self, chave):
+        assinatura = (asyncio.get_running_loop(), asyncio.Queue(TAMANHO_FILA))
+        with self._lock:
+            self._assinantes[chave].add(assinatura)
+        return assinatura
+
+    def cancelar(self, chave, assinatura):
+        with self._lock:
+            self._assinantes[chave].discard(assinatura)
+            if not self._assinantes[chave]:
+                del self._assinantes[chave]
+
+    def publicar(self, chave, evento):
+        with self._lock:
+            assinaturas = list(self._assinantes.get(chave, ()))
+
+        for loop, fila in assinaturas:
+            try:
+                loop.call_soon_threadsafe(_enfileirar, fila, evento)
+            except RuntimeError:
+                # Loop já encerrado; a conexão será removida pelo próprio stream.
+                pass
+
+
+def _enfileirar(fila, evento):
+    try:
+        fila.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Cliente lento: o evento se perde aqui, mas a sincronização periódica o recupera.
+        pass
+
+
+canal_rotas = CanalEventos()
+
+
+def evento_entrega(entrega):
+    """Dados publicados a cada alteração de entrega (os mesmos da sincronização)."""
+    return {
+        "codigo": entrega["codigo_rastreio"],
+        "status": entrega["status"],
+        "rota": entrega["rota_id"],
+        "sequencia": entrega["sequencia"],
+        "atualizado_em": entrega["atualizado_em"],
+    }
+
+
+def publicar_entrega(entrega, *rota_ids):
+    """Publica a alteração da entrega nos streams das rotas informadas, após o commit."""
+    evento = evento_entrega(
+        {
+            "codigo_rastreio": entrega.codigo_rastreio,
+            "status": entrega.status,
+            "rota_id": entrega.rota_id,
+            "sequencia": entrega.sequencia,
+            "atualizado_em": entrega.atualizado_em,
+        }
+    )
+    rotas = {rota_id for rota_id in rota_ids if rota_id}
+
+    def publicar():
+        for rota_id in rotas:
+            canal_rotas.publicar(rota_id, evento)
+
+    transaction.on_commit(publicar)
+
+
+def formatar_sse(evento, nome="entrega", identificador=None):
+    """
+    Mensagem no formato text/event-stream. O id (o do último EntregaEvento incluído) é
+    o cursor que o navegador devolve em Last-Event-ID ao reconectar; mensagens sem id
+    mantêm o cursor anterior.
+    """
+    dados = {chave: formatar_valor(valor) for chave, valor in evento.items()}
+    linha_id = f"id: {identificador}\n" if identificador is not None else ""
+    return f"{linha_id}event: {nome}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
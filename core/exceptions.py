@@ -0,0 +1,15 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def exception_handler(exc, context):
+    """
+    Converte ValidationError do Django (ex.: regras aplicadas no save dos models,
+    como CapacidadeExcedida) em resposta 400, igual às validações dos serializers.
+    """
+    if isinstance(exc, DjangoValidationError):
+        exc = ValidationError(detail=as_serializer_error(exc))
+
+    return drf_exception_handler(exc, context)
@@ -0,0 +1,57 @@
+import csv
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+import orjson
+
+CHUNK_SIZE = 2000
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def formatar_valor(valor):
+    """Converte o valor do banco para a mesma representação usada pelos serializers."""
+    if isinstance(valor, datetime):
+        texto = valor.isoformat()
+        return texto[:-6] + "Z" if texto.endswith("+00:00") else texto
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def lotes(linhas, tamanho=CHUNK_SIZE):
+    linhas = iter(linhas)
+    while lote := list(islice(linhas, tamanho)):
+        yield lote
+
+
+def gerar_csv(leitura, linhas):
+    """CSV com os campos da LeituraRapida, um pedaço da resposta por lote de linhas."""
+    writer = csv.writer(_Eco())
+    yield writer.writerow(leitura.nomes)
+    for lote in lotes(linhas):
+        yield "".join(
+            writer.writerow(["" if valor is None else valor for valor in valores])
+            for valores in leitura.valores(lote)
+        )
+
+
+def gerar_ndjson(leitura, linhas):
+    for lote in lotes(linhas):
+        yield b"".join(
+            orjson.dumps(registro) + b"\n" for registro in leitura.registros(lote)
+        )
+
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", gerar_csv),
+    "ndjson": ("application/x-ndjson; charset=utf-8", gerar_ndjson),
+}
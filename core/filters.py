@@ -0,0 +1,162 @@
+from django.core.exceptions import FieldDoesNotExist
+from django_filters import rest_framework as filters
+from django_filters.fields import DateRangeField
+from django_filters.widgets import DateRangeWidget
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Entrega, Rota, Veiculo
+from .serializers import PARAMETRO_CAMPOS, PARAMETRO_OMITIR
+
+
+class IntervaloDatasWidget(DateRangeWidget):
+    suffixes = ["de", "ate"]
+
+
+class IntervaloDatasField(DateRangeField):
+    widget = IntervaloDatasWidget
+
+
+class IntervaloDatasFilter(filters.DateFromToRangeFilter):
+    """
+    Intervalo de dias inteiros em `?<campo>_de=AAAA-MM-DD&<campo>_ate=AAAA-MM-DD`
+    (ambos opcionais). Vira um `BETWEEN` no próprio campo datetime, então usa o índice.
+    """
+
+    field_class = IntervaloDatasField
+
+
+class EscolhaMultiplaFilter(filters.MultipleChoiceFilter):
+    """
+    `?status=a&status=b` vira um IN na própria coluna. Sem o DISTINCT padrão do
+    django-filter: o filtro não faz join, e o DISTINCT obrigaria o banco a deduplicar
+    (e ordenar) o resultado em memória em vez de seguir o índice.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("distinct", False)
+        super().__init__(*args, **kwargs)
+
+
+class EntregaFilter(filters.FilterSet):
+    status = EscolhaMultiplaFilter(choices=Entrega.STATUS_CHOICES)
+    cliente = filters.NumberFilter()
+    motorista = filters.NumberFilter()
+    rota = filters.NumberFilter()
+    data_solicitacao = IntervaloDatasFilter()
+    data_entrega_prevista = IntervaloDatasFilter()
+
+    class Meta:
+        model = Entrega
+        fields = [
+            "status",
+            "cliente",
+            "motorista",
+            "rota",
+            "data_solicitacao",
+            "data_entrega_prevista",
+        ]
+
+
+class RotaFilter(filters.FilterSet):
+    status = EscolhaMultiplaFilter(choices=Rota.STATUS_ROTA)
+    motorista = filters.NumberFilter()
+    veiculo = filters.NumberFilter()
+    data_rota = IntervaloDatasFilter()
+
+    class Meta:
+        model = Rota
+        fields = ["status", "motorista", "veiculo", "data_rota"]
+
+
+class VeiculoFilter(filters.FilterSet):
+    status = EscolhaMultiplaFilter(choices=Veiculo.STATUS_VEICULOS)
+    tipo = EscolhaMultiplaFilter(choices=Veiculo.TIPO_VEICULOS)
+    motorista = filters.NumberFilter()
+
+    class Meta:
+        model = Veiculo
+        fields = ["status", "tipo", "motorista"]
+
+
+def colunas_do_serializer(serializer, model):
+    """
+    Campos do model lidos pelo serializer, ou None se algum campo não corresponder a um
+    campo do model (propriedade, SerializerMethodField...) e puder depender de qualquer
+    coluna.
+    """
+    colunas = set()
+    for campo in serializer.fields.values():
+        if campo.source == "*" or "." in campo.source:
+            return None
+        try:
+            campo_model = model._meta.get_field(campo.source)
+        except FieldDoesNotExist:
+            return None
+        if campo_model.concrete:
+            colunas.add(campo_model.name)
+    return colunas
+
+
+def colunas_ordenacao(request, queryset, view):
+    """Colunas da própria tabela usadas na ordenação da listagem, incluindo a do cursor."""
+    ordenacao = list(queryset.query.order_by)
+    paginador = getattr(view, "paginator", None)
+    if getattr(view, "action", None) == "list" and hasattr(paginador, "get_ordering"):
+        ordenacao += paginador.get_ordering(request, queryset, view)
+
+    colunas = []
+    for campo in ordenacao:
+        if not isinstance(campo, str) or "__" in campo:
+            continue
+        campo = campo.lstrip("-")
+        if campo == "pk":
+            campo = queryset.model._meta.pk.name
+        if campo not in colunas:
+            colunas.append(campo)
+    return colunas
+
+
+class SelecaoCamposFilter(BaseFilterBackend):
+    """
+    Com ?fields=/?omit= (CamposSelecionaveisMixin), a listagem e o detalhe carregam
+    só as colunas dos campos pedidos (.only()): a consulta, os objetos e o JSON
+    encolhem juntos. Vão junto as colunas da ordenação (cursor) e as chaves
+    estrangeiras, que as permissões por objeto consultam. Os select_related saem: os
+    campos do serializer são colunas da própria tabela.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, "action", None) not in ("list", "retrieve") or not (
+            request.query_params.get(PARAMETRO_CAMPOS)
+            or request.query_params.get(PARAMETRO_OMITIR)
+        ):
+            return queryset
+
+        model = queryset.model
+        colunas = colunas_do_serializer(view.get_serializer(), model)
+        if colunas is None:
+            return queryset
+
+        colunas.update(
+            campo.name for campo in model._meta.concrete_fields if campo.many_to_one
+        )
+        colunas.update(colunas_ordenacao(request, queryset, view))
+        return queryset.select_related(None).only(*colunas)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": PARAMETRO_CAMPOS,
+                "required": False,
+                "in": "query",
+                "description": "Campos a incluir na resposta, separados por vírgula.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": PARAMETRO_OMITIR,
+                "required": False,
+                "in": "query",
+                "description": "Campos a remover da resposta, separados por vírgula.",
+                "schema": {"type": "string"},
+            },
+        ]
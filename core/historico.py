@@ -0,0 +1,100 @@
+from .models import Entrega, EntregaEvento
+from .serializers import CAMPOS_ENTREGA_CLIENTE
+
+BATCH_SIZE = 500
+
+# Campos cujas alterações entram no log; a chave é o nome usado pela API.
+CAMPOS_RASTREADOS = (
+    "status",
+    "rota",
+    "motorista",
+    "cliente",
+    "sequencia",
+    "endereco_origem",
+    "endereco_destino",
+    "capacidade_necessaria",
+    "valor_frete",
+    "data_entrega_prevista",
+    "data_entrega_real",
+    "observacoes",
+    "latitude",
+    "longitude",
+)
+
+_ATRIBUTOS = {
+    campo: Entrega._meta.get_field(campo).attname for campo in CAMPOS_RASTREADOS
+}
+
+
+def estado(entrega, campos=CAMPOS_RASTREADOS):
+    """Valores atuais dos campos rastreados; tire antes de alterar a entrega."""
+    return {campo: getattr(entrega, _ATRIBUTOS[campo]) for campo in campos}
+
+
+def evento_alteracao(entrega, antes, usuario=None):
+    """
+    Evento com a diferença entre `antes` (ver estado()) e a entrega agora, ou None se
+    nada mudou. Só compara os campos presentes em `antes`.
+    """
+    depois = estado(entrega, antes)
+    alteracoes = {
+        campo: [antes[campo], valor]
+        for campo, valor in depois.items()
+        if valor != antes[campo]
+    }
+    if not alteracoes:
+        return None
+
+    if "status" in alteracoes:
+        tipo = "status"
+    elif "rota" in alteracoes or "motorista" in alteracoes:
+        tipo = "atribuicao"
+    else:
+        tipo = "edicao"
+
+    motorista_anterior = alteracoes.get("motorista", [None])[0]
+    return _evento(
+        entrega,
+        tipo,
+        alteracoes,
+        usuario,
+        motorista_anterior=motorista_anterior,
+        visivel_cliente=not alteracoes.keys().isdisjoint(CAMPOS_ENTREGA_CLIENTE),
+    )
+
+
+def evento_criacao(entrega, usuario=None):
+    alteracoes = {
+        campo: [None, valor]
+        for campo, valor in estado(entrega).items()
+        if valor not in (None, "")
+    }
+    return _evento(entrega, "criada", alteracoes, usuario, visivel_cliente=True)
+
+
+def evento_remocao(entrega, usuario=None):
+    return _evento(entrega, "removida", {}, usuario, visivel_cliente=True)
+
+
+def _evento(entrega, tipo, alteracoes, usuario, motorista_anterior=None, **campos):
+    return EntregaEvento(
+        entrega_id=entrega.pk,
+        codigo_rastreio=entrega.codigo_rastreio,
+        tipo=tipo,
+        alteracoes=alteracoes,
+        cliente_id=entrega.cliente_id,
+        motorista_id=entrega.motorista_id,
+        motorista_anterior_id=motorista_anterior,
+        rota_id=entrega.rota_id,
+        rota_anterior_id=alteracoes.get("rota", [None])[0],
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+        **campos,
+    )
+
+
+def registrar_eventos(eventos):
+    """Grava os eventos (ignorando None) com bulk_create; chame na mesma transação da alteração."""
+    eventos = [evento for evento in eventos if evento is not None]
+    if eventos:
+        EntregaEvento.objects.bulk_create(eventos, batch_size=BATCH_SIZE)
+    return eventos
@@ -0,0 +1,430 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import connections, router, transaction
+from django.db.models import BigIntegerField, Count, F, Q, Sum
+from django.db.models.functions import Round, TruncDate
+from django.utils import timezone
+
+from .models import Entrega, IndicadorDiario, Rota
+
+BATCH_SIZE = 1000
+
+METRICAS = (
+    "solicitadas",
+    "canceladas",
+    "valor_frete_centavos",
+    "entregues",
+    "entregues_com_prazo",
+    "entregues_no_prazo",
+    "rotas",
+    "capacidade_centavos",
+    "carga_centavos",
+)
+
+# Estado de uma entrega/rota que entra nos indicadores (nomes de coluna, *_id).
+CAMPOS_ENTREGA = (
+    "status",
+    "cliente_id",
+    "motorista_id",
+    "rota_id",
+    "valor_frete",
+    "data_solicitacao",
+    "data_entrega_prevista",
+    "data_entrega_real",
+)
+CAMPOS_ROTA = ("data_rota", "motorista_id", "veiculo_id", "capacidade_utilizada")
+
+# Dimensão provisória: o veículo de uma entrega vem da rota e só é buscado para as
+# diferenças que sobram (ver _resolver_veiculos).
+_ROTA = "_rota"
+
+
+def _centavos(valor):
+    return int((Decimal(str(valor)) * 100).to_integral_value())
+
+
+def _dia(momento):
+    return timezone.localdate(momento) if momento is not None else None
+
+
+def estado_entrega(entrega):
+    return {campo: getattr(entrega, campo) for campo in CAMPOS_ENTREGA}
+
+
+def estado_original_entrega(entrega):
+    """Estado da entrega no banco antes do save (None se ainda não existia)."""
+    if entrega._state.adding or entrega.pk is None:
+        return None
+
+    originais = getattr(entrega, "_valores_originais", {})
+    if all(campo in originais for campo in CAMPOS_ENTREGA):
+        return {campo: originais[campo] for campo in CAMPOS_ENTREGA}
+    return Entrega.objects.filter(pk=entrega.pk).values(*CAMPOS_ENTREGA).first()
+
+
+def contribuicao_entrega(estado):
+    """{(dia, dimensao, referencia): {metrica: valor}} com que a entrega entra nos totais."""
+    if estado is None:
+        return {}
+
+    dimensoes = [("geral", 0), ("cliente", estado["cliente_id"])]
+    if estado["motorista_id"]:
+        dimensoes.append(("motorista", estado["motorista_id"]))
+    if estado["rota_id"]:
+        dimensoes.append((_ROTA, estado["rota_id"]))
+
+    metricas = defaultdict(dict)
+    dia_solicitacao = _dia(estado["data_solicitacao"])
+    if dia_solicitacao is not None:
+        metricas[dia_solicitacao]["solicitadas"] = 1
+        if estado["status"] == "cancelada":
+            metricas[dia_solicitacao]["canceladas"] = 1
+        else:
+            metricas[dia_solicitacao]["valor_frete_centavos"] = _centavos(
+                estado["valor_frete"]
+            )
+
+    real, prevista = estado["data_entrega_real"], estado["data_entrega_prevista"]
+    if estado["status"] == "entregue" and real is not None:
+        dia_entrega = metricas[_dia(real)]
+        dia_entrega["entregues"] = 1
+        if prevista is not None:
+            dia_entrega["entregues_com_prazo"] = 1
+            dia_entrega["entregues_no_prazo"] = int(real <= prevista)
+
+    return {
+        (dia, dimensao, referencia): valores
+        for dia, valores in metricas.items()
+        for dimensao, referencia in dimensoes
+    }
+
+
+def contribuicao_rota(estado):
+    if estado is None or estado["data_rota"] is None:
+        return {}
+
+    valores = {
+        "rotas": 1,
+        "capacidade_centavos": _centavos(estado["capacidade_maxima"]),
+        "carga_centavos": _centavos(estado["capacidade_utilizada"]),
+    }
+    dia = _dia(estado["data_rota"])
+    return {
+        (dia, "geral", 0): valores,
+        (dia, "motorista", estado["motorista_id"]): valores,
+        (dia, "veiculo", estado["veiculo_id"]): valores,
+    }
+
+
+def diferenca(antes, depois):
+    """Soma as contribuições de `depois` e subtrai as de `antes`, descartando zeros."""
+    total = defaultdict(lambda: defaultdict(int))
+    for contribuicoes, sinal in ((depois, 1), (antes, -1)):
+        for contribuicao in contribuicoes:
+            for chave, valores in contribuicao.items():
+                for metrica, valor in valores.items():
+                    total[chave][metrica] += sinal * valor
+
+    return {
+        chave: {metrica: valor for metrica, valor in valores.items() if valor}
+        for chave, valores in total.items()
+        if any(valores.values())
+    }
+
+
+def _resolver_veiculos(deltas, using):
+    rota_ids = {referencia for _, dimensao, referencia in deltas if dimensao == _ROTA}
+    if not rota_ids:
+        return deltas
+
+    veiculos = dict(
+        Rota.objects.using(using)
+        .filter(pk__in=rota_ids)
+        .values_list("id", "veiculo_id")
+    )
+    resolvidos = defaultdict(lambda: defaultdict(int))
+    for (dia, dimensao, referencia), valores in deltas.items():
+        if dimensao == _ROTA:
+            if referencia not in veiculos:
+                continue
+            dimensao, referencia = "veiculo", veiculos[referencia]
+        for metrica, valor in valores.items():
+            resolvidos[(dia, dimensao, referencia)][metrica] += valor
+    return resolvidos
+
+
+def aplicar(deltas, using=None):
+    """
+    Soma as diferenças às linhas de IndicadorDiario com um único executemany de
+    INSERT ... ON CONFLICT DO UPDATE (SQLite e PostgreSQL), sem ler as linhas antes.
+    """
+    using = using or router.db_for_write(IndicadorDiario)
+    deltas = _resolver_veiculos(deltas, using)
+    if not deltas:
+        return
+
+    tabela = IndicadorDiario._meta.db_table
+    colunas = ", ".join(("dia", "dimensao", "referencia", *METRICAS))
+    marcadores = ", ".join(["%s"] * (3 + len(METRICAS)))
+    incrementos = ", ".join(
+        f"{metrica} = {tabela}.{metrica} + excluded.{metrica}" for metrica in METRICAS
+    )
+    sql = (
+        f"INSERT INTO {tabela} ({colunas}) VALUES ({marcadores}) "
+        f"ON CONFLICT (dimensao, referencia, dia) DO UPDATE SET {incrementos}"
+    )
+    linhas = [
+        (dia, dimensao, referencia, *(valores.get(metrica, 0) for metrica in METRICAS))
+        for (dia, dimensao, referencia), valores in sorted(deltas.items())
+    ]
+
+    with connections[using].cursor() as cursor:
+        cursor.executemany(sql, linhas)
+
+
+def atualizar_entregas(alteracoes, using=None):
+    """Aplica [(estado antes, estado depois), ...]; None representa entrega inexistente."""
+    aplicar(
+        diferenca(
+            [contribuicao_entrega(antes) for antes, _ in alteracoes],
+            [contribuicao_entrega(depois) for _, depois in alteracoes],
+        ),
+        using,
+    )
+
+
+def atualizar_rotas(alteracoes, using=None):
+    """Como atualizar_entregas, com estados de rota que incluem "capacidade_maxima"."""
+    aplicar(
+        diferenca(
+            [contribuicao_rota(antes) for antes, _ in alteracoes],
+            [contribuicao_rota(depois) for _, depois in alteracoes],
+        ),
+        using,
+    )
+
+
+def estado_rota(rota):
+    return {
+        **{campo: getattr(rota, campo) for campo in CAMPOS_ROTA},
+        "capacidade_maxima": rota.veiculo.capacidade_maxima,
+    }
+
+
+def estado_rota_no_banco(rota_id, using=None):
+    return (
+        Rota.objects.using(using or router.db_for_write(Rota))
+        .filter(pk=rota_id)
+        .values(*CAMPOS_ROTA, capacidade_maxima=F("veiculo__capacidade_maxima"))
+        .first()
+    )
+
+
+def desvincular_entregas_da_rota(rota_id, using=None):
+    """
+    Antes de excluir a rota: as entregas dela ficam sem rota (SET_NULL, por UPDATE e sem
+    signals), então saem da dimensão veículo aqui.
+    """
+    estados = (
+        Entrega.objects.using(using or router.db_for_write(Entrega))
+        .filter(rota_id=rota_id)
+        .values(*CAMPOS_ENTREGA)
+    )
+    atualizar_entregas(
+        [(estado, {**estado, "rota_id": None}) for estado in estados], using
+    )
+
+
+def trocar_veiculo_da_rota(rota_id, veiculo_anterior, veiculo_novo, using=None):
+    """As entregas da rota passam a contar para o novo veículo."""
+    estados = (
+        Entrega.objects.using(using or router.db_for_write(Entrega))
+        .filter(rota_id=rota_id)
+        .values(*CAMPOS_ENTREGA)
+    )
+    deltas = defaultdict(lambda: defaultdict(int))
+    for estado in estados:
+        for (dia, dimensao, _), valores in contribuicao_entrega(estado).items():
+            if dimensao != _ROTA:
+                continue
+            for metrica, valor in valores.items():
+                deltas[(dia, "veiculo", veiculo_anterior)][metrica] -= valor
+                deltas[(dia, "veiculo", veiculo_novo)][metrica] += valor
+    aplicar(deltas, using)
+
+
+def ajustar_carga_rota(rota_id, quantidade, using=None):
+    """Acompanha as mudanças de Rota.capacidade_utilizada feitas por UPDATE direto."""
+    rota = estado_rota_no_banco(rota_id, using)
+    if rota is None:
+        return
+
+    carga = {"carga_centavos": _centavos(quantidade)}
+    dia = _dia(rota["data_rota"])
+    aplicar(
+        {
+            (dia, "geral", 0): carga,
+            (dia, "motorista", rota["motorista_id"]): carga,
+            (dia, "veiculo", rota["veiculo_id"]): carga,
+        },
+        using,
+    )
+
+
+def calcular_indicadores(apps=global_apps, using=None):
+    """
+    Recalcula todas as linhas com GROUP BY sobre Entrega e Rota (o caminho lento, para
+    backfill e conferência). Retorna {(dia, dimensao, referencia): {metrica: valor}}.
+    `apps` permite rodar com os models históricos de uma migração.
+    """
+    Entrega = apps.get_model("core", "Entrega")
+    Rota = apps.get_model("core", "Rota")
+    using = using or router.db_for_write(Entrega)
+    linhas = defaultdict(lambda: defaultdict(int))
+
+    def acumular(consulta, dimensao):
+        for linha in consulta:
+            chave = (linha.pop("dia"), dimensao, linha.pop("referencia") or 0)
+            for metrica, valor in linha.items():
+                linhas[chave][metrica] += int(valor or 0)
+
+    centavos_frete = Sum(
+        Round(F("valor_frete") * 100),
+        filter=~Q(status="cancelada"),
+        output_field=BigIntegerField(),
+    )
+    entregues = Entrega.objects.using(using).filter(
+        status="entregue", data_entrega_real__isnull=False
+    )
+    dimensoes_entrega = {
+        "geral": None,
+        "cliente": "cliente_id",
+        "motorista": "motorista_id",
+        "veiculo": "rota__veiculo_id",
+    }
+    for dimensao, campo in dimensoes_entrega.items():
+        referencia = F(campo) if campo else None
+        filtro = {f"{campo}__isnull": False} if campo else {}
+
+        acumular(
+            _agrupar(
+                Entrega.objects.using(using).filter(**filtro),
+                "data_solicitacao",
+                referencia,
+                solicitadas=Count("id"),
+                canceladas=Count("id", filter=Q(status="cancelada")),
+                valor_frete_centavos=centavos_frete,
+            ),
+            dimensao,
+        )
+        acumular(
+            _agrupar(
+                entregues.filter(**filtro),
+                "data_entrega_real",
+                referencia,
+                entregues=Count("id"),
+                entregues_com_prazo=Count(
+                    "id", filter=Q(data_entrega_prevista__isnull=False)
+                ),
+                entregues_no_prazo=Count(
+                    "id", filter=Q(data_entrega_real__lte=F("data_entrega_prevista"))
+                ),
+            ),
+            dimensao,
+        )
+
+    for dimensao, campo in (
+        ("geral", None),
+        ("motorista", "motorista_id"),
+        ("veiculo", "veiculo_id"),
+    ):
+        acumular(
+            _agrupar(
+                Rota.objects.using(using),
+                "data_rota",
+                F(campo) if campo else None,
+                rotas=Count("id"),
+                capacidade_centavos=Sum(
+                    Round(F("veiculo__capacidade_maxima") * 100),
+                    output_field=BigIntegerField(),
+                ),
+                carga_centavos=Sum(
+                    Round(F("capacidade_utilizada") * 100),
+                    output_field=BigIntegerField(),
+                ),
+            ),
+            dimensao,
+        )
+
+    return linhas
+
+
+def _agrupar(queryset, campo_data, referencia, **agregados):
+    agrupamento = {"dia": TruncDate(campo_data)}
+    if referencia is not None:
+        agrupamento["referencia"] = referencia
+    linhas = queryset.values(**agrupamento).annotate(**agregados).order_by()
+    if referencia is None:
+        return ({**linha, "referencia": 0} for linha in linhas)
+    return linhas
+
+
+def reconstruir_indicadores(apps=global_apps, using=None):
+    """
+    Apaga e regrava todos os indicadores a partir de Entrega e Rota.
+
+    O recálculo acontece dentro da transação que troca as linhas, com a tabela de
+    indicadores travada para escrita: um save concorrente espera a troca terminar e
+    aplica sua diferença sobre os totais novos, em vez de se perder entre o cálculo e
+    a gravação. No SQLite o DELETE já toma a trava de escrita do banco (ou o BEGIN
+    IMMEDIATE, no perfil otimizado); no PostgreSQL, LOCK TABLE em modo EXCLUSIVE, que
+    ainda deixa o /api/indicadores/ ler a versão anterior.
+    """
+    IndicadorDiario = apps.get_model("core", "IndicadorDiario")
+    using = using or router.db_for_write(IndicadorDiario)
+    connection = connections[using]
+
+    with transaction.atomic(using=using):
+        if connection.vendor == "postgresql":
+            tabela = connection.ops.quote_name(IndicadorDiario._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {tabela} IN EXCLUSIVE MODE")
+        IndicadorDiario.objects.using(using).all().delete()
+        linhas = calcular_indicadores(apps, using)
+        IndicadorDiario.objects.using(using).bulk_create(
+            (
+                IndicadorDiario(
+                    dia=dia, dimensao=dimensao, referencia=referencia, **valores
+                )
+                for (dia, dimensao, referencia), valores in linhas.items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    return len(linhas)
+
+
+def montar_indicador(linha, dimensao):
+    """Linha agregada (em centavos) no formato de IndicadorSerializer, com as taxas."""
+    com_prazo, capacidade = linha["entregues_com_prazo"], linha["capacidade_centavos"]
+    return {
+        "dia": linha.get("dia"),
+        "dimensao": dimensao,
+        "referencia": linha["referencia"],
+        "solicitadas": linha["solicitadas"],
+        "canceladas": linha["canceladas"],
+        "valor_frete": Decimal(linha["valor_frete_centavos"]) / 100,
+        "entregues": linha["entregues"],
+        "entregues_com_prazo": com_prazo,
+        "entregues_no_prazo": linha["entregues_no_prazo"],
+        "taxa_no_prazo": (
+            round(linha["entregues_no_prazo"] / com_prazo, 4) if com_prazo else None
+        ),
+        "rotas": linha["rotas"],
+        "capacidade": Decimal(capacidade) / 100,
+        "carga": Decimal(linha["carga_centavos"]) / 100,
+        "fator_carga": (
+            round(linha["carga_centavos"] / capacidade, 4) if capacidade else None
+        ),
+    }
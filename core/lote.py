@@ -0,0 +1,149 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from .cache import invalidar_dashboard_rota
+from .historico import evento_criacao, registrar_eventos
+from .indicadores import atualizar_entregas, estado_entrega
+from .models import CapacidadeExcedida, Cliente, Entrega, Motorista, Rota
+from .proximidade import geohash
+from .serializers import EntregaLoteItemSerializer
+
+BATCH_SIZE = 500
+MAX_ITENS = 5000
+
+
+def criar_entregas_em_lote(itens, ignorar_invalidas=False, usuario=None):
+    """
+    Valida e cria várias entregas de uma vez.
+
+    Cada linha passa pelo EntregaLoteItemSerializer; clientes, motoristas, rotas e
+    códigos já existentes são buscados com uma consulta por tipo para o lote todo, e a
+    capacidade é conferida com totais acumulados por rota (partindo de
+    Rota.capacidade_utilizada), sem um Sum() por linha.
+
+    Retorna (criadas, resultados), com um resultado por linha na ordem recebida.
+    """
+    resultados = [None] * len(itens)
+    validos = []
+
+    for indice, item in enumerate(itens):
+        serializer = EntregaLoteItemSerializer(data=item)
+        if serializer.is_valid():
+            validos.append((indice, serializer.validated_data))
+        else:
+            codigo = item.get("codigo_rastreio") if isinstance(item, dict) else None
+            resultados[indice] = _erro(indice, codigo, serializer.errors)
+
+    def ids(campo):
+        return {dados[campo] for _, dados in validos if dados.get(campo)}
+
+    clientes = set(
+        Cliente.objects.filter(id__in=ids("cliente")).values_list("id", flat=True)
+    )
+    motoristas = set(
+        Motorista.objects.filter(id__in=ids("motorista")).values_list("id", flat=True)
+    )
+    rotas = {
+        rota.id: rota
+        for rota in Rota.objects.select_related("veiculo").filter(id__in=ids("rota"))
+    }
+    codigos_existentes = set(
+        Entrega.objects.filter(
+            codigo_rastreio__in={dados["codigo_rastreio"] for _, dados in validos}
+        ).values_list("codigo_rastreio", flat=True)
+    )
+
+    carga_por_rota = {rota.id: rota.capacidade_utilizada for rota in rotas.values()}
+    carga_adicional = defaultdict(Decimal)
+    codigos_no_lote = set()
+    novas = []
+
+    for indice, dados in validos:
+        codigo = dados["codigo_rastreio"]
+        rota_id = dados.get("rota")
+        erros = {}
+
+        if codigo in codigos_existentes or codigo in codigos_no_lote:
+            erros["codigo_rastreio"] = ["Já existe uma entrega com este código."]
+        if dados["cliente"] not in clientes:
+            erros["cliente"] = ["Cliente não encontrado."]
+        if dados.get("motorista") and dados["motorista"] not in motoristas:
+            erros["motorista"] = ["Motorista não encontrado."]
+        if rota_id and rota_id not in rotas:
+            erros["rota"] = ["Rota não encontrada."]
+
+        carga = Decimal("0")
+        if not erros and rota_id and dados.get("status") != "cancelada":
+            carga = dados["capacidade_necessaria"]
+            capacidade_maxima = rotas[rota_id].veiculo.capacidade_maxima
+            if carga_por_rota[rota_id] + carga > capacidade_maxima:
+                erros["rota"] = [
+                    "Capacidade do veículo excedida para esta rota. "
+                    f"Capacidade máxima: {capacidade_maxima}. "
+                    f"Capacidade já utilizada: {carga_por_rota[rota_id]}. "
+                    f"Capacidade desta entrega: {carga}."
+                ]
+
+        if erros:
+            resultados[indice] = _erro(indice, codigo, erros)
+            continue
+
+        if carga:
+            carga_por_rota[rota_id] += carga
+            carga_adicional[rota_id] += carga
+        codigos_no_lote.add(codigo)
+
+        campos = {**dados}
+        for relacao in ("cliente", "rota", "motorista"):
+            campos[f"{relacao}_id"] = campos.pop(relacao, None)
+        campos["geohash"] = geohash(campos.get("latitude"), campos.get("longitude"))
+        novas.append((indice, Entrega(**campos)))
+
+    possui_erros = len(novas) < len(itens)
+    if possui_erros and not ignorar_invalidas:
+        for indice, entrega in novas:
+            resultados[indice] = {
+                "linha": indice + 1,
+                "codigo_rastreio": entrega.codigo_rastreio,
+                "situacao": "valida",
+            }
+        return 0, resultados
+
+    with transaction.atomic():
+        Entrega.objects.bulk_create(
+            [entrega for _, entrega in novas], batch_size=BATCH_SIZE
+        )
+        registrar_eventos(evento_criacao(entrega, usuario) for _, entrega in novas)
+        atualizar_entregas([(None, estado_entrega(entrega)) for _, entrega in novas])
+
+        # Reserva feita no banco com UPDATE condicional: se outra requisição ocupou a
+        # rota nesse meio-tempo, o lote inteiro é desfeito.
+        for rota_id, carga in carga_adicional.items():
+            if not Rota.reservar_capacidade(rota_id, carga):
+                raise CapacidadeExcedida(
+                    {"rota": f"Capacidade do veículo excedida na rota {rota_id}."}
+                )
+
+        transaction.on_commit(lambda: invalidar_dashboard_rota(*carga_adicional))
+
+    for indice, entrega in novas:
+        resultados[indice] = {
+            "linha": indice + 1,
+            "codigo_rastreio": entrega.codigo_rastreio,
+            "situacao": "criada",
+        }
+        if entrega.pk is not None:
+            resultados[indice]["id"] = entrega.pk
+
+    return len(novas), resultados
+
+
+def _erro(indice, codigo, erros):
+    return {
+        "linha": indice + 1,
+        "codigo_rastreio": codigo,
+        "situacao": "erro",
+        "erros": erros,
+    }
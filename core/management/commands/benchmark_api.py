@@ -0,0 +1,476 @@
+import io
+import json
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.cache import tokens_autenticados
+from core.management.commands.popular_banco import CENTRO
+from core.models import Entrega, Rota, Veiculo
+
+# Entregas da criação em lote: códigos fixos, porque cada requisição é desfeita.
+LOTE = [
+    {
+        "codigo_rastreio": f"BENCH{numero:05d}",
+        "cliente": "{cliente}",
+        "endereco_origem": "Origem",
+        "endereco_destino": "Destino",
+        "capacidade_necessaria": "1.00",
+        "valor_frete": "10.00",
+    }
+    for numero in range(50)
+]
+
+# (nome, método, caminho, corpo, papéis). Os caminhos usam os ids preparados em
+# preparar_contexto(). Ficam de fora o CRUD de criação/edição/exclusão e o stream
+# SSE de /api/rotas/{id}/eventos/ (ver FORA_DO_BENCHMARK).
+ROTAS = [
+    ("clientes-list", "get", "/api/clientes/", None, ["gestor"]),
+    ("clientes-detail", "get", "/api/clientes/{cliente}/", None, ["gestor", "cliente"]),
+    ("motoristas-list", "get", "/api/motoristas/", None, ["gestor"]),
+    (
+        "motoristas-detail",
+        "get",
+        "/api/motoristas/{motorista}/",
+        None,
+        ["gestor", "motorista"],
+    ),
+    (
+        "motoristas-entregas",
+        "get",
+        "/api/motoristas/{motorista}/entregas/",
+        None,
+        ["gestor", "motorista"],
+    ),
+    (
+        "motoristas-rotas",
+        "get",
+        "/api/motoristas/{motorista}/rotas/",
+        None,
+        ["gestor", "motorista"],
+    ),
+    (
+        "motoristas-atribuir-veiculo",
+        "post",
+        "/api/motoristas/{motorista}/atribuir-veiculo/",
+        {"veiculo": "{veiculo}"},
+        ["gestor"],
+    ),
+    ("veiculos-list", "get", "/api/veiculos/", None, ["gestor"]),
+    ("veiculos-detail", "get", "/api/veiculos/{veiculo}/", None, ["gestor"]),
+    ("veiculos-disponiveis", "get", "/api/veiculos/disponiveis/", None, ["gestor"]),
+    ("veiculos-rotas", "get", "/api/veiculos/{veiculo}/rotas/", None, ["gestor"]),
+    ("rotas-list", "get", "/api/rotas/", None, ["gestor", "motorista"]),
+    ("rotas-detail", "get", "/api/rotas/{rota}/", None, ["gestor", "motorista"]),
+    (
+        "rotas-dashboard",
+        "get",
+        "/api/rotas/{rota}/dashboard/",
+        None,
+        ["gestor", "motorista"],
+    ),
+    (
+        "rotas-atribuir-entregas",
+        "post",
+        "/api/rotas/{rota}/atribuir-entregas/",
+        {"entregas": ["{entrega}"]},
+        ["gestor"],
+    ),
+    (
+        "entregas-list",
+        "get",
+        "/api/entregas/",
+        None,
+        ["gestor", "motorista", "cliente"],
+    ),
+    (
+        "entregas-detail",
+        "get",
+        "/api/entregas/{entrega}/",
+        None,
+        ["gestor", "motorista", "cliente"],
+    ),
+    (
+        "entregas-rastreamento",
+        "get",
+        "/api/entregas/{entrega}/rastreamento/",
+        None,
+        ["gestor", "motorista", "cliente"],
+    ),
+    (
+        "entregas-exportar-csv",
+        "get",
+        "/api/entregas/exportar/?data_inicio={hoje}&data_fim={hoje}",
+        None,
+        ["gestor", "motorista", "cliente"],
+    ),
+    (
+        "entregas-exportar-ndjson",
+        "get",
+        "/api/entregas/exportar/?formato=ndjson&data_inicio={hoje}&data_fim={hoje}",
+        None,
+        ["gestor", "motorista", "cliente"],
+    ),
+    (
+        "entregas-buscar",
+        "get",
+        "/api/entregas/buscar/?q={entrega}",
+        None,
+        ["gestor", "motorista", "cliente"],
+    ),
+    (
+        "entregas-alteracoes",
+        "get",
+        "/api/entregas/alteracoes/?since=0",
+        None,
+        ["gestor", "motorista", "cliente"],
+    ),
+    (
+        "entregas-proximas",
+        "get",
+        "/api/entregas/proximas/?latitude={latitude}&longitude={longitude}&raio_km=10",
+        None,
+        ["gestor", "motorista"],
+    ),
+    (
+        "veiculos-proximos",
+        "get",
+        "/api/veiculos/proximos/?latitude={latitude}&longitude={longitude}&raio_km=50",
+        None,
+        ["gestor"],
+    ),
+    ("indicadores-list", "get", "/api/indicadores/", None, ["gestor"]),
+    (
+        "indicadores-periodo",
+        "get",
+        "/api/indicadores/?dimensao=motorista&agrupar=periodo",
+        None,
+        ["gestor"],
+    ),
+    (
+        "entregas-atribuir-motorista",
+        "patch",
+        "/api/entregas/{entrega}/atribuir_motorista/",
+        {"motorista_id": "{motorista}"},
+        ["gestor"],
+    ),
+    ("entregas-lote", "post", "/api/entregas/lote/", LOTE, ["gestor"]),
+    (
+        "entregas-marcar-entregue",
+        "patch",
+        "/api/entregas/{entrega_em_transito}/marcar_entregue/",
+        None,
+        ["gestor", "motorista"],
+    ),
+    ("rotas-planejar", "post", "/api/rotas/planejar/", {"simular": False}, ["gestor"]),
+    (
+        "rotas-otimizar",
+        "post",
+        "/api/rotas/{rota}/otimizar/",
+        {"origem_latitude": "{latitude}", "origem_longitude": "{longitude}"},
+        ["gestor"],
+    ),
+]
+
+# Rotas que gravam e não podem ser repetidas sobre o mesmo estado (códigos únicos,
+# entrega já entregue, veículos já alocados): cada requisição roda numa transação
+# desfeita ao fim, então todas as medições partem da mesma massa.
+DESFEITAS = frozenset(
+    ["entregas-lote", "entregas-marcar-entregue", "rotas-planejar", "rotas-otimizar"]
+)
+
+# Rotas da API que não entram no benchmark, pelo nome na URLconf.
+FORA_DO_BENCHMARK = {
+    # Stream SSE de duração indefinida (só responde sob ASGI; pelo APIClient dá 501):
+    # não tem tempo de resposta nem tamanho a medir. O custo da sincronização fica
+    # nos testes de core/tests/test_views_async.py.
+    "rota-eventos",
+    # Autenticação e documentação da API.
+    "api_token_auth",
+    "schema",
+    "swagger-ui",
+    "redoc",
+    "api-root",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera uma massa de dados num banco de teste isolado, chama cada rota da API como "
+        "gestor, motorista e cliente e grava p50/p95/p99, consultas SQL e bytes por rota "
+        "num JSON. Com --baseline, falha se algum resultado regredir além da tolerância."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entregas", type=int, default=2000)
+        parser.add_argument("--clientes", type=int, default=50)
+        parser.add_argument("--motoristas", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--requisicoes",
+            type=int,
+            default=30,
+            help="Requisições medidas por rota e papel.",
+        )
+        parser.add_argument("--saida", default="benchmark_api.json")
+        parser.add_argument(
+            "--baseline", help="JSON de uma execução anterior para comparação."
+        )
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=0.25,
+            help="Piora relativa aceita em latência (p95) e bytes (padrão 25%%).",
+        )
+        parser.add_argument(
+            "--folga-ms",
+            type=float,
+            default=5.0,
+            help="Piora absoluta de p95 ignorada, para não acusar ruído em rotas muito rápidas.",
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nome_original = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            self.popular(options)
+            contexto, clientes_api = self.preparar_contexto()
+            resultados = self.medir_rotas(
+                contexto, clientes_api, options["requisicoes"]
+            )
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+        relatorio = {
+            "meta": {
+                "data": timezone.now().isoformat(),
+                "banco": connection.vendor,
+                "entregas": options["entregas"],
+                "clientes": options["clientes"],
+                "motoristas": options["motoristas"],
+                "seed": options["seed"],
+                "requisicoes": options["requisicoes"],
+            },
+            "resultados": resultados,
+        }
+        Path(options["saida"]).write_text(
+            json.dumps(relatorio, indent=2, ensure_ascii=False)
+        )
+        self.imprimir(resultados)
+        self.stdout.write(f"\nResultados gravados em {options['saida']}.")
+
+        if options["baseline"]:
+            self.comparar(resultados, options)
+
+    def popular(self, options):
+        self.stdout.write(
+            f"Populando banco de teste com {options['entregas']} entregas..."
+        )
+        call_command(
+            "popular_banco",
+            clientes=options["clientes"],
+            motoristas=options["motoristas"],
+            entregas=options["entregas"],
+            seed=options["seed"],
+            stdout=io.StringIO(),
+        )
+
+    def preparar_contexto(self):
+        """Escolhe os registros mais carregados de cada perfil e cria um token por papel."""
+        rota = (
+            Rota.objects.annotate(total=Count("entregas"))
+            .order_by("-total", "id")
+            .first()
+        )
+        if rota is None:
+            raise CommandError("A massa gerada não tem rotas; aumente --motoristas.")
+
+        motorista = rota.motorista
+        entrega = Entrega.objects.filter(rota=rota).order_by("id").first()
+        em_transito = (
+            Entrega.objects.filter(rota=rota, status="em_transito")
+            .order_by("id")
+            .first()
+        )
+        if em_transito is None:
+            raise CommandError("A rota escolhida não tem entregas em trânsito.")
+        cliente = entrega.cliente
+        veiculo = Veiculo.objects.get(motorista=motorista)
+        gestor = User.objects.create_user(
+            "benchmark_gestor", password="x", is_staff=True
+        )
+
+        contexto = {
+            "cliente": cliente.id,
+            "motorista": motorista.id,
+            "veiculo": veiculo.id,
+            "rota": rota.id,
+            "entrega": entrega.codigo_rastreio,
+            "entrega_em_transito": em_transito.codigo_rastreio,
+            "latitude": CENTRO[0],
+            "longitude": CENTRO[1],
+            "hoje": timezone.localdate().isoformat(),
+        }
+
+        clientes_api = {}
+        for papel, user in (
+            ("gestor", gestor),
+            ("motorista", motorista.user),
+            ("cliente", cliente.user),
+        ):
+            client = APIClient()
+            client.credentials(
+                HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}"
+            )
+            clientes_api[papel] = client
+
+        return contexto, clientes_api
+
+    def medir_rotas(self, contexto, clientes_api, requisicoes):
+        cache.clear()
+        tokens_autenticados.clear()
+        resultados = {}
+
+        for nome, metodo, caminho, corpo, papeis in ROTAS:
+            caminho = caminho.format(**contexto)
+            corpo = preencher(corpo, contexto)
+            desfazer = nome in DESFEITAS
+
+            for papel in papeis:
+                client = clientes_api[papel]
+                # Aquecimento: popula caches e descarta o custo da primeira chamada.
+                self.requisitar(client, metodo, caminho, corpo, desfazer)
+
+                duracoes, consultas, tamanho, status_code = [], 0, 0, None
+                for _ in range(requisicoes):
+                    with CaptureQueriesContext(connection) as ctx:
+                        inicio = time.perf_counter()
+                        status_code, tamanho = self.requisitar(
+                            client, metodo, caminho, corpo, desfazer
+                        )
+                        duracoes.append((time.perf_counter() - inicio) * 1000)
+                    consultas = max(consultas, len(ctx.captured_queries))
+
+                if status_code >= 400:
+                    raise CommandError(
+                        f"{metodo.upper()} {caminho} como {papel} respondeu {status_code}."
+                    )
+
+                resultados[f"{nome}:{papel}"] = {
+                    "metodo": metodo.upper(),
+                    "caminho": caminho,
+                    "status": status_code,
+                    "p50_ms": round(percentil(duracoes, 50), 3),
+                    "p95_ms": round(percentil(duracoes, 95), 3),
+                    "p99_ms": round(percentil(duracoes, 99), 3),
+                    "consultas": consultas,
+                    "bytes": tamanho,
+                }
+
+        return resultados
+
+    @staticmethod
+    def requisitar(client, metodo, caminho, corpo, desfazer=False):
+        with transaction.atomic() if desfazer else nullcontext():
+            if corpo is None:
+                response = getattr(client, metodo)(caminho)
+            else:
+                response = getattr(client, metodo)(caminho, corpo, format="json")
+
+            if response.streaming:
+                tamanho = sum(len(parte) for parte in response.streaming_content)
+            else:
+                tamanho = len(response.content)
+            if desfazer:
+                transaction.set_rollback(True)
+        return response.status_code, tamanho
+
+    def imprimir(self, resultados):
+        self.stdout.write(
+            f"\n{'Rota:papel':<45}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL':>6}{'bytes':>10}"
+        )
+        for chave, r in resultados.items():
+            self.stdout.write(
+                f"{chave:<45}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                f"{r['consultas']:>6}{r['bytes']:>10}"
+            )
+
+    def comparar(self, resultados, options):
+        baseline = json.loads(Path(options["baseline"]).read_text())["resultados"]
+        tolerancia = options["tolerancia"]
+        regressoes = []
+
+        for chave, atual in resultados.items():
+            anterior = baseline.get(chave)
+            if anterior is None:
+                continue
+
+            if atual["consultas"] > anterior["consultas"]:
+                regressoes.append(
+                    f"{chave}: consultas {anterior['consultas']} -> {atual['consultas']}"
+                )
+
+            limite_p95 = max(
+                anterior["p95_ms"] * (1 + tolerancia),
+                anterior["p95_ms"] + options["folga_ms"],
+            )
+            if atual["p95_ms"] > limite_p95:
+                regressoes.append(
+                    f"{chave}: p95 {anterior['p95_ms']:.2f}ms -> {atual['p95_ms']:.2f}ms"
+                )
+
+            if atual["bytes"] > anterior["bytes"] * (1 + tolerancia):
+                regressoes.append(
+                    f"{chave}: bytes {anterior['bytes']} -> {atual['bytes']}"
+                )
+
+        if regressoes:
+            for regressao in regressoes:
+                self.stdout.write(self.style.ERROR(f"[REGRESSÃO] {regressao}"))
+            raise CommandError(
+                f"{len(regressoes)} regressão(ões) em relação a {options['baseline']}."
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS("Nenhuma regressão em relação à baseline.")
+        )
+
+
+def percentil(valores, p):
+    """Percentil por interpolação linear (mesmo método padrão do numpy)."""
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (
+        posicao - inferior
+    )
+
+
+def preencher(valor, contexto):
+    """Substitui os marcadores {rota}, {entrega}... dentro do corpo da requisição."""
+    if isinstance(valor, dict):
+        return {chave: preencher(item, contexto) for chave, item in valor.items()}
+    if isinstance(valor, list):
+        return [preencher(item, contexto) for item in valor]
+    if isinstance(valor, str):
+        return valor.format(**contexto)
+    return valor
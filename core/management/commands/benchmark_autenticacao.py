@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import TokenCacheAuthentication, TokenPerfilAuthentication
+from core.cache import tokens_autenticados
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara consultas SQL e latência por requisição entre a autenticação por "
+        "token sem cache e a TokenCacheAuthentication."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--usuario",
+            help="Username usado nas requisições (padrão: primeiro usuário com token).",
+        )
+        parser.add_argument("--caminho", default="/api/entregas/")
+        parser.add_argument("--requisicoes", type=int, default=200)
+
+    def handle(self, *args, **options):
+        token = self.obter_token(options["usuario"])
+        caminho = options["caminho"]
+        match = resolve(caminho)
+
+        self.stdout.write(
+            f"{options['requisicoes']} requisições GET {caminho} como {token.user.username}\n"
+        )
+        self.stdout.write(f"{'Autenticação':<30}{'consultas/req':>15}{'ms/req':>10}")
+
+        for autenticacao in (TokenPerfilAuthentication, TokenCacheAuthentication):
+            tokens_autenticados.clear()
+            view = match.func.cls.as_view(
+                match.func.actions,
+                **{**match.func.initkwargs, "authentication_classes": [autenticacao]},
+            )
+            consultas, duracao = self.medir(
+                view, caminho, match.kwargs, token.key, options["requisicoes"]
+            )
+            self.stdout.write(
+                f"{autenticacao.__name__:<30}{consultas:>15.2f}{duracao * 1000:>10.2f}"
+            )
+
+    def obter_token(self, username):
+        if username:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário '{username}' não encontrado.")
+            return Token.objects.get_or_create(user=user)[0]
+
+        token = Token.objects.select_related("user").first()
+        if token is None:
+            raise CommandError("Nenhum token cadastrado; informe --usuario.")
+        return token
+
+    def medir(self, view, caminho, kwargs, key, requisicoes):
+        factory = APIRequestFactory()
+        total_consultas = 0
+        inicio = time.perf_counter()
+
+        for _ in range(requisicoes):
+            request = factory.get(
+                caminho, HTTP_AUTHORIZATION=f"Token {key}", SERVER_NAME="localhost"
+            )
+            with CaptureQueriesContext(connection) as ctx:
+                response = view(request, **kwargs)
+                response.render()
+            if response.status_code >= 400:
+                raise CommandError(f"{caminho} respondeu {response.status_code}.")
+            total_consultas += len(ctx.captured_queries)
+
+        duracao = time.perf_counter() - inicio
+        return total_consultas / requisicoes, duracao / requisicoes
@@ -0,0 +1,215 @@
+import copy
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.management.commands.benchmark_api import percentil
+from core.models import Cliente, Entrega
+from core.views import EntregaViewSet
+
+# Perfis comparados em cada banco: "settings" sobrescreve settings do projeto e "banco"
+# é mesclado em DATABASES["default"] antes de criar o banco de teste.
+PERFIS = {
+    "sqlite": {
+        "padrao": {
+            "settings": {"SQLITE_OTIMIZADO": False},
+            "banco": {"CONN_MAX_AGE": 0, "OPTIONS": {"transaction_mode": "DEFERRED"}},
+        },
+        "otimizado": {
+            "settings": {"SQLITE_OTIMIZADO": True},
+            "banco": {"CONN_MAX_AGE": 60, "OPTIONS": {"transaction_mode": "IMMEDIATE"}},
+        },
+    },
+    "postgresql": {
+        "sem_persistencia": {"banco": {"CONN_MAX_AGE": 0}},
+        "persistente": {"banco": {"CONN_MAX_AGE": 60}},
+        "pool": {
+            "banco": {
+                "CONN_MAX_AGE": 0,
+                "OPTIONS": {"pool": {"min_size": 2, "max_size": 20}},
+            }
+        },
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a vazão de escritas concorrentes (PATCH marcar_entregue de vários "
+        "motoristas ao mesmo tempo) em cada perfil de banco, num banco de teste "
+        "criado e descartado pelo próprio comando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--operacoes", type=int, default=100, help="Escritas por thread."
+        )
+        parser.add_argument(
+            "--perfis",
+            nargs="+",
+            help="Perfis a medir (padrão: todos os do banco configurado).",
+        )
+
+    def handle(self, *args, **options):
+        perfis_do_banco = PERFIS.get(connection.vendor)
+        if perfis_do_banco is None:
+            raise CommandError(
+                f"Sem perfis definidos para o banco {connection.vendor}."
+            )
+
+        nomes = options["perfis"] or list(perfis_do_banco)
+        invalidos = set(nomes) - set(perfis_do_banco)
+        if invalidos:
+            raise CommandError(
+                f"Perfis inválidos para {connection.vendor}: {', '.join(sorted(invalidos))}. "
+                f"Disponíveis: {', '.join(perfis_do_banco)}."
+            )
+
+        threads, operacoes = options["threads"], options["operacoes"]
+        self.stdout.write(
+            f"{threads} threads x {operacoes} escritas (marcar_entregue) em {connection.vendor}\n"
+        )
+        self.stdout.write(
+            f"{'Perfil':<20}{'ok':>8}{'erros':>8}{'escritas/s':>12}{'p50 ms':>10}{'p95 ms':>10}"
+        )
+
+        for nome in nomes:
+            resultado = self.medir_perfil(perfis_do_banco[nome], threads, operacoes)
+            self.stdout.write(
+                f"{nome:<20}{resultado['ok']:>8}{resultado['erros']:>8}"
+                f"{resultado['vazao']:>12.1f}{resultado['p50']:>10.1f}{resultado['p95']:>10.1f}"
+            )
+            for erro, quantidade in resultado["mensagens"].items():
+                self.stdout.write(self.style.WARNING(f"    {quantidade}x {erro}"))
+
+    def medir_perfil(self, perfil, threads, operacoes):
+        """Cria um banco de teste com o perfil aplicado, roda a carga e descarta o banco."""
+        settings_dict = connection.settings_dict
+        original = copy.deepcopy(settings_dict)
+
+        with (
+            tempfile.TemporaryDirectory() as diretorio,
+            override_settings(**perfil.get("settings", {})),
+        ):
+            for chave, valor in perfil["banco"].items():
+                if chave == "OPTIONS":
+                    valor = {**settings_dict.get("OPTIONS", {}), **valor}
+                settings_dict[chave] = valor
+            if connection.vendor == "sqlite":
+                # Um arquivo (e não o banco em memória padrão dos testes), para que cada
+                # thread tenha a própria conexão, como os workers em produção.
+                settings_dict["TEST"] = {
+                    **settings_dict.get("TEST", {}),
+                    "NAME": str(Path(diretorio) / "benchmark_escrita.sqlite3"),
+                }
+
+            nome_original = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                codigos, gestor = self.popular(threads * operacoes)
+                return self.executar(codigos, gestor, threads, operacoes)
+            finally:
+                connection.creation.destroy_test_db(nome_original, verbosity=0)
+                if hasattr(connection, "close_pool"):
+                    connection.close_pool()
+                settings_dict.clear()
+                settings_dict.update(original)
+
+    def popular(self, quantidade):
+        gestor = User.objects.create_user(
+            "benchmark_gestor", password="x", is_staff=True
+        )
+        cliente = Cliente.objects.create(
+            user=User.objects.create_user("benchmark_cliente", password="x"),
+            nome="Cliente Benchmark",
+            endereco="Rua A",
+            telefone="0",
+        )
+        Entrega.objects.bulk_create(
+            [
+                Entrega(
+                    codigo_rastreio=f"BENCH{numero:08d}",
+                    cliente=cliente,
+                    endereco_origem="Origem",
+                    endereco_destino="Destino",
+                    capacidade_necessaria=Decimal("1"),
+                    valor_frete=Decimal("10"),
+                )
+                for numero in range(quantidade)
+            ],
+            batch_size=1000,
+        )
+        codigos = list(
+            Entrega.objects.order_by("id").values_list("codigo_rastreio", flat=True)
+        )
+        # As threads abrem as próprias conexões; esta não pode segurar nenhum lock.
+        connection.close()
+        return codigos, gestor
+
+    def executar(self, codigos, gestor, threads, operacoes):
+        view = EntregaViewSet.as_view({"patch": "marcar_entregue"})
+        factory = APIRequestFactory()
+        barreira = threading.Barrier(threads)
+        latencias, erros = [], {}
+        lock = threading.Lock()
+
+        def trabalhador(indice):
+            meus = codigos[indice * operacoes : (indice + 1) * operacoes]
+            minhas_latencias, meus_erros = [], {}
+            barreira.wait()
+            for codigo in meus:
+                # Cada escrita é uma requisição: a conexão segue as regras do perfil
+                # (CONN_MAX_AGE/pool) como faria entre requisições de um worker.
+                close_old_connections()
+                request = factory.patch(
+                    f"/api/entregas/{codigo}/marcar_entregue/", SERVER_NAME="localhost"
+                )
+                force_authenticate(request, user=gestor)
+                inicio = time.perf_counter()
+                try:
+                    response = view(request, codigo_rastreio=codigo)
+                except OperationalError as exc:
+                    meus_erros[str(exc)] = meus_erros.get(str(exc), 0) + 1
+                else:
+                    if response.status_code < 400:
+                        minhas_latencias.append(time.perf_counter() - inicio)
+                    else:
+                        erro = f"HTTP {response.status_code}"
+                        meus_erros[erro] = meus_erros.get(erro, 0) + 1
+                finally:
+                    close_old_connections()
+            connection.close()
+            with lock:
+                latencias.extend(minhas_latencias)
+                for mensagem, quantidade in meus_erros.items():
+                    erros[mensagem] = erros.get(mensagem, 0) + quantidade
+
+        trabalhadores = [
+            threading.Thread(target=trabalhador, args=(indice,))
+            for indice in range(threads)
+        ]
+        inicio = time.perf_counter()
+        for trabalhador_ in trabalhadores:
+            trabalhador_.start()
+        for trabalhador_ in trabalhadores:
+            trabalhador_.join()
+        duracao = time.perf_counter() - inicio
+
+        return {
+            "ok": len(latencias),
+            "erros": sum(erros.values()),
+            "mensagens": erros,
+            "vazao": len(latencias) / duracao,
+            "p50": percentil(latencias, 50) * 1000 if latencias else 0.0,
+            "p95": percentil(latencias, 95) * 1000 if latencias else 0.0,
+        }
@@ -0,0 +1,126 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.management.commands.benchmark_api import percentil
+from core.models import Cliente, Entrega
+from core.renderers import JSONRapidoRenderer
+from core.serializacao import LeituraRapida
+from core.serializers import EntregaSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o EntregaSerializer + JSONRenderer com a leitura rápida "
+        "(values_list + conversores + orjson) ao serializar N entregas, num banco de "
+        "teste criado e descartado pelo próprio comando. Confere que os bytes são iguais."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entregas", type=int, default=10_000)
+        parser.add_argument("--repeticoes", type=int, default=5)
+
+    def handle(self, *args, **options):
+        nome_original = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            self.popular(options["entregas"])
+            resultados = {
+                nome: self.medir(caminho, options["repeticoes"])
+                for nome, caminho in (
+                    ("serializer", self.serializer),
+                    ("leitura_rapida", self.leitura_rapida),
+                )
+            }
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+        if resultados["serializer"]["json"] != resultados["leitura_rapida"]["json"]:
+            raise CommandError(
+                "A leitura rápida produziu um JSON diferente do serializer."
+            )
+
+        self.stdout.write(
+            f"{options['entregas']} entregas, mediana de {options['repeticoes']} repetições "
+            f"({len(resultados['serializer']['json']) / 1024:.0f} KiB, JSON idêntico)\n"
+        )
+        self.stdout.write(
+            f"{'Caminho':<18}{'consulta ms':>13}{'serialização ms':>17}"
+            f"{'render ms':>11}{'total ms':>10}{'ganho':>8}"
+        )
+        base = resultados["serializer"]["total"]
+        for nome, resultado in resultados.items():
+            self.stdout.write(
+                f"{nome:<18}{resultado['consulta']:>13.1f}{resultado['serializacao']:>17.1f}"
+                f"{resultado['render']:>11.1f}{resultado['total']:>10.1f}"
+                f"{base / resultado['total']:>7.1f}x"
+            )
+
+    def popular(self, quantidade):
+        cliente = Cliente.objects.create(
+            user=User.objects.create_user("benchmark_cliente", password="x"),
+            nome="Cliente Benchmark",
+            endereco="Rua A",
+            telefone="0",
+        )
+        agora = timezone.now()
+        Entrega.objects.bulk_create(
+            [
+                Entrega(
+                    codigo_rastreio=f"BENCH{numero:08d}",
+                    cliente=cliente,
+                    endereco_origem=f"Rua das Acácias, {numero} - Centro, Brasília - DF",
+                    endereco_destino=f"Quadra {numero % 400} Conjunto B, Taguatinga - DF",
+                    capacidade_necessaria=Decimal(numero % 50) + Decimal("0.25"),
+                    valor_frete=Decimal("37.90"),
+                    data_entrega_prevista=agora + timedelta(days=numero % 10),
+                    observacoes="Entregar em horário comercial; chamar na portaria.",
+                    latitude=Decimal("-15.793900") + Decimal(numero % 1000) / 100_000,
+                    longitude=Decimal("-47.882800"),
+                )
+                for numero in range(quantidade)
+            ],
+            batch_size=1000,
+        )
+
+    def consulta(self):
+        return Entrega.objects.order_by("-data_solicitacao", "-id")
+
+    def serializer(self):
+        inicio = time.perf_counter()
+        entregas = list(self.consulta())
+        consultado = time.perf_counter()
+        data = EntregaSerializer(entregas, many=True).data
+        serializado = time.perf_counter()
+        return JSONRenderer().render(data), inicio, consultado, serializado
+
+    def leitura_rapida(self):
+        inicio = time.perf_counter()
+        leitura = LeituraRapida.do_serializer(EntregaSerializer())
+        linhas = list(self.consulta().values_list(*leitura.colunas))
+        consultado = time.perf_counter()
+        data = leitura.registros(linhas)
+        serializado = time.perf_counter()
+        return JSONRapidoRenderer().render(data), inicio, consultado, serializado
+
+    def medir(self, caminho, repeticoes):
+        tempos = {"consulta": [], "serializacao": [], "render": [], "total": []}
+        for _ in range(repeticoes):
+            json, inicio, consultado, serializado = caminho()
+            fim = time.perf_counter()
+            tempos["consulta"].append(consultado - inicio)
+            tempos["serializacao"].append(serializado - consultado)
+            tempos["render"].append(fim - serializado)
+            tempos["total"].append(fim - inicio)
+        resultado = {
+            nome: percentil(valores, 50) * 1000 for nome, valores in tempos.items()
+        }
+        resultado["json"] = json
+        return resultado
@@ -1,123 +1,326 @@
 import random
+from decimal import Decimal
+
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
 from django.utils import timezone
 from faker import Faker
-from core.models import Cliente, Motorista, Veiculo, Rota, Entrega
+from rest_framework.authtoken.models import Token
+
+from core.indicadores import reconstruir_indicadores
+from core.models import (
+    Cliente,
+    Entrega,
+    EntregaEvento,
+    IndicadorDiario,
+    Motorista,
+    Rota,
+    Veiculo,
+)
+from core.proximidade import geohash
+
+fake = Faker("pt_BR")
+
+CAPACIDADE_POR_TIPO = {"CARRO": 200, "VAN": 500, "CAMINHAO": 1000}
+# Coordenadas geradas ao redor de Brasília (até ~0,3° ≈ 33 km do centro).
+CENTRO = (-15.7939, -47.8828)
+DISPERSAO = 0.3
 
-fake = Faker('pt_BR')
 
 class Command(BaseCommand):
-    help = 'Popula o banco de dados com dados fictícios para testes.'
+    help = (
+        "Popula o banco de dados com dados fictícios para testes. "
+        "Usa bulk_create em lotes, então também serve para gerar massas grandes "
+        "(ex.: --entregas 1000000) para testes de capacidade."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clientes", type=int, default=10)
+        parser.add_argument(
+            "--motoristas",
+            type=int,
+            default=5,
+            help="Cada motorista recebe um veículo.",
+        )
+        parser.add_argument("--entregas", type=int, default=20)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Semente para gerar sempre os mesmos dados.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--limpar",
+            action="store_true",
+            help="Apaga os dados existentes antes de popular.",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        if options["seed"] is not None:
+            random.seed(options["seed"])
+            Faker.seed(options["seed"])
+
+        self.stdout.write(self.style.WARNING("Iniciando a população do banco..."))
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write(self.style.WARNING('Iniciando a população do banco...'))
+        if options["limpar"]:
+            self.limpar_banco()
 
-        self.criar_clientes(10)
-        self.criar_motoristas_e_veiculos(5)
-        self.criar_rotas_e_entregas(15)
+        # Um único hash para todos os usuários: o PBKDF2 custa dezenas de ms por chamada.
+        self.senha = make_password("password123")
+        self.enderecos = [fake.address().replace("\n", ", ") for _ in range(500)]
 
-        self.stdout.write(self.style.SUCCESS('Banco de dados populado com sucesso!'))
+        self.criar_clientes(options["clientes"])
+        self.criar_motoristas_e_veiculos(options["motoristas"])
+        self.criar_rotas_e_entregas(options["entregas"])
 
+        # bulk_create e update() não passam pelos signals que mantêm os indicadores.
+        self.stdout.write("Reconstruindo os indicadores...")
+        reconstruir_indicadores()
+
+        self.stdout.write(self.style.SUCCESS("Banco de dados populado com sucesso!"))
+
+    @transaction.atomic
     def limpar_banco(self):
-        self.stdout.write('Limpando dados antigos...')
-        Entrega.objects.all().delete()
-        Rota.objects.all().delete()
-        Veiculo.objects.all().delete()
-        Motorista.objects.all().delete()
-        Cliente.objects.all().delete()
+        """
+        Apaga os dados de domínio e os usuários dos perfis (exceto staff) com um DELETE
+        por tabela, sem carregar as linhas nem disparar signals: o delete() do ORM
+        percorreria milhões de entregas uma a uma. As chaves estrangeiras são checadas
+        só no commit, então a ordem entre as tabelas não importa.
+        """
+        self.stdout.write("Limpando dados antigos...")
+        q = connection.ops.quote_name
+        usuarios = (
+            f"SELECT {q('id')} FROM {q(User._meta.db_table)} "
+            f"WHERE NOT {q('is_staff')} AND NOT {q('is_superuser')} AND ("
+            + " OR ".join(
+                f"{q('id')} IN (SELECT {q(perfil._meta.get_field('user').column)} "
+                f"FROM {q(perfil._meta.db_table)})"
+                for perfil in (Cliente, Motorista)
+            )
+            + ")"
+        )
+        tabelas = [
+            (model, f"WHERE {q(model._meta.get_field('user').column)} IN ({usuarios})")
+            for model in (Token, User.groups.through, User.user_permissions.through)
+        ]
+        tabelas.append((User, f"WHERE {q('id')} IN ({usuarios})"))
+        tabelas += [
+            (model, "")
+            for model in (
+                EntregaEvento,
+                IndicadorDiario,
+                Entrega,
+                Rota,
+                Veiculo,
+                Motorista,
+                Cliente,
+            )
+        ]
+        # Os usuários são achados pelos perfis, por isso saem antes deles.
+        with connection.cursor() as cursor:
+            for model, filtro in tabelas:
+                cursor.execute(f"DELETE FROM {q(model._meta.db_table)} {filtro}")
+
+    def proximo_numero(self, model):
+        """Base sequencial para gerar identificadores únicos sem consultar o banco a cada linha."""
+        return (model.objects.aggregate(maior=Max("id"))["maior"] or 0) + 1
+
+    def criar_usuarios(self, prefixo, qtd):
+        base = self.proximo_numero(User)
+        usuarios = [
+            User(
+                username=f"{prefixo}{base + i}",
+                email=f"{prefixo}{base + i}@example.com",
+                password=self.senha,
+            )
+            for i in range(qtd)
+        ]
+        User.objects.bulk_create(usuarios, batch_size=self.batch_size)
+
+        if usuarios and usuarios[0].pk is None:
+            # Bancos sem RETURNING no bulk_create: recupera os ids pelo username.
+            ids = dict(
+                User.objects.filter(username__startswith=prefixo).values_list(
+                    "username", "id"
+                )
+            )
+            for usuario in usuarios:
+                usuario.pk = ids[usuario.username]
+        return usuarios
 
+    @transaction.atomic
     def criar_clientes(self, qtd):
-        self.stdout.write(f'Criando {qtd} clientes...')
-        for _ in range(qtd):
-            username = fake.user_name() + str(random.randint(1000, 9999))
-            email = fake.email()
-            
-            if not User.objects.filter(username=username).exists():
-                user = User.objects.create_user(username=username, email=email, password='password123')
-                
-                Cliente.objects.create(
+        self.stdout.write(f"Criando {qtd} clientes...")
+        usuarios = self.criar_usuarios("cliente", qtd)
+
+        Cliente.objects.bulk_create(
+            [
+                Cliente(
                     user=user,
                     nome=fake.company(),
-                    endereco=fake.address(),
-                    telefone=fake.phone_number()
+                    endereco=random.choice(self.enderecos),
+                    telefone=fake.phone_number(),
                 )
+                for user in usuarios
+            ],
+            batch_size=self.batch_size,
+        )
 
+    @transaction.atomic
     def criar_motoristas_e_veiculos(self, qtd):
-        self.stdout.write(f'Criando {qtd} motoristas e veículos...')
-        for _ in range(qtd):
-            username = fake.user_name() + str(random.randint(1000, 9999))
-            if not User.objects.filter(username=username).exists():
-                user = User.objects.create_user(username=username, password='password123')
-                
-                motorista = Motorista.objects.create(
+        self.stdout.write(f"Criando {qtd} motoristas e veículos...")
+        usuarios = self.criar_usuarios("motorista", qtd)
+        base = self.proximo_numero(Motorista)
+
+        motoristas = Motorista.objects.bulk_create(
+            [
+                Motorista(
                     user=user,
                     nome=fake.name(),
-                    cpf=fake.cpf().replace('.', '').replace('-', ''),
-                    cnh=str(random.randint(10000000000, 99999999999)),
+                    # Sequenciais a partir de 9xxxxxxxxxx para não colidir com os gerados pelo Faker.
+                    cpf=f"{90000000000 + base + i}",
+                    cnh=f"{90000000000 + base + i}",
                     telefone=fake.phone_number(),
-                    status=random.choice(['disponivel', 'em_rota', 'inativo'])
+                    status=random.choice(["disponivel", "em_rota", "inativo"]),
                 )
+                for i, user in enumerate(usuarios)
+            ],
+            batch_size=self.batch_size,
+        )
+        if motoristas and motoristas[0].pk is None:
+            motoristas = list(Motorista.objects.filter(id__gte=base).order_by("id"))
 
-                tipo = random.choice(['CARRO', 'VAN', 'CAMINHAO'])
-                capacidade = 1000.00 if tipo == 'CAMINHAO' else (500.00 if tipo == 'VAN' else 200.00)
-                
-                Veiculo.objects.create(
-                    placa=fake.license_plate().replace('-', ''),
-                    modelo=fake.vehicle_make_model() if hasattr(fake, 'vehicle_make_model') else f"Modelo {fake.word()}",
+        base_veiculo = self.proximo_numero(Veiculo)
+        veiculos = []
+        for i, motorista in enumerate(motoristas):
+            tipo = random.choice(["CARRO", "VAN", "CAMINHAO"])
+            veiculos.append(
+                Veiculo(
+                    # Placa com 7 caracteres: prefixo "Z" + número em base 36, única por execução.
+                    placa=f"Z{self.base36(base_veiculo + i):0>6}",
+                    modelo=fake.vehicle_make_model()
+                    if hasattr(fake, "vehicle_make_model")
+                    else f"Modelo {fake.word()}",
                     tipo=tipo,
-                    capacidade_maxima=capacidade,
-                    km_atual=random.uniform(0, 100000),
-                    status='DISPONIVEL',
+                    capacidade_maxima=CAPACIDADE_POR_TIPO[tipo],
+                    km_atual=Decimal(random.randint(0, 10_000_000)) / 100,
+                    status="DISPONIVEL",
                     motorista=motorista,
+                    **self.coordenadas(),
                 )
+            )
+        Veiculo.objects.bulk_create(veiculos, batch_size=self.batch_size)
 
     def criar_rotas_e_entregas(self, qtd_entregas):
-        self.stdout.write('Gerando rotas e distribuindo entregas...')
-        
-        motoristas_ativos = Motorista.objects.filter(status__in=['disponivel', 'em_rota'])
-        clientes = Cliente.objects.all()
+        self.stdout.write(f"Gerando rotas e distribuindo {qtd_entregas} entregas...")
+
+        motoristas_ativos = Motorista.objects.filter(
+            status__in=["disponivel", "em_rota"], veiculo__isnull=False
+        ).select_related("veiculo")
+        clientes = list(Cliente.objects.values_list("id", flat=True))
 
-        if not motoristas_ativos.exists() or not clientes.exists():
-            self.stdout.write(self.style.ERROR('Faltam motoristas ou clientes para gerar entregas.'))
+        if not motoristas_ativos.exists() or not clientes:
+            self.stdout.write(
+                self.style.ERROR("Faltam motoristas ou clientes para gerar entregas.")
+            )
             return
 
-        for motorista in motoristas_ativos:
-            if hasattr(motorista, 'veiculo'):
-                rota = Rota.objects.create(
-                    motorista=motorista,
-                    veiculo=motorista.veiculo,
-                    nome=f"Rota {fake.city()} - {fake.day_of_week()}",
-                    descricao=fake.sentence(),
-                    status='planejada'
+        with transaction.atomic():
+            rotas = Rota.objects.bulk_create(
+                [
+                    Rota(
+                        motorista=motorista,
+                        veiculo=motorista.veiculo,
+                        nome=f"Rota {fake.city()} - {fake.day_of_week()}",
+                        descricao=fake.sentence(),
+                        status="planejada",
+                    )
+                    for motorista in motoristas_ativos
+                ],
+                batch_size=self.batch_size,
+            )
+            if rotas and rotas[0].pk is None:
+                rotas = list(
+                    Rota.objects.select_related("veiculo").order_by("-id")[: len(rotas)]
                 )
 
-                for _ in range(random.randint(1, 5)):
-                    self._criar_entrega(random.choice(clientes), rota, motorista)
+        carga = {rota.pk: Decimal("0") for rota in rotas}
+        base = self.proximo_numero(Entrega)
+        criadas = 0
+
+        while criadas < qtd_entregas:
+            lote = []
+            for i in range(criadas, min(criadas + self.batch_size, qtd_entregas)):
+                lote.append(
+                    self._nova_entrega(base + i, random.choice(clientes), rotas, carga)
+                )
 
-        for _ in range(5):
-            self._criar_entrega(random.choice(clientes), None, None)
+            with transaction.atomic():
+                Entrega.objects.bulk_create(lote, batch_size=self.batch_size)
+            criadas += len(lote)
+            self.stdout.write(f"  {criadas}/{qtd_entregas} entregas")
 
-    def _criar_entrega(self, cliente, rota, motorista):
-        status_entrega = 'pendente'
+        # bulk_create não passa pelo save(), então o contador de carga é gravado aqui.
+        for rota in rotas:
+            if carga[rota.pk]:
+                Rota.objects.filter(pk=rota.pk).update(
+                    capacidade_utilizada=carga[rota.pk]
+                )
+
+    def _nova_entrega(self, numero, cliente_id, rotas, carga):
+        capacidade = Decimal(random.randint(100, 5000)) / 100
+        rota = None
+        status_entrega = "pendente"
         data_entrega = None
-        
-        if rota:
-            status_entrega = random.choice(['em_transito', 'entregue'])
-            if status_entrega == 'entregue':
-                data_entrega = timezone.now()
-
-        Entrega.objects.create(
-            codigo_rastreio=fake.uuid4()[:8].upper(),
-            cliente=cliente,
+
+        if random.random() < 0.7:
+            candidata = random.choice(rotas)
+            if carga[candidata.pk] + capacidade <= candidata.veiculo.capacidade_maxima:
+                rota = candidata
+                carga[rota.pk] += capacidade
+                status_entrega = random.choice(["em_transito", "entregue"])
+                if status_entrega == "entregue":
+                    data_entrega = timezone.now()
+
+        return Entrega(
+            # Código sequencial: único mesmo com milhões de linhas (uuid4()[:8] colide).
+            codigo_rastreio=f"LG{numero:010d}",
+            cliente_id=cliente_id,
             rota=rota,
-            motorista=motorista,
-            endereco_origem=fake.address(),
-            endereco_destino=fake.address(),
+            motorista_id=rota.motorista_id if rota else None,
+            endereco_origem=random.choice(self.enderecos),
+            endereco_destino=random.choice(self.enderecos),
             status=status_entrega,
-            capacidade_necessaria=random.uniform(1.0, 50.0),
-            valor_frete=random.uniform(20.0, 500.0),
-            data_entrega_prevista=timezone.now() + timezone.timedelta(days=random.randint(1, 5)),
+            capacidade_necessaria=capacidade,
+            valor_frete=Decimal(random.randint(2000, 50000)) / 100,
+            data_entrega_prevista=timezone.now()
+            + timezone.timedelta(days=random.randint(1, 5)),
             data_entrega_real=data_entrega,
-            observacoes=fake.text(max_nb_chars=50)
-        )
\ No newline at end of file
+            observacoes=fake.text(max_nb_chars=50) if random.random() < 0.1 else "",
+            **self.coordenadas(),
+        )
+
+    @staticmethod
+    def coordenadas():
+        # bulk_create não passa pelo save(), então o geohash é calculado aqui.
+        latitude = Decimal(f"{CENTRO[0] + random.uniform(-DISPERSAO, DISPERSAO):.6f}")
+        longitude = Decimal(f"{CENTRO[1] + random.uniform(-DISPERSAO, DISPERSAO):.6f}")
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "geohash": geohash(latitude, longitude),
+        }
+
+    @staticmethod
+    def base36(numero):
+        digitos = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        texto = ""
+        while numero:
+            numero, resto = divmod(numero, 36)
+            texto = digitos[resto] + texto
+        return texto or "0"
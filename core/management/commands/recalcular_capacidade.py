@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.models import Entrega, Rota, capacidade_ajustada
+
+CENTAVOS = Decimal("0.01")
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula Rota.capacidade_utilizada a partir das entregas ativas e corrige "
+        "as rotas cujo valor armazenado divergiu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas lista as divergências, sem gravar.",
+        )
+
+    def handle(self, *args, **options):
+        total_real = (
+            Entrega.objects.filter(rota=OuterRef("pk"))
+            .exclude(status="cancelada")
+            .values("rota")
+            .annotate(total=Sum("capacidade_necessaria"))
+            .values("total")
+        )
+        capacidade_real = Coalesce(
+            Subquery(total_real, output_field=models.DecimalField()),
+            Value(Decimal("0")),
+            output_field=models.DecimalField(),
+        )
+
+        with transaction.atomic():
+            rotas = (
+                Rota.objects.select_for_update()
+                .annotate(capacidade_real=capacidade_real)
+                .values_list("id", "capacidade_utilizada", "capacidade_real")
+            )
+
+            # A comparação é feita em Python: no SQLite o Sum() de decimais vira float.
+            divergentes = []
+            for rota_id, armazenada, real in rotas.iterator(chunk_size=2000):
+                real = Decimal(str(real)).quantize(CENTAVOS)
+                if armazenada != real:
+                    divergentes.append((rota_id, armazenada, real))
+                    self.stdout.write(
+                        f"Rota {rota_id}: armazenada={armazenada} real={real}"
+                    )
+
+            if not options["dry_run"]:
+                for rota_id, armazenada, real in divergentes:
+                    Rota.objects.filter(pk=rota_id).update(capacidade_utilizada=real)
+                    capacidade_ajustada.send(
+                        Rota, rota_id=rota_id, quantidade=real - armazenada
+                    )
+
+        if not divergentes:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada."))
+        elif options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING(f"{len(divergentes)} rota(s) com divergência.")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"{len(divergentes)} rota(s) corrigida(s).")
+            )
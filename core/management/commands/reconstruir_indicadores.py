@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from core.indicadores import METRICAS, calcular_indicadores, reconstruir_indicadores
+from core.models import IndicadorDiario
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as tabelas de indicadores (IndicadorDiario) a partir de Entrega e "
+        "Rota. Use para o backfill inicial e depois de cargas que não passam pela API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas compara os indicadores gravados com o recálculo, sem gravar.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["dry_run"]:
+            total = reconstruir_indicadores()
+            self.stdout.write(
+                self.style.SUCCESS(f"{total} linha(s) de indicadores gravada(s).")
+            )
+            return
+
+        esperados = calcular_indicadores()
+        gravados = {
+            (linha.pop("dia"), linha.pop("dimensao"), linha.pop("referencia")): linha
+            for linha in IndicadorDiario.objects.values(
+                "dia", "dimensao", "referencia", *METRICAS
+            )
+        }
+
+        divergentes = 0
+        for chave in sorted(esperados.keys() | gravados.keys()):
+            esperado = {m: esperados.get(chave, {}).get(m, 0) for m in METRICAS}
+            gravado = gravados.get(chave, dict.fromkeys(METRICAS, 0))
+            diferencas = {
+                metrica: (gravado[metrica], esperado[metrica])
+                for metrica in METRICAS
+                if gravado[metrica] != esperado[metrica]
+            }
+            if diferencas:
+                divergentes += 1
+                dia, dimensao, referencia = chave
+                self.stdout.write(
+                    f"{dia} {dimensao}:{referencia} "
+                    + ", ".join(
+                        f"{metrica} gravado={antes} real={real}"
+                        for metrica, (antes, real) in diferencas.items()
+                    )
+                )
+
+        if divergentes:
+            self.stdout.write(
+                self.style.WARNING(f"{divergentes} linha(s) com divergência.")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada."))
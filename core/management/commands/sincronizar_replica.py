@@ -0,0 +1,63 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.roteamento import REPLICA_BANCO
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco SQLite primário para o arquivo da réplica (DB_REPLICA_NAME), "
+        "simulando a replicação no ambiente local. Com --intervalo, repete a cópia "
+        "periodicamente; o intervalo faz o papel do atraso da réplica."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            help="Segundos entre as cópias (padrão: copia uma vez e sai).",
+        )
+
+    def handle(self, *args, **options):
+        if REPLICA_BANCO not in settings.DATABASES:
+            raise CommandError(
+                "Nenhuma réplica configurada: defina DB_REPLICA_NAME com o arquivo da réplica."
+            )
+        primario = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replica = settings.DATABASES[REPLICA_BANCO]
+        if not all(
+            banco["ENGINE"] == "django.db.backends.sqlite3"
+            for banco in (primario, replica)
+        ):
+            raise CommandError(
+                "sincronizar_replica só simula réplicas SQLite; em PostgreSQL use a "
+                "replicação do próprio servidor."
+            )
+        if str(primario["NAME"]) == str(replica["NAME"]):
+            raise CommandError("A réplica aponta para o mesmo arquivo do primário.")
+
+        while True:
+            inicio = time.perf_counter()
+            self.copiar(primario["NAME"], replica["NAME"])
+            self.stdout.write(
+                f"Réplica {replica['NAME']} sincronizada em "
+                f"{(time.perf_counter() - inicio) * 1000:.0f} ms."
+            )
+            if not options["intervalo"]:
+                return
+            time.sleep(options["intervalo"])
+
+    def copiar(self, origem, destino):
+        # API de backup do SQLite: cópia consistente mesmo com o primário recebendo
+        # escritas e a réplica com leitores abertos.
+        with (
+            sqlite3.connect(origem) as conexao_origem,
+            sqlite3.connect(destino) as conexao_destino,
+        ):
+            conexao_origem.backup(conexao_destino)
+        conexao_origem.close()
+        conexao_destino.close()
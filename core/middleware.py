@@ -0,0 +1,192 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .roteamento import (
+    aregistrar_escrita,
+    definir_leitura,
+    escopo_leitura,
+    preservar_leitura,
+    registrar_escrita,
+)
+
+logger = logging.getLogger("core.sql")
+
+CONFIGURACAO_PADRAO = {
+    "HABILITADA": True,
+    # Fração das requisições em que o formato de cada consulta é analisado (N+1).
+    "AMOSTRAGEM": 1.0,
+    # A partir de quantas execuções do mesmo formato numa requisição o alerta é emitido.
+    "LIMITE_REPETICOES": 5,
+    "SERVER_TIMING": True,
+}
+
+_LISTA_PARAMETROS = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+
+def formato_consulta(sql):
+    """SQL já vem parametrizado (%s); só as listas de IN (...) precisam ser colapsadas."""
+    return _LISTA_PARAMETROS.sub("(%s...)", sql)
+
+
+class ColetorSQL:
+    """execute_wrapper que conta as consultas, soma o tempo gasto e agrupa por formato."""
+
+    def __init__(self, agrupar_formatos):
+        self.consultas = 0
+        self.duracao = 0.0
+        self.formatos = Counter() if agrupar_formatos else None
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duracao += time.perf_counter() - inicio
+            self.consultas += 1
+            if self.formatos is not None:
+                self.formatos[formato_consulta(sql)] += 1
+
+    def repetidas(self, limite):
+        if self.formatos is None:
+            return []
+        return [
+            {"sql": sql, "vezes": vezes}
+            for sql, vezes in self.formatos.most_common()
+            if vezes >= limite
+        ]
+
+
+class InstrumentacaoSQLMiddleware:
+    """
+    Mede consultas e tempo de banco por requisição e devolve no cabeçalho
+    `Server-Timing: db;dur=..., app;dur=...`. Nas requisições amostradas, registra no
+    logger "core.sql" os formatos de consulta repetidos (assinatura de N+1).
+
+    Configurável por settings.INSTRUMENTACAO_SQL (ver CONFIGURACAO_PADRAO).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.config = {
+            **CONFIGURACAO_PADRAO,
+            **getattr(settings, "INSTRUMENTACAO_SQL", {}),
+        }
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.config["HABILITADA"]:
+            return self.get_response(request)
+
+        coletor, inicio = self._iniciar()
+        with self._instrumentar(coletor):
+            response = self.get_response(request)
+        return self._finalizar(request, response, coletor, inicio)
+
+    async def __acall__(self, request):
+        if not self.config["HABILITADA"]:
+            return await self.get_response(request)
+
+        # As conexões são locais à thread: o coletor é instalado na mesma thread em que o
+        # ORM assíncrono desta requisição executa as consultas (sync_to_async).
+        coletor, inicio = self._iniciar()
+        instrumentacao = await sync_to_async(self._instrumentar)(coletor)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(instrumentacao.close)()
+        return self._finalizar(request, response, coletor, inicio)
+
+    def _iniciar(self):
+        amostrada = random.random() < self.config["AMOSTRAGEM"]
+        return ColetorSQL(agrupar_formatos=amostrada), time.perf_counter()
+
+    def _instrumentar(self, coletor):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(coletor))
+        return stack
+
+    def _finalizar(self, request, response, coletor, inicio):
+        duracao_total = time.perf_counter() - inicio
+
+        # Em respostas streaming as consultas continuam depois daqui; os números seriam parciais.
+        if response.streaming:
+            return response
+        db_ms = coletor.duracao * 1000
+        app_ms = max(duracao_total - coletor.duracao, 0) * 1000
+
+        if self.config["SERVER_TIMING"]:
+            response["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{coletor.consultas} consultas", '
+                f"app;dur={app_ms:.1f}"
+            )
+
+        repetidas = coletor.repetidas(self.config["LIMITE_REPETICOES"])
+        if repetidas:
+            registro = {
+                "evento": "consultas_repetidas",
+                "metodo": request.method,
+                "caminho": request.path,
+                "status": response.status_code,
+                "consultas": coletor.consultas,
+                "db_ms": round(db_ms, 1),
+                "repetidas": repetidas,
+            }
+            logger.warning(json.dumps(registro, ensure_ascii=False), extra=registro)
+
+        return response
+
+
+class ReplicaLeituraMiddleware:
+    """
+    Define para cada requisição se as leituras vão para a réplica (core.roteamento) e,
+    depois de uma escrita bem-sucedida, mantém o cliente no primário pela janela de
+    settings.REPLICA_JANELA_CONSISTENCIA. Sem réplica configurada, tudo fica no primário.
+
+    A decisão vale só dentro da requisição: o escopo começa no primário, é ajustado em
+    process_view (requisições sem view, como um 404, ficam no primário) e é desfeito
+    na saída, mesmo com exceção.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with escopo_leitura():
+            response = self.get_response(request)
+            preservar_leitura(response)
+        registrar_escrita(request, response)
+        return response
+
+    async def __acall__(self, request):
+        with escopo_leitura():
+            response = await self.get_response(request)
+            preservar_leitura(response)
+        await aregistrar_escrita(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        definir_leitura(request, view_func)
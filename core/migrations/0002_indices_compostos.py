@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["motorista", "status"], name="entrega_motorista_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["motorista", "data_solicitacao"],
+                name="entrega_motorista_data_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["cliente", "data_solicitacao"], name="entrega_cliente_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["rota", "status"], name="entrega_rota_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["data_solicitacao"], name="entrega_data_solicitacao_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rota",
+            index=models.Index(
+                fields=["motorista", "data_rota"], name="rota_motorista_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rota",
+            index=models.Index(
+                fields=["veiculo", "data_rota"], name="rota_veiculo_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rota",
+            index=models.Index(fields=["data_rota"], name="rota_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="veiculo",
+            index=models.Index(fields=["status"], name="veiculo_status_idx"),
+        ),
+    ]
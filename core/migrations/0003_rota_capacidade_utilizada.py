@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:14
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_capacidade_utilizada(apps, schema_editor):
+    Rota = apps.get_model("core", "Rota")
+    Entrega = apps.get_model("core", "Entrega")
+
+    total = (
+        Entrega.objects.filter(rota=OuterRef("pk"))
+        .exclude(status="cancelada")
+        .values("rota")
+        .annotate(total=Sum("capacidade_necessaria"))
+        .values("total")
+    )
+    Rota.objects.update(
+        capacidade_utilizada=Coalesce(
+            Subquery(total, output_field=models.DecimalField()), Value(Decimal("0"))
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_indices_compostos"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rota",
+            name="capacidade_utilizada",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Soma da capacidade das entregas ativas da rota (mantida automaticamente)",
+                max_digits=10,
+            ),
+        ),
+        migrations.RunPython(preencher_capacidade_utilizada, migrations.RunPython.noop),
+    ]
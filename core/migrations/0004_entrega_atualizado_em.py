@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_rota_capacidade_utilizada"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entrega",
+            name="atualizado_em",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="Data e hora da última alteração (versão da entrega)",
+            ),
+        ),
+    ]
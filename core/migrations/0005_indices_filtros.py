@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_entrega_atualizado_em"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["status", "data_solicitacao"], name="entrega_status_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["data_entrega_prevista"], name="entrega_prevista_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rota",
+            index=models.Index(
+                fields=["status", "data_rota"], name="rota_status_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="veiculo",
+            index=models.Index(
+                fields=["tipo", "status"], name="veiculo_tipo_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,113 @@
+from django.db import migrations
+
+# Índice FTS5 "sombra" das entregas (rowid = core_entrega.id), mantido por triggers para
+# cobrir também bulk_create e .update(), que não disparam signals.
+CRIAR = [
+    """
+    CREATE VIRTUAL TABLE core_entrega_busca USING fts5(
+        codigo_rastreio,
+        endereco_origem,
+        endereco_destino,
+        cliente_nome,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER core_entrega_busca_insert AFTER INSERT ON core_entrega BEGIN
+        INSERT INTO core_entrega_busca (
+            rowid, codigo_rastreio, endereco_origem, endereco_destino, cliente_nome
+        )
+        VALUES (
+            new.id,
+            new.codigo_rastreio,
+            new.endereco_origem,
+            new.endereco_destino,
+            (SELECT nome FROM core_cliente WHERE id = new.cliente_id)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER core_entrega_busca_update
+    AFTER UPDATE OF codigo_rastreio, endereco_origem, endereco_destino, cliente_id
+    ON core_entrega
+    WHEN old.codigo_rastreio IS NOT new.codigo_rastreio
+        OR old.endereco_origem IS NOT new.endereco_origem
+        OR old.endereco_destino IS NOT new.endereco_destino
+        OR old.cliente_id IS NOT new.cliente_id
+    BEGIN
+        DELETE FROM core_entrega_busca WHERE rowid = old.id;
+        INSERT INTO core_entrega_busca (
+            rowid, codigo_rastreio, endereco_origem, endereco_destino, cliente_nome
+        )
+        VALUES (
+            new.id,
+            new.codigo_rastreio,
+            new.endereco_origem,
+            new.endereco_destino,
+            (SELECT nome FROM core_cliente WHERE id = new.cliente_id)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER core_entrega_busca_delete AFTER DELETE ON core_entrega BEGIN
+        DELETE FROM core_entrega_busca WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_cliente_busca_update AFTER UPDATE OF nome ON core_cliente
+    WHEN old.nome IS NOT new.nome
+    BEGIN
+        UPDATE core_entrega_busca SET cliente_nome = new.nome
+        WHERE rowid IN (SELECT id FROM core_entrega WHERE cliente_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO core_entrega_busca (
+        rowid, codigo_rastreio, endereco_origem, endereco_destino, cliente_nome
+    )
+    SELECT e.id, e.codigo_rastreio, e.endereco_origem, e.endereco_destino, c.nome
+    FROM core_entrega e
+    LEFT JOIN core_cliente c ON c.id = e.cliente_id
+    """,
+]
+
+REMOVER = [
+    "DROP TRIGGER IF EXISTS core_cliente_busca_update",
+    "DROP TRIGGER IF EXISTS core_entrega_busca_delete",
+    "DROP TRIGGER IF EXISTS core_entrega_busca_update",
+    "DROP TRIGGER IF EXISTS core_entrega_busca_insert",
+    "DROP TABLE IF EXISTS core_entrega_busca",
+]
+
+
+def suporta_fts5(connection):
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any("FTS5" in opcao for (opcao,) in cursor.fetchall())
+
+
+def criar_busca(apps, schema_editor):
+    if not suporta_fts5(schema_editor.connection):
+        return
+    for sql in CRIAR:
+        schema_editor.execute(sql)
+
+
+def remover_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in REMOVER:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_indices_filtros"),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_busca, remover_busca),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:30
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_busca_entregas"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entrega",
+            name="latitude",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=6,
+                help_text="Latitude do endereço de destino",
+                max_digits=9,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-90),
+                    django.core.validators.MaxValueValidator(90),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="entrega",
+            name="longitude",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=6,
+                help_text="Longitude do endereço de destino",
+                max_digits=9,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-180),
+                    django.core.validators.MaxValueValidator(180),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="entrega",
+            name="sequencia",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Ordem de parada na rota (definida por /api/rotas/{id}/otimizar/)",
+                null=True,
+            ),
+        ),
+    ]
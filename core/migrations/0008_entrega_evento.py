@@ -0,0 +1,130 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:40
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_entrega_coordenadas_sequencia"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntregaEvento",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("codigo_rastreio", models.CharField(max_length=50)),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("criada", "Criada"),
+                            ("status", "Mudança de status"),
+                            ("atribuicao", "Atribuição de rota/motorista"),
+                            ("edicao", "Edição"),
+                            ("removida", "Removida"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "alteracoes",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Campos alterados no formato {campo: [antes, depois]}",
+                    ),
+                ),
+                (
+                    "visivel_cliente",
+                    models.BooleanField(
+                        default=False, help_text="Altera algum campo que o cliente vê"
+                    ),
+                ),
+                ("criado_em", models.DateTimeField(auto_now_add=True)),
+                (
+                    "cliente",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="core.cliente",
+                    ),
+                ),
+                (
+                    "entrega",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        help_text="Entrega alterada (o id é mantido mesmo após a exclusão)",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="eventos",
+                        to="core.entrega",
+                    ),
+                ),
+                (
+                    "motorista",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        help_text="Motorista da entrega após a alteração",
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="core.motorista",
+                    ),
+                ),
+                (
+                    "motorista_anterior",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        help_text="Motorista que deixou a entrega nesta alteração (recebe o evento também)",
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="core.motorista",
+                    ),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["motorista", "id"], name="evento_motorista_idx"
+                    ),
+                    models.Index(
+                        fields=["motorista_anterior", "id"],
+                        name="evento_motorista_ant_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("visivel_cliente", True)),
+                        fields=["cliente", "id"],
+                        name="evento_cliente_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
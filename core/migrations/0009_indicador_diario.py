@@ -0,0 +1,95 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_entrega_evento"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndicadorDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dia", models.DateField()),
+                (
+                    "dimensao",
+                    models.CharField(
+                        choices=[
+                            ("geral", "Geral"),
+                            ("motorista", "Motorista"),
+                            ("cliente", "Cliente"),
+                            ("veiculo", "Veículo"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "referencia",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Id do motorista, cliente ou veículo (0 na dimensão geral)",
+                    ),
+                ),
+                ("solicitadas", models.IntegerField(default=0)),
+                ("canceladas", models.IntegerField(default=0)),
+                (
+                    "valor_frete_centavos",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Frete das entregas solicitadas no dia, exceto canceladas",
+                    ),
+                ),
+                ("entregues", models.IntegerField(default=0)),
+                (
+                    "entregues_com_prazo",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Entregues que tinham data_entrega_prevista",
+                    ),
+                ),
+                (
+                    "entregues_no_prazo",
+                    models.IntegerField(
+                        default=0, help_text="Entregues até a data_entrega_prevista"
+                    ),
+                ),
+                ("rotas", models.IntegerField(default=0)),
+                (
+                    "capacidade_centavos",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Soma da capacidade máxima dos veículos das rotas",
+                    ),
+                ),
+                (
+                    "carga_centavos",
+                    models.BigIntegerField(
+                        default=0, help_text="Soma da capacidade utilizada das rotas"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["dimensao", "dia"], name="indicador_dimensao_dia_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimensao", "referencia", "dia"), name="indicador_unico"
+                    )
+                ],
+            },
+        ),
+    ]
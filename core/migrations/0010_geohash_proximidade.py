@@ -0,0 +1,101 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:54
+
+import django.core.validators
+from django.db import migrations, models
+
+from core.proximidade import geohash
+
+BATCH_SIZE = 1000
+
+
+def preencher_geohash(apps, schema_editor):
+    Entrega = apps.get_model("core", "Entrega")
+
+    entregas = (
+        Entrega.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .only("id", "latitude", "longitude")
+        .order_by("id")
+    )
+    lote = []
+    for entrega in entregas.iterator(chunk_size=BATCH_SIZE):
+        entrega.geohash = geohash(entrega.latitude, entrega.longitude)
+        lote.append(entrega)
+        if len(lote) == BATCH_SIZE:
+            Entrega.objects.bulk_update(lote, ["geohash"])
+            lote = []
+    Entrega.objects.bulk_update(lote, ["geohash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0009_indicador_diario"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entrega",
+            name="geohash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Geohash do destino (mantido automaticamente; usado nas buscas por proximidade)",
+                max_length=12,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="veiculo",
+            name="geohash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Geohash da posição (mantido automaticamente; usado nas buscas por proximidade)",
+                max_length=12,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="veiculo",
+            name="latitude",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=6,
+                help_text="Latitude da última posição conhecida",
+                max_digits=9,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-90),
+                    django.core.validators.MaxValueValidator(90),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="veiculo",
+            name="longitude",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=6,
+                help_text="Longitude da última posição conhecida",
+                max_digits=9,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-180),
+                    django.core.validators.MaxValueValidator(180),
+                ],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entrega",
+            index=models.Index(
+                fields=["status", "geohash", "latitude", "longitude"],
+                name="entrega_status_geohash_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="veiculo",
+            index=models.Index(
+                fields=["status", "geohash"], name="veiculo_status_geohash_idx"
+            ),
+        ),
+        migrations.RunPython(preencher_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+# A tabela core_entrega é recriada pelo SQLite ao trocar o NULL da coluna, e os
+# triggers da busca (0006) iriam junto; são removidos antes e recriados depois.
+busca = import_module("core.migrations.0006_busca_entregas")
+
+
+def preencher_data_solicitacao(apps, schema_editor):
+    # A paginação por cursor ordena por data_solicitacao: uma linha com NULL ficaria
+    # fora das páginas. Sem a data original, vale a última alteração da entrega.
+    Entrega = apps.get_model("core", "Entrega")
+    Entrega.objects.filter(data_solicitacao__isnull=True).update(
+        data_solicitacao=Coalesce("atualizado_em", Now())
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_geohash_proximidade"),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_data_solicitacao, migrations.RunPython.noop),
+        migrations.RunPython(busca.remover_busca, busca.criar_busca),
+        migrations.AlterField(
+            model_name="entrega",
+            name="data_solicitacao",
+            field=models.DateTimeField(
+                auto_now_add=True, help_text="Data e hora da solicitação da entrega"
+            ),
+        ),
+        migrations.RunPython(busca.criar_busca, busca.remover_busca),
+    ]
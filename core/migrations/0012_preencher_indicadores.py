@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from core.indicadores import reconstruir_indicadores
+
+
+def preencher_indicadores(apps, schema_editor):
+    # Bancos que já tinham entregas e rotas ao criar IndicadorDiario (0009) ficaram
+    # com a tabela vazia; o recálculo completo preenche o histórico.
+    reconstruir_indicadores(apps, schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_entrega_data_solicitacao_obrigatoria"),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_indicadores, migrations.RunPython.noop),
+    ]
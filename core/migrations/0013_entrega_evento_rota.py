@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def preencher_rotas(apps, schema_editor):
+    # Nos eventos já gravados, a rota vem da própria alteração quando ela mudou; nos
+    # outros, da rota atual da entrega, a melhor aproximação disponível.
+    Entrega = apps.get_model("core", "Entrega")
+    EntregaEvento = apps.get_model("core", "EntregaEvento")
+    ultimo_id = 0
+    while lote := list(
+        EntregaEvento.objects.filter(id__gt=ultimo_id).order_by("id")[:BATCH_SIZE]
+    ):
+        ultimo_id = lote[-1].id
+        rotas_atuais = dict(
+            Entrega.objects.filter(
+                id__in={evento.entrega_id for evento in lote}
+            ).values_list("id", "rota_id")
+        )
+        for evento in lote:
+            if "rota" in evento.alteracoes:
+                evento.rota_anterior_id, evento.rota_id = evento.alteracoes["rota"]
+            else:
+                evento.rota_id = rotas_atuais.get(evento.entrega_id)
+        EntregaEvento.objects.bulk_update(lote, ["rota", "rota_anterior"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0012_preencher_indicadores"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entregaevento",
+            name="rota",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                help_text="Rota da entrega após a alteração",
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="core.rota",
+            ),
+        ),
+        migrations.AddField(
+            model_name="entregaevento",
+            name="rota_anterior",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                help_text="Rota que a entrega deixou nesta alteração (stream de eventos da rota)",
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="core.rota",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entregaevento",
+            index=models.Index(fields=["rota", "id"], name="evento_rota_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="entregaevento",
+            index=models.Index(
+                fields=["rota_anterior", "id"], name="evento_rota_ant_idx"
+            ),
+        ),
+        migrations.RunPython(preencher_rotas, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,24 @@
-from django.db import models
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, router, transaction
+from django.db.models import F
+from django.db.models.functions import Round
 from django.contrib.auth.models import User
+from django.dispatch import Signal
+
+from .proximidade import geohash
+
+
+class CapacidadeExcedida(ValidationError):
+    """A carga da rota ultrapassaria a capacidade máxima do veículo."""
+
+
+# Enviado quando Rota.capacidade_utilizada muda por UPDATE direto (sem save()), com
+# rota_id e quantidade; os indicadores acompanham a carga das rotas por ele.
+capacidade_ajustada = Signal()
 
 
 class Cliente(models.Model):
@@ -111,9 +130,48 @@ class Veiculo(models.Model):
         help_text="Motorista responsável pelo veículo no momento",
     )
 
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        help_text="Latitude da última posição conhecida",
+    )
+
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        help_text="Longitude da última posição conhecida",
+    )
+
+    geohash = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Geohash da posição (mantido automaticamente; usado nas buscas por proximidade)",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status"], name="veiculo_status_idx"),
+            models.Index(fields=["tipo", "status"], name="veiculo_tipo_status_idx"),
+            models.Index(
+                fields=["status", "geohash"], name="veiculo_status_geohash_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.modelo} ({self.placa})"
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
 
 class Rota(models.Model):
     STATUS_ROTA = (
@@ -130,14 +188,58 @@ class Rota(models.Model):
     nome = models.CharField(max_length=100)
     descricao = models.TextField(null=True, blank=True)
     data_rota = models.DateTimeField(auto_now_add=True)
-    
-    status = models.CharField(
-        max_length=20, choices=STATUS_ROTA, default="planejada"
+
+    status = models.CharField(max_length=20, choices=STATUS_ROTA, default="planejada")
+
+    capacidade_utilizada = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Soma da capacidade das entregas ativas da rota (mantida automaticamente)",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["motorista", "data_rota"], name="rota_motorista_data_idx"
+            ),
+            models.Index(fields=["veiculo", "data_rota"], name="rota_veiculo_data_idx"),
+            models.Index(fields=["data_rota"], name="rota_data_idx"),
+            models.Index(fields=["status", "data_rota"], name="rota_status_data_idx"),
+        ]
+
     def __str__(self):
         return f"{self.nome} - {self.motorista.nome}"
 
+    @staticmethod
+    def _carga_somada(quantidade):
+        # No SQLite o DecimalField vira REAL: sem arredondar para centavos, 0.10 + 0.20
+        # passa de 0.30 e as somas acumulam resíduo (10 x 99.90 = 998.9999999999999).
+        return Round(F("capacidade_utilizada") + quantidade, 2)
+
+    @classmethod
+    def ajustar_capacidade(cls, rota_id, quantidade):
+        atualizadas = cls.objects.filter(pk=rota_id).update(
+            capacidade_utilizada=cls._carga_somada(quantidade)
+        )
+        if atualizadas:
+            capacidade_ajustada.send(cls, rota_id=rota_id, quantidade=quantidade)
+
+    @classmethod
+    def reservar_capacidade(cls, rota_id, quantidade):
+        """
+        Soma `quantidade` à carga da rota somente se couber no veículo.
+        A checagem e o incremento acontecem no mesmo UPDATE condicional.
+        """
+        atualizadas = (
+            cls.objects.alias(carga=cls._carga_somada(quantidade))
+            .filter(pk=rota_id, carga__lte=Round(F("veiculo__capacidade_maxima"), 2))
+            .update(capacidade_utilizada=cls._carga_somada(quantidade))
+        )
+        if atualizadas:
+            capacidade_ajustada.send(cls, rota_id=rota_id, quantidade=quantidade)
+        return atualizadas > 0
+
 
 class Entrega(models.Model):
     STATUS_CHOICES = (
@@ -202,7 +304,7 @@ class Entrega(models.Model):
     )
 
     data_solicitacao = models.DateTimeField(
-        auto_now_add=True, null=True, help_text="Data e hora da solicitação da entrega"
+        auto_now_add=True, help_text="Data e hora da solicitação da entrega"
     )
 
     data_entrega_prevista = models.DateTimeField(
@@ -217,5 +319,399 @@ class Entrega(models.Model):
         blank=True, help_text="Observações adicionais sobre a entrega"
     )
 
+    atualizado_em = models.DateTimeField(
+        auto_now=True, help_text="Data e hora da última alteração (versão da entrega)"
+    )
+
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        help_text="Latitude do endereço de destino",
+    )
+
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        help_text="Longitude do endereço de destino",
+    )
+
+    geohash = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Geohash do destino (mantido automaticamente; usado nas buscas por proximidade)",
+    )
+
+    sequencia = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Ordem de parada na rota (definida por /api/rotas/{id}/otimizar/)",
+    )
+
+    class Meta:
+        # Índices compostos alinhados às consultas de cada perfil (ver get_queryset,
+        # dashboard e validação de capacidade), conferidos em core/tests/test_indices.py.
+        indexes = [
+            models.Index(
+                fields=["motorista", "status"], name="entrega_motorista_status_idx"
+            ),
+            models.Index(
+                fields=["motorista", "data_solicitacao"],
+                name="entrega_motorista_data_idx",
+            ),
+            models.Index(
+                fields=["cliente", "data_solicitacao"], name="entrega_cliente_data_idx"
+            ),
+            models.Index(fields=["rota", "status"], name="entrega_rota_status_idx"),
+            models.Index(
+                fields=["data_solicitacao"], name="entrega_data_solicitacao_idx"
+            ),
+            # Filtros da listagem (core.filters.EntregaFilter).
+            models.Index(
+                fields=["status", "data_solicitacao"], name="entrega_status_data_idx"
+            ),
+            models.Index(fields=["data_entrega_prevista"], name="entrega_prevista_idx"),
+            # Busca por proximidade (core.proximidade): intervalos de geohash por status.
+            # Inclui as coordenadas para o refinamento sair só do índice, sem ler a tabela.
+            models.Index(
+                fields=["status", "geohash", "latitude", "longitude"],
+                name="entrega_status_geohash_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.codigo_rastreio} - {self.status}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Só os valores que o save compara, como estavam no banco.
+        if len(values) == len(cls._meta.concrete_fields):
+            instance._valores_originais = {
+                campo: values[indice] for campo, indice in _INDICES_ORIGINAIS
+            }
+        else:
+            instance._valores_originais = {
+                campo: valor
+                for campo, valor in zip(field_names, values)
+                if campo in CAMPOS_ORIGINAIS
+            }
+        return instance
+
+    @staticmethod
+    def _carga(rota_id, status, capacidade_necessaria):
+        if rota_id is None or status == "cancelada":
+            return Decimal("0")
+        return Decimal(str(capacidade_necessaria)).quantize(Decimal("0.01"))
+
+    @property
+    def carga(self):
+        """Capacidade que a entrega ocupa na rota (entregas canceladas não ocupam)."""
+        return self._carga(self.rota_id, self.status, self.capacidade_necessaria)
+
+    def _estado_carga(self):
+        """(rota_id, carga) conforme os valores carregados, ou None se algum campo foi adiado."""
+        if any(campo not in self.__dict__ for campo in CAMPOS_CARGA):
+            return None
+        return (self.rota_id, self.carga)
+
+    @property
+    def _estado_original(self):
+        """(rota_id, carga) como no banco ao carregar (ou no último save), ou None."""
+        originais = getattr(self, "_valores_originais", {})
+        if any(campo not in originais for campo in CAMPOS_CARGA):
+            return None
+        return (originais["rota_id"], self._carga(*map(originais.get, CAMPOS_CARGA)))
+
+    def _carga_alterada(self):
+        """Se rota, status ou capacidade mudaram desde a carga (ou não dá para saber)."""
+        originais = getattr(self, "_valores_originais", {})
+        return any(
+            campo not in originais
+            or campo not in self.__dict__
+            or getattr(self, campo) != originais[campo]
+            for campo in CAMPOS_CARGA
+        )
+
+    def _estado_original_no_banco(self, using=None):
+        """
+        (rota_id, carga) da linha como está no banco, relida com trava dentro da
+        transação do save. O estado capturado no from_db pode ter ficado velho se outra
+        requisição salvou a mesma entrega no meio tempo, e a diferença aplicada na rota
+        sairia errada. Os valores originais dos indicadores são atualizados junto.
+        """
+        original = (
+            Entrega.objects.using(using or router.db_for_write(Entrega, instance=self))
+            .select_for_update()
+            .filter(pk=self.pk)
+            .first()
+        )
+        if original is None:
+            return (None, Decimal("0"))
+        self._valores_originais = original._valores_originais
+        return self._estado_original
+
+    def _campos_sem_carga(self):
+        """Campos carregados, exceto os que definem a carga na rota."""
+        return [
+            campo.name
+            for campo in self._meta.concrete_fields
+            if not campo.primary_key
+            and campo.attname in self.__dict__
+            and campo.attname not in CAMPOS_CARGA
+        ]
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using")
+        with transaction.atomic(using=using):
+            if self._state.adding or self.pk is None:
+                rota_anterior, carga_anterior = (None, Decimal("0"))
+            elif self._carga_alterada():
+                rota_anterior, carga_anterior = self._estado_original_no_banco(using)
+            else:
+                # Sem mudança de carga, a linha não é relida: rota, status e capacidade
+                # ficam de fora do UPDATE, e o que outra requisição gravou neles vale.
+                rota_anterior, carga_anterior = self._estado_original
+                if kwargs.get("update_fields") is None:
+                    kwargs["update_fields"] = self._campos_sem_carga()
+            if rota_anterior != self.rota_id:
+                # A ordem de parada só vale dentro da rota em que foi calculada.
+                self.sequencia = None
+            self.geohash = geohash(self.latitude, self.longitude)
+            super().save(*args, **kwargs)
+            self._sincronizar_capacidade(rota_anterior, carga_anterior)
+
+        self._valores_originais = {
+            campo: getattr(self, campo)
+            for campo in CAMPOS_ORIGINAIS
+            if campo in self.__dict__
+        }
+
+    def _sincronizar_capacidade(self, rota_anterior, carga_anterior):
+        """Aplica em Rota.capacidade_utilizada a diferença de carga causada por este save."""
+        if rota_anterior == self.rota_id:
+            ajustes = {self.rota_id: self.carga - carga_anterior}
+        else:
+            ajustes = {rota_anterior: -carga_anterior, self.rota_id: self.carga}
+
+        for rota_id, quantidade in ajustes.items():
+            if rota_id is None or not quantidade:
+                continue
+
+            if quantidade < 0:
+                Rota.ajustar_capacidade(rota_id, quantidade)
+            elif not Rota.reservar_capacidade(rota_id, quantidade):
+                raise CapacidadeExcedida(
+                    {
+                        "rota": (
+                            "Capacidade do veículo excedida para esta rota. "
+                            f"Capacidade desta entrega: {self.capacidade_necessaria}."
+                        )
+                    }
+                )
+
+
+# Valores originais guardados por Entrega.from_db: os que definem a carga na rota e os
+# que entram nos indicadores (core.indicadores.CAMPOS_ENTREGA).
+CAMPOS_CARGA = ("rota_id", "status", "capacidade_necessaria")
+CAMPOS_ORIGINAIS = frozenset(
+    CAMPOS_CARGA
+    + (
+        "cliente_id",
+        "motorista_id",
+        "valor_frete",
+        "data_solicitacao",
+        "data_entrega_prevista",
+        "data_entrega_real",
+    )
+)
+_INDICES_ORIGINAIS = [
+    (campo.attname, indice)
+    for indice, campo in enumerate(Entrega._meta.concrete_fields)
+    if campo.attname in CAMPOS_ORIGINAIS
+]
+
+
+class EntregaEvento(models.Model):
+    """
+    Registro append-only das alterações de entregas (ver core/historico.py).
+
+    O id é o cursor do feed /api/entregas/alteracoes/?since=: os apps guardam o último
+    id recebido e buscam só o que veio depois. Os vínculos são desnormalizados e sem
+    chave estrangeira no banco para o evento sobreviver à exclusão da entrega e para o
+    feed de cada perfil sair de um índice, sem JOIN.
+    """
+
+    TIPO_CHOICES = (
+        ("criada", "Criada"),
+        ("status", "Mudança de status"),
+        ("atribuicao", "Atribuição de rota/motorista"),
+        ("edicao", "Edição"),
+        ("removida", "Removida"),
+    )
+
+    entrega = models.ForeignKey(
+        Entrega,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="eventos",
+        help_text="Entrega alterada (o id é mantido mesmo após a exclusão)",
+    )
+
+    codigo_rastreio = models.CharField(max_length=50)
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+
+    alteracoes = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text="Campos alterados no formato {campo: [antes, depois]}",
+    )
+
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+
+    motorista = models.ForeignKey(
+        Motorista,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        related_name="+",
+        help_text="Motorista da entrega após a alteração",
+    )
+
+    motorista_anterior = models.ForeignKey(
+        Motorista,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        related_name="+",
+        help_text="Motorista que deixou a entrega nesta alteração (recebe o evento também)",
+    )
+
+    rota = models.ForeignKey(
+        Rota,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        related_name="+",
+        help_text="Rota da entrega após a alteração",
+    )
+
+    rota_anterior = models.ForeignKey(
+        Rota,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        related_name="+",
+        help_text="Rota que a entrega deixou nesta alteração (stream de eventos da rota)",
+    )
+
+    visivel_cliente = models.BooleanField(
+        default=False, help_text="Altera algum campo que o cliente vê"
+    )
+
+    usuario = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        # Um índice por perfil do feed, terminando no id (cursor).
+        indexes = [
+            models.Index(fields=["motorista", "id"], name="evento_motorista_idx"),
+            models.Index(
+                fields=["motorista_anterior", "id"], name="evento_motorista_ant_idx"
+            ),
+            models.Index(
+                fields=["cliente", "id"],
+                condition=models.Q(visivel_cliente=True),
+                name="evento_cliente_idx",
+            ),
+            models.Index(fields=["rota", "id"], name="evento_rota_idx"),
+            models.Index(fields=["rota_anterior", "id"], name="evento_rota_ant_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.codigo_rastreio} - {self.tipo}"
+
+
+class IndicadorDiario(models.Model):
+    """
+    Totais diários por dimensão (geral, motorista, cliente ou veículo), mantidos de
+    forma incremental a cada alteração de entrega ou rota (core/indicadores.py) e
+    reconstruídos por `reconstruir_indicadores`. O endpoint /api/indicadores/ lê só
+    daqui, sem GROUP BY sobre Entrega.
+
+    Valores e capacidades ficam em centavos (inteiros), para que os incrementos sejam
+    exatos em qualquer banco.
+    """
+
+    DIMENSOES = (
+        ("geral", "Geral"),
+        ("motorista", "Motorista"),
+        ("cliente", "Cliente"),
+        ("veiculo", "Veículo"),
+    )
+
+    dia = models.DateField()
+    dimensao = models.CharField(max_length=20, choices=DIMENSOES)
+    referencia = models.BigIntegerField(
+        default=0, help_text="Id do motorista, cliente ou veículo (0 na dimensão geral)"
+    )
+
+    # Pelo dia da solicitação.
+    solicitadas = models.IntegerField(default=0)
+    canceladas = models.IntegerField(default=0)
+    valor_frete_centavos = models.BigIntegerField(
+        default=0, help_text="Frete das entregas solicitadas no dia, exceto canceladas"
+    )
+
+    # Pelo dia da entrega realizada.
+    entregues = models.IntegerField(default=0)
+    entregues_com_prazo = models.IntegerField(
+        default=0, help_text="Entregues que tinham data_entrega_prevista"
+    )
+    entregues_no_prazo = models.IntegerField(
+        default=0, help_text="Entregues até a data_entrega_prevista"
+    )
+
+    # Pelo dia da rota (não se aplica à dimensão cliente).
+    rotas = models.IntegerField(default=0)
+    capacidade_centavos = models.BigIntegerField(
+        default=0, help_text="Soma da capacidade máxima dos veículos das rotas"
+    )
+    carga_centavos = models.BigIntegerField(
+        default=0, help_text="Soma da capacidade utilizada das rotas"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimensao", "referencia", "dia"], name="indicador_unico"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["dimensao", "dia"], name="indicador_dimensao_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.dimensao}:{self.referencia}"
@@ -0,0 +1,99 @@
+import numpy as np
+
+RAIO_TERRA_KM = 6371.0088
+MAX_PASSADAS_2OPT = 100
+
+
+def matriz_distancias(latitudes, longitudes):
+    """Distâncias de haversine (km) entre todos os pares de pontos, calculadas de uma vez."""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def vizinho_mais_proximo(distancias, inicio=0):
+    """Percurso guloso: a partir de `inicio`, vai sempre ao ponto não visitado mais perto."""
+    n = len(distancias)
+    visitado = np.zeros(n, dtype=bool)
+    ordem = np.empty(n, dtype=int)
+    atual = inicio
+
+    for posicao in range(n):
+        ordem[posicao] = atual
+        visitado[atual] = True
+        if posicao < n - 1:
+            atual = int(np.where(visitado, np.inf, distancias[atual]).argmin())
+    return ordem
+
+
+def dois_opt(distancias, ordem, max_passadas=MAX_PASSADAS_2OPT):
+    """
+    Melhora um percurso aberto (o primeiro ponto é fixo e não há volta) invertendo
+    trechos enquanto isso encurtar o caminho. Para cada início de trecho, o ganho de
+    todos os fins possíveis é calculado de uma vez com NumPy.
+    """
+    ordem = ordem.copy()
+    n = len(ordem)
+
+    for _ in range(max_passadas):
+        melhorou = False
+        for i in range(1, n - 1):
+            a, b = ordem[i - 1], ordem[i]
+            c = ordem[i + 1 :]
+            # Ponto seguinte a cada fim de trecho; o último trecho não tem sucessor.
+            d = np.append(ordem[i + 2 :], -1)
+
+            ganho = distancias[a, c] - distancias[a, b]
+            ganho[:-1] += distancias[b, d[:-1]] - distancias[c[:-1], d[:-1]]
+
+            j = int(ganho.argmin())
+            if ganho[j] < -1e-9:
+                ordem[i : i + j + 2] = ordem[i : i + j + 2][::-1]
+                melhorou = True
+        if not melhorou:
+            break
+    return ordem
+
+
+def comprimento(distancias, ordem):
+    return float(distancias[ordem[:-1], ordem[1:]].sum())
+
+
+def otimizar_sequencia(latitudes, longitudes, origem=None):
+    """
+    Ordena as paradas (vizinho mais próximo + 2-opt) e retorna
+    (índices das paradas na ordem de visita, distância total em km).
+
+    Com `origem` (lat, lon), o percurso parte dela; sem origem, parte da parada mais
+    afastada do centro do conjunto, que tende a ser uma das pontas do trajeto.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    if len(latitudes) == 0:
+        return [], 0.0
+
+    if origem is not None:
+        latitudes = np.concatenate(([origem[0]], latitudes))
+        longitudes = np.concatenate(([origem[1]], longitudes))
+        inicio = 0
+    else:
+        centro = matriz_distancias(
+            np.append(latitudes, latitudes.mean()),
+            np.append(longitudes, longitudes.mean()),
+        )[-1, :-1]
+        inicio = int(centro.argmax())
+
+    distancias = matriz_distancias(latitudes, longitudes)
+    ordem = dois_opt(distancias, vizinho_mais_proximo(distancias, inicio))
+    total = comprimento(distancias, ordem)
+
+    if origem is not None:
+        ordem = ordem[1:] - 1
+    return ordem.tolist(), total
@@ -0,0 +1,73 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class CursorPaginacao(CursorPagination):
+    """
+    Paginação por cursor opaco (keyset) usada por padrão em todas as listagens.
+    Diferente de LIMIT/OFFSET, o custo de cada página é constante, não importa a profundidade.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = "-id"
+
+    def get_ordering(self, request, queryset, view):
+        # O ?ordering= (OrderingFilter) vale só para a listagem principal do viewset; as
+        # ações extras (ex.: /veiculos/{id}/rotas/) listam outro modelo e usam a ordem da paginação.
+        if getattr(view, "action", None) == "list":
+            ordenacao = super().get_ordering(request, queryset, view)
+        elif isinstance(self.ordering, str):
+            ordenacao = (self.ordering,)
+        else:
+            ordenacao = tuple(self.ordering)
+
+        # Desempate pelo id: o cursor precisa de uma ordem total para não pular registros.
+        if not any(campo.lstrip("-") in ("id", "pk") for campo in ordenacao):
+            ordenacao += ("-id" if ordenacao[0].startswith("-") else "id",)
+        return ordenacao
+
+
+class EntregaCursorPaginacao(CursorPaginacao):
+    ordering = ("-data_solicitacao", "-id")
+
+
+class RotaCursorPaginacao(CursorPaginacao):
+    ordering = ("-data_rota", "-id")
+
+
+class BuscaPaginacao(PageNumberPagination):
+    """
+    Resultados de busca vêm ordenados por relevância, que não é uma coluna da tabela;
+    por isso a paginação é por número de página sobre a lista (limitada) de ids ranqueados.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class IndicadoresPaginacao(PageNumberPagination):
+    """Linhas de indicadores são agregadas por dia/referência; a ordem vem da consulta."""
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class AcaoPaginadaMixin:
+    """
+    Permite que as listagens expostas via @action usem a mesma paginação das rotas padrão.
+    """
+
+    def listar_paginado(self, queryset, serializer_class):
+        page = self.paginate_queryset(queryset)
+        context = self.get_serializer_context()
+
+        if page is None:
+            serializer = serializer_class(queryset, many=True, context=context)
+            return Response(serializer.data)
+
+        serializer = serializer_class(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
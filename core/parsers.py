@@ -0,0 +1,25 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Lê um corpo NDJSON (um objeto JSON por linha) como uma lista de objetos."""
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        itens = []
+        for numero, linha in enumerate(stream.read().decode(encoding).splitlines(), 1):
+            if not linha.strip():
+                continue
+            try:
+                itens.append(json.loads(linha))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON inválido na linha {numero}: {exc}")
+        return itens
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+
+RELACOES_PERFIL = ("motorista", "cliente")
+
+
+class Perfil:
+    """
+    Papel do usuário da requisição (gestor, motorista e/ou cliente).
+    Resolvido uma única vez por requisição, com no máximo uma consulta.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_gestor = bool(user and user.is_authenticated and user.is_staff)
+        self.motorista = None
+        self.cliente = None
+
+        if user and user.is_authenticated:
+            carregar_perfis(user)
+            self.motorista = getattr(user, "motorista", None)
+            self.cliente = getattr(user, "cliente", None)
+
+    @property
+    def is_motorista(self):
+        return self.motorista is not None
+
+    @property
+    def is_cliente(self):
+        return self.cliente is not None
+
+
+def carregar_perfis(user):
+    """
+    Preenche o cache das relações reversas user.motorista/user.cliente com um único
+    SELECT ... JOIN, evitando as consultas repetidas de hasattr() quando o perfil não existe.
+    """
+    User = get_user_model()
+    if all(getattr(User, nome).is_cached(user) for nome in RELACOES_PERFIL):
+        return user
+
+    carregado = User.objects.select_related(*RELACOES_PERFIL).get(pk=user.pk)
+    for nome in RELACOES_PERFIL:
+        user._state.fields_cache[nome] = carregado._state.fields_cache.get(nome)
+    return user
+
+
+class PerfilMixin:
+    """Disponibiliza `request.perfil` (carregado sob demanda) em todos os ViewSets."""
+
+    def initialize_request(self, request, *args, **kwargs):
+        request = super().initialize_request(request, *args, **kwargs)
+        request.perfil = SimpleLazyObject(lambda: Perfil(request.user))
+        return request
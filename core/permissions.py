@@ -26,10 +26,10 @@ class IsMotorista(permissions.BasePermission):
         if not (request.user and request.user.is_authenticated):
             return False
 
-        if request.user.is_staff:
+        if request.perfil.is_gestor:
             return True
 
-        if not hasattr(request.user, "motorista"):
+        if not request.perfil.is_motorista:
             return False
 
         if request.method in ["POST", "DELETE"]:
@@ -38,19 +38,21 @@ class IsMotorista(permissions.BasePermission):
         return True
 
     def has_object_permission(self, request, view, obj):
-        if request.user.is_staff:
+        if request.perfil.is_gestor:
             return True
 
-        motorista = request.user.motorista
+        motorista = request.perfil.motorista
+        if motorista is None:
+            return False
 
         if obj == motorista:
             return True
 
-        if getattr(obj, "motorista", None) == motorista:
+        if getattr(obj, "motorista_id", None) == motorista.id:
             return True
 
         rota = getattr(obj, "rota", None)
-        if rota and getattr(rota, "motorista", None) == motorista:
+        if rota and getattr(rota, "motorista_id", None) == motorista.id:
             return True
 
         return False
@@ -67,10 +69,10 @@ class IsCliente(permissions.BasePermission):
         if not (request.user and request.user.is_authenticated):
             return False
 
-        if request.user.is_staff:
+        if request.perfil.is_gestor:
             return True
 
-        if not hasattr(request.user, "cliente"):
+        if not request.perfil.is_cliente:
             return False
 
         if request.method not in permissions.SAFE_METHODS:
@@ -79,13 +81,17 @@ class IsCliente(permissions.BasePermission):
         return True
 
     def has_object_permission(self, request, view, obj):
-        if request.user.is_staff:
+        if request.perfil.is_gestor:
             return True
 
-        if hasattr(obj, "cliente") and obj.cliente == request.user.cliente:
+        cliente = request.perfil.cliente
+        if cliente is None:
+            return False
+
+        if getattr(obj, "cliente_id", None) == cliente.id:
             return True
 
-        if obj == request.user.cliente:
+        if obj == cliente:
             return True
 
-        return False
\ No newline at end of file
+        return False
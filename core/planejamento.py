@@ -0,0 +1,222 @@
+from bisect import bisect_left, insort
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .historico import evento_alteracao, registrar_eventos
+from .indicadores import (
+    CAMPOS_ENTREGA,
+    atualizar_entregas,
+    atualizar_rotas,
+    estado_rota,
+)
+from .models import Entrega, Rota, Veiculo
+
+BATCH_SIZE = 500
+
+
+def empacotar(itens, veiculos):
+    """
+    Distribui itens (chave, peso) entre veículos (chave, capacidade), com pesos e
+    capacidades inteiros, pela heurística best-fit decreasing: do item mais pesado ao
+    mais leve, cada um vai para o veículo já aberto com a menor folga em que cabe; se
+    não couber em nenhum, abre o maior veículo livre.
+
+    Depois, cada carga é trocada pelo menor veículo que a comporta, liberando os
+    maiores. Retorna ({veiculo: [itens]}, [itens não alocados]).
+    """
+    livres = sorted(veiculos, key=lambda veiculo: veiculo[1])
+    capacidade = dict(veiculos)
+    abertos = []  # (folga, veiculo), ordenada pela folga
+    cargas = {}
+    nao_alocados = []
+
+    for chave, peso in sorted(itens, key=lambda item: item[1], reverse=True):
+        posicao = bisect_left(abertos, (peso,))
+        if posicao < len(abertos):
+            folga, veiculo = abertos.pop(posicao)
+        elif livres and livres[-1][1] >= peso:
+            veiculo, folga = livres.pop()
+            cargas[veiculo] = []
+        else:
+            nao_alocados.append(chave)
+            continue
+
+        cargas[veiculo].append((chave, peso))
+        insort(abertos, (folga - peso, veiculo))
+
+    # Troca pelo menor veículo suficiente, da carga mais pesada para a mais leve.
+    disponiveis = sorted((capacidade[veiculo], veiculo) for veiculo in capacidade)
+    por_peso = sorted(
+        cargas.values(), key=lambda carga: sum(peso for _, peso in carga), reverse=True
+    )
+    resultado = {}
+    for carga in por_peso:
+        total = sum(peso for _, peso in carga)
+        _, veiculo = disponiveis.pop(bisect_left(disponiveis, (total,)))
+        resultado[veiculo] = [chave for chave, _ in carga]
+
+    return resultado, nao_alocados
+
+
+def _centavos(valor):
+    return int(valor * 100)
+
+
+def _evento_atribuicao(entrega, estado, rota, usuario):
+    antes = {"rota": None, "motorista": estado["motorista_id"]}
+    atribuida = Entrega(
+        pk=entrega["id"],
+        codigo_rastreio=entrega["codigo_rastreio"],
+        cliente_id=estado["cliente_id"],
+        rota_id=rota.pk,
+        motorista_id=rota.motorista_id,
+    )
+    return evento_alteracao(atribuida, antes, usuario)
+
+
+def veiculos_livres(travar=False):
+    """
+    Veículos disponíveis, com motorista ativo e sem rota em aberto. Com `travar`, as
+    linhas ficam travadas até o fim da transação e as já travadas por outro
+    planejamento são puladas: dois planejamentos simultâneos não criam rotas para o
+    mesmo veículo.
+    """
+    veiculos = (
+        Veiculo.objects.select_related("motorista")
+        .filter(status="DISPONIVEL", motorista__isnull=False)
+        .exclude(motorista__status="inativo")
+        .exclude(rotas__status__in=["planejada", "em_andamento"])
+    )
+    if travar:
+        veiculos = veiculos.select_for_update(skip_locked=True, of=("self",))
+    return veiculos
+
+
+def planejar_rotas(simular=False, usuario=None):
+    """
+    Monta rotas para as entregas pendentes sem rota usando os veículos disponíveis
+    com motorista ativo e sem rota em aberto. Com `simular`, só devolve o plano.
+
+    Tudo é feito numa transação, com os veículos escolhidos travados (veiculos_livres):
+    as rotas com bulk_create e as entregas com um UPDATE por lote de ids que só pega as
+    que continuam pendentes e sem rota; se alguma mudou no meio do caminho, nada é
+    gravado. Cada entrega atribuída ganha um evento
+    de atribuição no log (core/historico.py), e os indicadores são atualizados.
+    """
+    with transaction.atomic():
+        veiculos = {
+            veiculo.id: veiculo for veiculo in veiculos_livres(travar=not simular)
+        }
+        entregas = {
+            entrega["id"]: entrega
+            for entrega in Entrega.objects.filter(
+                status="pendente", rota__isnull=True
+            ).values("id", "codigo_rastreio", "capacidade_necessaria")
+        }
+
+        cargas, nao_alocadas = empacotar(
+            [
+                (id, _centavos(entrega["capacidade_necessaria"]))
+                for id, entrega in entregas.items()
+            ],
+            [
+                (id, _centavos(veiculo.capacidade_maxima))
+                for id, veiculo in veiculos.items()
+            ],
+        )
+
+        hoje = timezone.localdate()
+        planos = []
+        for veiculo_id, ids in cargas.items():
+            veiculo = veiculos[veiculo_id]
+            planos.append(
+                {
+                    "rota": Rota(
+                        motorista=veiculo.motorista,
+                        veiculo=veiculo,
+                        nome=f"Planejada {hoje:%d/%m/%Y} - {veiculo.placa}",
+                        status="planejada",
+                        capacidade_utilizada=sum(
+                            entregas[id]["capacidade_necessaria"] for id in ids
+                        ),
+                    ),
+                    "entregas": sorted(ids),
+                }
+            )
+
+        if simular:
+            return _resultado(simular, planos, entregas, nao_alocadas, veiculos)
+
+        Rota.objects.bulk_create([plano["rota"] for plano in planos])
+
+        agora = timezone.now()
+        eventos = []
+        alteracoes_indicadores = []
+        for plano in planos:
+            rota, ids = plano["rota"], plano["entregas"]
+            for inicio in range(0, len(ids), BATCH_SIZE):
+                lote = ids[inicio : inicio + BATCH_SIZE]
+                # Estado completo só das entregas atribuídas, para o log e os
+                # indicadores; o empacotamento precisa apenas da capacidade.
+                estados = {
+                    estado.pop("id"): estado
+                    for estado in Entrega.objects.filter(id__in=lote).values(
+                        "id", *CAMPOS_ENTREGA
+                    )
+                }
+                atualizadas = Entrega.objects.filter(
+                    id__in=lote, status="pendente", rota__isnull=True
+                ).update(
+                    rota=rota,
+                    motorista=rota.motorista_id,
+                    sequencia=None,
+                    atualizado_em=agora,
+                )
+                if atualizadas != len(lote):
+                    raise ValidationError(
+                        {
+                            "entregas": "Entregas foram alteradas durante o "
+                            "planejamento. Tente novamente."
+                        }
+                    )
+                for id in lote:
+                    antes = estados[id]
+                    eventos.append(
+                        _evento_atribuicao(entregas[id], antes, rota, usuario)
+                    )
+                    depois = {
+                        **antes,
+                        "rota_id": rota.pk,
+                        "motorista_id": rota.motorista_id,
+                    }
+                    alteracoes_indicadores.append((antes, depois))
+
+        registrar_eventos(eventos)
+        atualizar_rotas([(None, estado_rota(plano["rota"])) for plano in planos])
+        atualizar_entregas(alteracoes_indicadores)
+
+    return _resultado(simular, planos, entregas, nao_alocadas, veiculos)
+
+
+def _resultado(simular, planos, entregas, nao_alocadas, veiculos):
+    return {
+        "simulacao": simular,
+        "rotas": [
+            {
+                "id": plano["rota"].pk,
+                "veiculo": plano["rota"].veiculo_id,
+                "placa": plano["rota"].veiculo.placa,
+                "motorista": plano["rota"].motorista_id,
+                "capacidade_maxima": plano["rota"].veiculo.capacidade_maxima,
+                "capacidade_utilizada": plano["rota"].capacidade_utilizada,
+                "entregas": [
+                    entregas[id]["codigo_rastreio"] for id in plano["entregas"]
+                ],
+            }
+            for plano in planos
+        ],
+        "nao_alocadas": sorted(entregas[id]["codigo_rastreio"] for id in nao_alocadas),
+        "veiculos_sem_uso": len(veiculos) - len(planos),
+    }
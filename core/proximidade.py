@@ -0,0 +1,163 @@
+"""
+Consultas de proximidade sem extensão espacial no banco.
+
+Cada entrega/veículo com coordenadas guarda o geohash do ponto (coluna indexada). A
+busca cobre o círculo com as células de geohash do retângulo envolvente, filtra o
+banco por intervalos de prefixo (range scan no índice) e refina os candidatos com a
+distância de haversine exata calculada de uma vez com numpy.
+"""
+
+import math
+
+import numpy as np
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+
+from .otimizacao import RAIO_TERRA_KM
+
+ALFABETO = "0123456789bcdefghjkmnpqrstuvwxyz"
+# ~5 m de lado: o suficiente para qualquer raio de busca útil.
+PRECISAO = 9
+# Limite de células por busca; acima disso usa-se uma precisão mais grossa.
+MAX_CELULAS = 128
+KM_POR_GRAU = math.pi * RAIO_TERRA_KM / 180
+
+
+def geohash(latitude, longitude, precisao=PRECISAO):
+    """Geohash do ponto, ou None se faltar alguma coordenada."""
+    if latitude is None or longitude is None:
+        return None
+
+    intervalos = ([-90.0, 90.0], [-180.0, 180.0])
+    valores = (float(latitude), float(longitude))
+    caracteres = []
+    bit, indice, longitude_da_vez = 0, 0, True
+    while len(caracteres) < precisao:
+        eixo = 1 if longitude_da_vez else 0
+        intervalo, valor = intervalos[eixo], valores[eixo]
+        meio = (intervalo[0] + intervalo[1]) / 2
+        if valor >= meio:
+            indice = indice * 2 + 1
+            intervalo[0] = meio
+        else:
+            indice *= 2
+            intervalo[1] = meio
+        longitude_da_vez = not longitude_da_vez
+
+        bit += 1
+        if bit == 5:
+            caracteres.append(ALFABETO[indice])
+            bit, indice = 0, 0
+    return "".join(caracteres)
+
+
+def _tamanho_celula(precisao):
+    """(altura, largura) em graus de uma célula com a precisão informada."""
+    bits = 5 * precisao
+    return 180 / 2 ** (bits // 2), 360 / 2 ** (bits - bits // 2)
+
+
+def _sucessor(prefixo):
+    """Menor geohash do mesmo tamanho maior que `prefixo` (None se não houver)."""
+    caracteres = list(prefixo)
+    for posicao in range(len(caracteres) - 1, -1, -1):
+        indice = ALFABETO.index(caracteres[posicao])
+        if indice < len(ALFABETO) - 1:
+            caracteres[posicao] = ALFABETO[indice + 1]
+            return "".join(caracteres[: posicao + 1])
+        # "z" volta a "0" e o "vai um" segue para a posição anterior.
+    return None
+
+
+def celulas(latitude, longitude, raio_km):
+    """Células de geohash que cobrem o círculo, na precisão mais fina com até MAX_CELULAS."""
+    dlat = raio_km / KM_POR_GRAU
+    cos_lat = math.cos(math.radians(min(abs(latitude) + dlat, 89.9)))
+    dlon = min(raio_km / (KM_POR_GRAU * cos_lat), 180.0)
+    lat_min, lat_max = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    lon_min, lon_max = longitude - dlon, longitude + dlon
+
+    for precisao in range(PRECISAO, 0, -1):
+        altura, largura = _tamanho_celula(precisao)
+        # Índices das células (linha, coluna) que o retângulo envolvente toca.
+        linhas = range(
+            math.floor((lat_min + 90) / altura),
+            min(math.floor((lat_max + 90) / altura), round(180 / altura) - 1) + 1,
+        )
+        colunas = range(
+            math.floor(lon_min / largura), math.floor(lon_max / largura) + 1
+        )
+        if len(linhas) * len(colunas) <= MAX_CELULAS or precisao == 1:
+            break
+
+    encontradas = set()
+    for linha in linhas:
+        lat = (linha + 0.5) * altura - 90
+        for coluna in colunas:
+            # Fora de [-180, 180) a busca continua do outro lado do antimeridiano.
+            lon = ((coluna + 0.5) * largura + 180) % 360 - 180
+            encontradas.add(geohash(lat, lon, precisao))
+    return sorted(encontradas)
+
+
+def filtro_celulas(prefixos, campo="geohash"):
+    """
+    Q com um intervalo [prefixo, sucessor) por grupo de células vizinhas na ordem do
+    geohash, para o banco resolver com range scans no índice (LIKE 'abc%' não usa
+    índice no SQLite).
+    """
+    intervalos = []
+    for prefixo in sorted(prefixos):
+        fim = _sucessor(prefixo)
+        if intervalos and intervalos[-1][1] == prefixo:
+            intervalos[-1][1] = fim
+        else:
+            intervalos.append([prefixo, fim])
+
+    filtro = Q()
+    for inicio, fim in intervalos:
+        intervalo = Q(**{f"{campo}__gte": inicio})
+        if fim is not None:
+            intervalo &= Q(**{f"{campo}__lt": fim})
+        filtro |= intervalo
+    return filtro
+
+
+def distancias_km(latitude, longitude, latitudes, longitudes):
+    """Distâncias de haversine (km) do ponto a cada um dos pontos, calculadas de uma vez."""
+    lat0, lon0 = math.radians(latitude), math.radians(longitude)
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+
+    a = (
+        np.sin((lat - lat0) / 2) ** 2
+        + math.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def buscar_proximos(queryset, latitude, longitude, raio_km, limite):
+    """
+    [(id, distancia_km)] dos registros do queryset a até `raio_km` do ponto, do mais
+    próximo para o mais distante. O modelo precisa ter latitude, longitude e geohash.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    # Coordenadas lidas como float: converter milhares de Decimals custa mais que a
+    # consulta, e a distância é calculada em float de qualquer forma.
+    candidatos = list(
+        queryset.filter(filtro_celulas(celulas(latitude, longitude, raio_km)))
+        .order_by()
+        .values_list(
+            "id", Cast("latitude", FloatField()), Cast("longitude", FloatField())
+        )
+    )
+    if not candidatos:
+        return []
+
+    ids, latitudes, longitudes = zip(*candidatos)
+    distancias = distancias_km(latitude, longitude, latitudes, longitudes)
+    dentro = np.flatnonzero(distancias <= raio_km)
+    if len(dentro) > limite:
+        dentro = dentro[np.argpartition(distancias[dentro], limite - 1)[:limite]]
+    dentro = dentro[np.argsort(distancias[dentro], kind="stable")]
+    return [(ids[i], float(distancias[i])) for i in dentro]
@@ -0,0 +1,34 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+from .serializacao import PaginaRapida, Registros
+
+_SEPARADORES_JS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """
+    JSONRenderer que entrega ao orjson as respostas montadas pela leitura rápida
+    (core.serializacao), marcadas como Registros ou PaginaRapida, com os mesmos bytes
+    do JSONRenderer padrão. O resto (floats, Decimals, indentação pedida no Accept...)
+    segue pelo json do DRF, porque o orjson formata alguns valores de outro jeito.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or not isinstance(data, (Registros, PaginaRapida))
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            # Inteiros acima de 64 bits, surrogates soltos...
+            return super().render(data, accepted_media_type, renderer_context)
+        # Como no JSONRenderer: U+2028/U+2029 escapados, JSON válido como JavaScript.
+        for original, escapado in _SEPARADORES_JS:
+            ret = ret.replace(original, escapado)
+        return ret
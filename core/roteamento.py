@@ -0,0 +1,181 @@
+"""
+Leituras na réplica (settings.DATABASE_ROUTERS) para as requisições que só consultam.
+
+O ReplicaLeituraMiddleware decide, por requisição, se as leituras do ORM podem ir para
+o banco `settings.REPLICA_BANCO`:
+
+- só métodos seguros (GET/HEAD/OPTIONS); escritas e tudo o que elas leem ficam no
+  primário;
+- não depois de uma escrita do mesmo cliente (mesmo token/sessão) nos últimos
+  `REPLICA_JANELA_CONSISTENCIA` segundos, para ele enxergar o que acabou de gravar
+  mesmo com a réplica atrasada;
+- não nas views marcadas com `usar_replica = False` (atributo do ViewSet, kwarg de
+  @action ou o decorator somente_primario), para caminhos que precisam de leitura
+  consistente.
+
+A decisão fica numa ContextVar, que vale tanto na thread da requisição quanto no ORM
+assíncrono, e é desfeita ao fim da requisição (escopo_leitura). As respostas em
+streaming, geradas depois disso, recebem a mesma decisão a cada parte
+(preservar_leitura).
+
+As marcas de escrita recente ficam no cache do Django: com vários workers, ele precisa
+ser compartilhado (CACHE_REDIS_URL) para a marca valer em qualquer um deles.
+"""
+
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import (
+    amarcar_escrita_recente,
+    escrita_recente,
+    marcar_escrita_recente,
+)
+
+REPLICA_BANCO = getattr(settings, "REPLICA_BANCO", "replica")
+METODOS_SEGUROS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Credenciais recém-criadas (login, token novo) têm de valer já na próxima requisição.
+SEMPRE_NO_PRIMARIO = frozenset({"authtoken.token", "sessions.session"})
+
+_ler_da_replica = ContextVar("ler_da_replica", default=False)
+
+
+def replica_configurada():
+    return REPLICA_BANCO in settings.DATABASES
+
+
+def somente_primario(view):
+    """Mantém as leituras da view (função) no primário."""
+    view.usar_replica = False
+    return view
+
+
+def view_usa_replica(view_func):
+    """Opt-out da @action (initkwargs), da própria função ou da classe do ViewSet."""
+    initkwargs = getattr(view_func, "initkwargs", None) or {}
+    if "usar_replica" in initkwargs:
+        return initkwargs["usar_replica"]
+    if hasattr(view_func, "usar_replica"):
+        return view_func.usar_replica
+    return getattr(getattr(view_func, "cls", None), "usar_replica", True)
+
+
+def identificar_cliente(request):
+    """Hash da credencial (token ou cookie de sessão) que identifica o cliente, ou None."""
+    credencial = request.headers.get("Authorization") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not credencial:
+        return None
+    return hashlib.sha256(credencial.encode()).hexdigest()
+
+
+def lendo_da_replica():
+    return _ler_da_replica.get()
+
+
+@contextmanager
+def escopo_leitura(valor=False):
+    """Define a leitura dentro do bloco e restaura o valor anterior ao sair."""
+    token = _ler_da_replica.set(valor)
+    try:
+        yield
+    finally:
+        _ler_da_replica.reset(token)
+
+
+def definir_leitura(request, view_func):
+    """Escolhe o banco de leitura da requisição (dentro de um escopo_leitura)."""
+    if not (
+        replica_configurada()
+        and request.method in METODOS_SEGUROS
+        and view_usa_replica(view_func)
+    ):
+        _ler_da_replica.set(False)
+        return
+    cliente = identificar_cliente(request)
+    _ler_da_replica.set(not (cliente and escrita_recente(cliente)))
+
+
+def preservar_leitura(response):
+    """
+    O conteúdo de uma resposta em streaming é gerado depois que o escopo da requisição
+    terminou; cada parte é gerada de novo com a leitura da réplica ligada.
+    """
+    if not (response.streaming and lendo_da_replica()):
+        return
+    if response.is_async:
+        response.streaming_content = _partes_async(response.streaming_content)
+    else:
+        response.streaming_content = _partes(response.streaming_content)
+
+
+def _partes(conteudo):
+    # O escopo vale só durante cada next(): entre as partes, quem itera pode estar em
+    # outro contexto (thread do servidor, sync_to_async).
+    iterador = iter(conteudo)
+    while True:
+        with escopo_leitura(True):
+            parte = next(iterador, None)
+        if parte is None:
+            return
+        yield parte
+
+
+async def _partes_async(conteudo):
+    iterador = aiter(conteudo)
+    while True:
+        with escopo_leitura(True):
+            parte = await anext(iterador, None)
+        if parte is None:
+            return
+        yield parte
+
+
+def _cliente_que_escreveu(request, response):
+    if (
+        replica_configurada()
+        and request.method not in METODOS_SEGUROS
+        and response.status_code < 400
+    ):
+        return identificar_cliente(request)
+    return None
+
+
+def registrar_escrita(request, response):
+    """Após uma escrita bem-sucedida, o cliente lê do primário durante a janela."""
+    if cliente := _cliente_que_escreveu(request, response):
+        marcar_escrita_recente(cliente)
+
+
+async def aregistrar_escrita(request, response):
+    if cliente := _cliente_que_escreveu(request, response):
+        await amarcar_escrita_recente(cliente)
+
+
+class RoteadorReplica:
+    """Leituras na réplica quando a requisição permite (definir_leitura); escritas no primário."""
+
+    def db_for_read(self, model, **hints):
+        if _ler_da_replica.get() and model._meta.label_lower not in SEMPRE_NO_PRIMARIO:
+            return REPLICA_BANCO
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Mesmo objetos lidos da réplica são gravados no primário.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {DEFAULT_DB_ALIAS, REPLICA_BANCO}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o esquema pela replicação (ou por sincronizar_replica).
+        if db == REPLICA_BANCO:
+            return False
+        return None
@@ -0,0 +1,229 @@
+"""
+Caminho rápido de leitura para listagens grandes.
+
+O ModelSerializer monta cada objeto campo a campo (to_representation de cada campo,
+com as conversões de DecimalField e DateTimeField refeitas a cada valor). Aqui o
+serializer só é consultado uma vez para montar um plano: para cada campo, a coluna
+do model e um conversor pré-compilado que reproduz exatamente o to_representation do
+campo. As linhas vêm do banco como tuplas (values_list) e são convertidas coluna a
+coluna, sem instanciar models.
+
+Campos sem conversor conhecido (SerializerMethodField, propriedades, formatos
+personalizados...) fazem o plano não ser montado, e a view volta para o serializer.
+"""
+
+from decimal import Decimal, getcontext
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from .filters import colunas_ordenacao
+
+
+class Registros(list):
+    """
+    Registros montados pela LeituraRapida: dicts só com str, int, bool e None, que o
+    JSONRapidoRenderer pode entregar ao orjson sem mudar um byte da saída.
+    """
+
+
+class PaginaRapida(dict):
+    """
+    Envelope da paginação em volta de Registros (links e contagem), marcado pela
+    ListagemRapidaMixin para o JSONRapidoRenderer.
+    """
+
+
+def _conversor_datetime(campo):
+    formato = getattr(campo, "format", api_settings.DATETIME_FORMAT)
+    if formato is None or formato.lower() != ISO_8601:
+        return False
+    fuso = campo.timezone if hasattr(campo, "timezone") else campo.default_timezone()
+    if fuso is None:
+        return False
+
+    def converter(valor):
+        texto = valor.astimezone(fuso).isoformat()
+        return texto[:-6] + "Z" if texto.endswith("+00:00") else texto
+
+    return converter
+
+
+def _conversor_date(campo):
+    formato = getattr(campo, "format", api_settings.DATE_FORMAT)
+    if formato is None or formato.lower() != ISO_8601:
+        return False
+    return lambda valor: valor.isoformat()
+
+
+def _conversor_decimal(campo):
+    como_texto = getattr(
+        campo, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if not como_texto or campo.localize or campo.normalize_output:
+        return False
+    if campo.decimal_places is None:
+        return lambda valor: f"{valor:f}"
+
+    # O mesmo quantize de DecimalField.quantize, com o expoente e o contexto prontos.
+    expoente = Decimal(".1") ** campo.decimal_places
+    contexto = getcontext().copy()
+    if campo.max_digits is not None:
+        contexto.prec = campo.max_digits
+    arredondamento = campo.rounding
+
+    def converter(valor):
+        return (
+            f"{valor.quantize(expoente, rounding=arredondamento, context=contexto):f}"
+        )
+
+    return converter
+
+
+def _conversor_choice(campo):
+    mapa = campo.choice_strings_to_values
+    if all(chave == valor for chave, valor in mapa.items()):
+        return None
+    return lambda valor: mapa.get(str(valor), valor)
+
+
+# Na ordem de verificação: subclasses antes das classes-base. None = valor já está
+# na forma final; False = campo sem caminho rápido.
+CONVERSORES = [
+    (serializers.ReadOnlyField, lambda campo: None),
+    (
+        serializers.PrimaryKeyRelatedField,
+        lambda campo: None if campo.pk_field is None else False,
+    ),
+    (serializers.DateTimeField, _conversor_datetime),
+    (serializers.DateField, _conversor_date),
+    (serializers.DecimalField, _conversor_decimal),
+    (serializers.ChoiceField, _conversor_choice),
+    (serializers.BooleanField, lambda campo: bool),
+    (serializers.IntegerField, lambda campo: int),
+    (serializers.CharField, lambda campo: str),
+]
+# Classes que, com to_representation próprio, não podem usar o conversor da base.
+CLASSES_CONHECIDAS = {classe for classe, _ in CONVERSORES} | {
+    serializers.EmailField,
+    serializers.SlugField,
+    serializers.URLField,
+}
+
+
+def conversor(campo):
+    """Conversor equivalente ao to_representation do campo (None: identidade; False: sem)."""
+    if type(campo) not in CLASSES_CONHECIDAS:
+        return False
+    for classe, fabrica in CONVERSORES:
+        if isinstance(campo, classe):
+            return fabrica(campo)
+    return False
+
+
+class LeituraRapida:
+    """Plano de leitura de um serializer: colunas a buscar e conversor de cada campo."""
+
+    def __init__(self, campos):
+        # campos: [(nome na saída, coluna do model, conversor)]
+        self.nomes = tuple(nome for nome, _, _ in campos)
+        self.colunas = list(dict.fromkeys(coluna for _, coluna, _ in campos))
+        self.conversores = [
+            (self.colunas.index(coluna), conversor_) for _, coluna, conversor_ in campos
+        ]
+
+    @classmethod
+    def do_serializer(cls, serializer, nomes=None):
+        """
+        Plano para os campos do serializer (ou só os `nomes`, nessa ordem), ou None se
+        algum deles não tiver caminho rápido.
+        """
+        if (
+            type(serializer).to_representation
+            is not serializers.ModelSerializer.to_representation
+        ):
+            return None
+
+        model = serializer.Meta.model
+        campos = []
+        for nome in nomes or serializer.fields:
+            campo = serializer.fields[nome]
+            if campo.write_only:
+                continue
+            if campo.source == "*" or "." in campo.source:
+                return None
+            try:
+                campo_model = model._meta.get_field(campo.source)
+            except FieldDoesNotExist:
+                return None
+            conversor_ = conversor(campo)
+            if conversor_ is False or not campo_model.concrete:
+                return None
+            campos.append((nome, campo_model.name, conversor_))
+        return cls(campos)
+
+    def converter_colunas(self, linhas):
+        """Colunas de saída já convertidas, a partir das tuplas na ordem de self.colunas."""
+        colunas = list(zip(*linhas)) or [()] * len(self.colunas)
+        saida = []
+        for indice, conversor_ in self.conversores:
+            coluna = colunas[indice]
+            if conversor_ is not None:
+                coluna = [
+                    None if valor is None else conversor_(valor) for valor in coluna
+                ]
+            saida.append(coluna)
+        return saida
+
+    def valores(self, linhas):
+        """Listas de valores convertidos, na ordem de self.nomes (ex.: linhas de CSV)."""
+        if not self.nomes:
+            return [() for _ in linhas]
+        return list(zip(*self.converter_colunas(linhas)))
+
+    def registros(self, linhas):
+        """Mesmos dicts que serializer.data produziria para essas linhas."""
+        nomes = self.nomes
+        if not nomes:
+            # Tudo omitido com ?fields=/?omit=: um objeto vazio por registro.
+            return Registros({} for _ in linhas)
+        return Registros(
+            dict(zip(nomes, valores))
+            for valores in zip(*self.converter_colunas(linhas))
+        )
+
+
+class ListagemRapidaMixin:
+    """
+    A ação list monta a resposta com a LeituraRapida quando o serializer permite,
+    com a mesma paginação, filtros e ?fields=/?omit= da listagem padrão.
+    """
+
+    leitura_rapida = True
+
+    def list(self, request, *args, **kwargs):
+        leitura = (
+            LeituraRapida.do_serializer(self.get_serializer())
+            if self.leitura_rapida
+            else None
+        )
+        if leitura is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # O cursor da paginação lê as colunas da ordenação em cada linha (namedtuple).
+        colunas = leitura.colunas + [
+            coluna
+            for coluna in colunas_ordenacao(request, queryset, self)
+            if coluna not in leitura.colunas
+        ]
+        linhas = queryset.values_list(*colunas, named=True)
+
+        pagina = self.paginate_queryset(linhas)
+        if pagina is not None:
+            resposta = self.get_paginated_response(leitura.registros(pagina))
+            resposta.data = PaginaRapida(resposta.data)
+            return resposta
+        return Response(leitura.registros(linhas))
@@ -1,34 +1,90 @@
-from decimal import Decimal
+from datetime import timedelta
 
-from django.db.models import Sum
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Cliente, Motorista, Rota, Entrega, Veiculo
+from rest_framework.permissions import SAFE_METHODS
+from .models import (
+    Cliente,
+    Motorista,
+    Rota,
+    Entrega,
+    EntregaEvento,
+    IndicadorDiario,
+    Veiculo,
+)
 
 
-class ClienteSerializer(serializers.ModelSerializer):
+PARAMETRO_CAMPOS = "fields"
+PARAMETRO_OMITIR = "omit"
+
+
+def lista_de_campos(valor):
+    return {campo.strip() for campo in valor.split(",") if campo.strip()}
+
+
+class CamposSelecionaveisMixin:
+    """
+    Em leituras (GET/HEAD), `?fields=a,b` devolve só esses campos e `?omit=c` remove
+    campos. Os campos do próprio serializer são o limite: o que ele não expõe (ex.: na
+    versão restrita do cliente) não pode ser pedido. O SelecaoCamposFilter usa os
+    campos que sobraram para carregar só as colunas correspondentes (.only()).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        pedidos = lista_de_campos(request.query_params.get(PARAMETRO_CAMPOS, ""))
+        omitidos = lista_de_campos(request.query_params.get(PARAMETRO_OMITIR, ""))
+        if not pedidos and not omitidos:
+            return
+
+        disponiveis = set(self.fields)
+        erros = {}
+        for parametro, campos in (
+            (PARAMETRO_CAMPOS, pedidos),
+            (PARAMETRO_OMITIR, omitidos),
+        ):
+            invalidos = campos - disponiveis
+            if invalidos:
+                erros[parametro] = (
+                    f"Campos inválidos: {', '.join(sorted(invalidos))}. "
+                    f"Disponíveis: {', '.join(self.fields)}."
+                )
+        if erros:
+            raise serializers.ValidationError(erros)
+
+        manter = (pedidos or disponiveis) - omitidos
+        for campo in disponiveis - manter:
+            self.fields.pop(campo)
+
+
+class ClienteSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = ["id", "nome", "endereco", "telefone"]
         read_only_fields = ["user"]
 
 
-class MotoristaSerializer(serializers.ModelSerializer):
+class MotoristaSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
     class Meta:
         model = Motorista
         fields = ["id", "nome", "cpf", "cnh", "telefone", "status"]
 
 
-class VeiculoSerializer(serializers.ModelSerializer):
+class VeiculoSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
     class Meta:
         model = Veiculo
         fields = "__all__"
 
 
-class EntregaSerializer(serializers.ModelSerializer):
+class EntregaSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
     class Meta:
         model = Entrega
         fields = "__all__"
-        read_only_fields = ["data_solicitacao"]
+        read_only_fields = ["data_solicitacao", "sequencia"]
 
     def validate(self, attrs):
         """Impede associar/alterar entregas em rotas que excedam a capacidade do veículo."""
@@ -43,14 +99,18 @@ class EntregaSerializer(serializers.ModelSerializer):
         if capacidade_necessaria is None and instance is not None:
             capacidade_necessaria = instance.capacidade_necessaria
 
-        if rota is None or capacidade_necessaria is None:
-            return attrs
+        status = attrs.get("status")
+        if status is None and instance is not None:
+            status = instance.status
 
-        qs = Entrega.objects.filter(rota=rota)
-        if instance is not None and instance.pk:
-            qs = qs.exclude(pk=instance.pk)
+        if rota is None or capacidade_necessaria is None or status == "cancelada":
+            return attrs
 
-        capacidade_atual = qs.aggregate(total=Sum("capacidade_necessaria")).get("total") or Decimal("0")
+        # Pré-checagem O(1) para uma mensagem amigável; a garantia atômica fica no
+        # UPDATE condicional feito por Entrega.save().
+        capacidade_atual = rota.capacidade_utilizada
+        if instance is not None and instance.pk and instance.rota_id == rota.id:
+            capacidade_atual -= instance.carga
         capacidade_maxima = rota.veiculo.capacidade_maxima
 
         if capacidade_atual + capacidade_necessaria > capacidade_maxima:
@@ -68,6 +128,22 @@ class EntregaSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class EntregaLoteItemSerializer(serializers.ModelSerializer):
+    """
+    Item da criação em lote. Relações e unicidade do código são checadas de uma vez
+    para o lote inteiro (ver core/lote.py), por isso aqui são campos simples.
+    """
+
+    codigo_rastreio = serializers.CharField(max_length=50)
+    cliente = serializers.IntegerField()
+    rota = serializers.IntegerField(required=False, allow_null=True)
+    motorista = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Entrega
+        exclude = ["id", "data_solicitacao", "atualizado_em", "sequencia"]
+
+
 class EntregaMotoristaUpdateSerializer(serializers.ModelSerializer):
     """Serializer restrito para motorista: permite alterar apenas status/observações."""
 
@@ -76,22 +152,30 @@ class EntregaMotoristaUpdateSerializer(serializers.ModelSerializer):
         fields = ["status", "observacoes"]
 
 
-class RotaSerializer(serializers.ModelSerializer):
+class RotaSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
     class Meta:
         model = Rota
         fields = "__all__"
-        read_only_fields = ["data_rota"]
+        read_only_fields = ["data_rota", "capacidade_utilizada"]
 
-class EntregaClienteSerializer(serializers.ModelSerializer):
+
+class EntregaClienteSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
     """
     Serializer restrito para visão do Cliente.
     Mostra apenas identificação, status e previsão.
     """
+
     class Meta:
         model = Entrega
         fields = ["codigo_rastreio", "status", "data_entrega_prevista"]
 
 
+# Campos de entrega cujas alterações o cliente recebe no feed de alterações.
+CAMPOS_ENTREGA_CLIENTE = frozenset(EntregaClienteSerializer.Meta.fields) - {
+    "codigo_rastreio"
+}
+
+
 class AtribuirVeiculoRequestSerializer(serializers.Serializer):
     veiculo = serializers.IntegerField(help_text="ID do veículo a ser vinculado")
 
@@ -108,19 +192,279 @@ class AtribuirEntregasRotaRequestSerializer(serializers.Serializer):
     )
 
 
-class MensagemResponseSerializer(serializers.Serializer):
-    mensagem = serializers.CharField()
+class OtimizarRotaRequestSerializer(serializers.Serializer):
+    origem_latitude = serializers.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        min_value=-90,
+        max_value=90,
+        required=False,
+        help_text="Latitude do ponto de partida (ex.: depósito). Opcional.",
+    )
+    origem_longitude = serializers.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        min_value=-180,
+        max_value=180,
+        required=False,
+        help_text="Longitude do ponto de partida (ex.: depósito). Opcional.",
+    )
+
+    def validate(self, attrs):
+        if ("origem_latitude" in attrs) != ("origem_longitude" in attrs):
+            raise serializers.ValidationError(
+                "Informe origem_latitude e origem_longitude juntas."
+            )
+        return attrs
+
+
+class OtimizarRotaResponseSerializer(serializers.Serializer):
+    rota = serializers.IntegerField()
+    paradas = serializers.IntegerField(help_text="Entregas ordenadas pelo otimizador")
+    distancia_km = serializers.FloatField(help_text="Distância estimada do percurso")
+    sequencia = serializers.ListField(
+        child=serializers.CharField(),
+        help_text="Códigos de rastreio na ordem de visita",
+    )
+    sem_coordenadas = serializers.ListField(
+        child=serializers.CharField(),
+        help_text="Entregas sem latitude/longitude, colocadas ao final da sequência",
+    )
+
+
+class ProximidadeParamsSerializer(serializers.Serializer):
+    latitude = serializers.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        min_value=-90,
+        max_value=90,
+        help_text="Latitude do ponto de referência",
+    )
+    longitude = serializers.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        min_value=-180,
+        max_value=180,
+        help_text="Longitude do ponto de referência",
+    )
+    raio_km = serializers.FloatField(
+        default=5, min_value=0.01, max_value=200, help_text="Raio da busca em km"
+    )
+    limite = serializers.IntegerField(
+        default=50, min_value=1, max_value=500, help_text="Máximo de resultados"
+    )
+
+
+class EntregasProximasParamsSerializer(ProximidadeParamsSerializer):
+    status = serializers.ChoiceField(choices=Entrega.STATUS_CHOICES, default="pendente")
+
+
+class VeiculosProximosParamsSerializer(ProximidadeParamsSerializer):
+    status = serializers.ChoiceField(
+        choices=Veiculo.STATUS_VEICULOS, default="DISPONIVEL"
+    )
+
+
+class EntregaProximaSerializer(EntregaSerializer):
+    distancia_km = serializers.FloatField(
+        read_only=True, help_text="Distância em linha reta até o ponto informado"
+    )
+
+
+class VeiculoProximoSerializer(VeiculoSerializer):
+    distancia_km = serializers.FloatField(
+        read_only=True, help_text="Distância em linha reta até o ponto informado"
+    )
+
+
+class PlanejarRotasRequestSerializer(serializers.Serializer):
+    simular = serializers.BooleanField(
+        default=False,
+        help_text="Se verdadeiro, apenas devolve o plano, sem criar rotas nem atribuir entregas.",
+    )
+
+
+class RotaPlanejadaSerializer(serializers.Serializer):
+    id = serializers.IntegerField(allow_null=True, help_text="Nulo na simulação")
+    veiculo = serializers.IntegerField()
+    placa = serializers.CharField()
+    motorista = serializers.IntegerField()
+    capacidade_maxima = serializers.DecimalField(max_digits=10, decimal_places=2)
+    capacidade_utilizada = serializers.DecimalField(max_digits=10, decimal_places=2)
+    entregas = serializers.ListField(
+        child=serializers.CharField(), help_text="Códigos de rastreio atribuídos"
+    )
+
+
+class PlanejarRotasResponseSerializer(serializers.Serializer):
+    simulacao = serializers.BooleanField()
+    rotas = RotaPlanejadaSerializer(many=True)
+    nao_alocadas = serializers.ListField(
+        child=serializers.CharField(),
+        help_text="Entregas pendentes que não couberam em nenhum veículo disponível",
+    )
+    veiculos_sem_uso = serializers.IntegerField()
+
+
+class ExportarEntregasParamsSerializer(serializers.Serializer):
+    formato = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+    data_inicio = serializers.DateField(
+        required=False, help_text="Data de solicitação inicial (inclusive)"
+    )
+    data_fim = serializers.DateField(
+        required=False, help_text="Data de solicitação final (inclusive)"
+    )
+    status = serializers.MultipleChoiceField(
+        choices=Entrega.STATUS_CHOICES,
+        required=False,
+        help_text="Um ou mais status (repita o parâmetro)",
+    )
+
+    def validate(self, attrs):
+        inicio, fim = attrs.get("data_inicio"), attrs.get("data_fim")
+        if inicio and fim and inicio > fim:
+            raise serializers.ValidationError(
+                {"data_fim": "A data final deve ser igual ou posterior à inicial."}
+            )
+        return attrs
+
+
+class BuscarEntregasParamsSerializer(serializers.Serializer):
+    q = serializers.CharField(
+        max_length=200,
+        help_text=(
+            "Termos buscados no código de rastreio, endereços de origem/destino e nome "
+            "do cliente (prefixo de palavra, sem acento, todos os termos obrigatórios)"
+        ),
+    )
+
+
+class AlteracoesEntregasParamsSerializer(serializers.Serializer):
+    since = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        help_text=(
+            "Cursor devolvido pela chamada anterior; vêm só os eventos posteriores. "
+            "Sem ele, a resposta traz apenas o cursor atual (ponto de partida após a "
+            "carga completa da listagem)."
+        ),
+    )
+    limite = serializers.IntegerField(
+        default=500, min_value=1, max_value=1000, help_text="Máximo de eventos"
+    )
+
+
+class EntregaEventoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EntregaEvento
+        fields = ["id", "codigo_rastreio", "tipo", "alteracoes", "criado_em"]
+
+
+class EntregaEventoClienteSerializer(EntregaEventoSerializer):
+    """Para o cliente, só as alterações dos campos que ele vê na entrega."""
+
+    alteracoes = serializers.SerializerMethodField()
 
+    def get_alteracoes(self, obj) -> dict:
+        return {
+            campo: valores
+            for campo, valores in obj.alteracoes.items()
+            if campo in CAMPOS_ENTREGA_CLIENTE
+        }
 
-class RotaDashboardEntregaItemSerializer(serializers.Serializer):
-    codigo = serializers.CharField(help_text="Código de rastreio")
-    endereco = serializers.CharField(help_text="Endereço de destino")
-    status = serializers.CharField(help_text="Status atual")
+
+class AlteracoesEntregasResponseSerializer(serializers.Serializer):
+    eventos = EntregaEventoSerializer(many=True)
+    cursor = serializers.IntegerField(help_text="Envie como ?since= na próxima chamada")
+    mais = serializers.BooleanField(
+        help_text="Há mais eventos depois deste lote; chame de novo sem esperar"
+    )
+
+
+class IndicadoresParamsSerializer(serializers.Serializer):
+    PERIODO_PADRAO_DIAS = 30
+
+    dimensao = serializers.ChoiceField(
+        choices=IndicadorDiario.DIMENSOES, default="geral"
+    )
+    referencia = serializers.IntegerField(
+        required=False, help_text="Id do motorista, cliente ou veículo (opcional)"
+    )
+    data_inicio = serializers.DateField(
+        required=False, help_text="Primeiro dia (padrão: 30 dias antes de data_fim)"
+    )
+    data_fim = serializers.DateField(
+        required=False, help_text="Último dia, inclusive (padrão: hoje)"
+    )
+    agrupar = serializers.ChoiceField(
+        choices=["dia", "periodo"],
+        default="dia",
+        help_text="dia: uma linha por dia; periodo: totais do intervalo por referência",
+    )
+
+    def validate(self, attrs):
+        fim = attrs.setdefault("data_fim", timezone.localdate())
+        inicio = attrs.setdefault(
+            "data_inicio", fim - timedelta(days=self.PERIODO_PADRAO_DIAS - 1)
+        )
+        if inicio > fim:
+            raise serializers.ValidationError(
+                {"data_fim": "A data final deve ser igual ou posterior à inicial."}
+            )
+        return attrs
 
 
-class RotaDashboardResponseSerializer(serializers.Serializer):
-    rota = serializers.DictField(help_text="Dados básicos da rota")
-    motorista = serializers.DictField(help_text="Dados do motorista")
-    veiculo = serializers.DictField(help_text="Dados do veículo")
-    progresso = serializers.DictField(help_text="Indicadores de progresso")
-    entregas = RotaDashboardEntregaItemSerializer(many=True)
\ No newline at end of file
+class IndicadorSerializer(serializers.Serializer):
+    dia = serializers.DateField(allow_null=True)
+    dimensao = serializers.CharField()
+    referencia = serializers.IntegerField()
+    solicitadas = serializers.IntegerField()
+    canceladas = serializers.IntegerField()
+    valor_frete = serializers.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        help_text="Frete das solicitadas não canceladas",
+    )
+    entregues = serializers.IntegerField()
+    entregues_com_prazo = serializers.IntegerField()
+    entregues_no_prazo = serializers.IntegerField()
+    taxa_no_prazo = serializers.FloatField(
+        allow_null=True, help_text="entregues_no_prazo / entregues_com_prazo"
+    )
+    rotas = serializers.IntegerField()
+    capacidade = serializers.DecimalField(max_digits=16, decimal_places=2)
+    carga = serializers.DecimalField(max_digits=16, decimal_places=2)
+    fator_carga = serializers.FloatField(
+        allow_null=True, help_text="carga / capacidade das rotas"
+    )
+
+
+class CriarEntregasLoteParamsSerializer(serializers.Serializer):
+    modo = serializers.ChoiceField(
+        choices=["tudo_ou_nada", "ignorar_invalidas"],
+        default="tudo_ou_nada",
+        help_text=(
+            "tudo_ou_nada: nenhuma entrega é criada se houver linha inválida. "
+            "ignorar_invalidas: cria as válidas e reporta as demais."
+        ),
+    )
+
+
+class EntregaLoteResultadoSerializer(serializers.Serializer):
+    linha = serializers.IntegerField()
+    codigo_rastreio = serializers.CharField(allow_null=True)
+    situacao = serializers.ChoiceField(choices=["criada", "valida", "erro"])
+    id = serializers.IntegerField(required=False)
+    erros = serializers.DictField(required=False)
+
+
+class CriarEntregasLoteResponseSerializer(serializers.Serializer):
+    modo = serializers.CharField()
+    total = serializers.IntegerField()
+    criadas = serializers.IntegerField()
+    com_erro = serializers.IntegerField()
+    resultados = EntregaLoteResultadoSerializer(many=True)
+
+
+class MensagemResponseSerializer(serializers.Serializer):
+    mensagem = serializers.CharField()
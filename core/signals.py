@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .cache import invalidar_dashboard_rota, invalidar_token_autenticado
+from .eventos import publicar_entrega
+from . import indicadores
+from .models import Cliente, Entrega, Motorista, Rota, Veiculo, capacidade_ajustada
+
+
+def invalidar_dashboard_apos_commit(using, *rota_ids):
+    """
+    Como nas views: invalida só depois do commit. Antes dele, uma leitura concorrente
+    do dashboard ainda veria os dados antigos e os poria de volta no cache até o TTL.
+    """
+    transaction.on_commit(lambda: invalidar_dashboard_rota(*rota_ids), using=using)
+
+
+@receiver(post_save, sender=Entrega)
+@receiver(post_delete, sender=Entrega)
+def invalidar_dashboard_por_entrega(sender, instance, using, **kwargs):
+    estado_original = getattr(instance, "_estado_original", None) or (None, None)
+    invalidar_dashboard_apos_commit(using, instance.rota_id, estado_original[0])
+
+
+@receiver(post_save, sender=Entrega)
+def publicar_alteracao_entrega(sender, instance, **kwargs):
+    """Avisa os streams SSE da rota atual e da anterior (se a entrega mudou de rota)."""
+    estado_original = getattr(instance, "_estado_original", None) or (None, None)
+    publicar_entrega(instance, instance.rota_id, estado_original[0])
+
+
+@receiver(post_delete, sender=Entrega)
+def liberar_capacidade_da_rota(sender, instance, **kwargs):
+    rota_id, carga = (
+        getattr(instance, "_estado_original", None) or instance._estado_carga()
+    )
+    if rota_id and carga:
+        Rota.ajustar_capacidade(rota_id, -carga)
+
+
+@receiver(pre_save, sender=Entrega)
+def guardar_indicadores_da_entrega(sender, instance, **kwargs):
+    instance._indicadores_antes = indicadores.estado_original_entrega(instance)
+
+
+@receiver(post_save, sender=Entrega)
+def atualizar_indicadores_da_entrega(sender, instance, using, **kwargs):
+    depois = indicadores.estado_entrega(instance)
+    antes = getattr(instance, "_indicadores_antes", None)
+    indicadores.atualizar_entregas([(antes, depois)], using)
+
+
+@receiver(post_delete, sender=Entrega)
+def remover_dos_indicadores_a_entrega(sender, instance, using, **kwargs):
+    indicadores.atualizar_entregas(
+        [(indicadores.estado_entrega(instance), None)], using
+    )
+
+
+@receiver(pre_save, sender=Rota)
+def guardar_indicadores_da_rota(sender, instance, using, **kwargs):
+    instance._indicadores_antes = (
+        None
+        if instance._state.adding
+        else indicadores.estado_rota_no_banco(instance.pk, using)
+    )
+
+
+@receiver(pre_delete, sender=Rota)
+def preparar_remocao_da_rota_dos_indicadores(sender, instance, using, **kwargs):
+    instance._indicadores_antes = indicadores.estado_rota_no_banco(instance.pk, using)
+    indicadores.desvincular_entregas_da_rota(instance.pk, using)
+
+
+@receiver(post_save, sender=Rota)
+def atualizar_indicadores_da_rota(sender, instance, using, **kwargs):
+    antes = instance._indicadores_antes
+    indicadores.atualizar_rotas([(antes, indicadores.estado_rota(instance))], using)
+    if antes and antes["veiculo_id"] != instance.veiculo_id:
+        indicadores.trocar_veiculo_da_rota(
+            instance.pk, antes["veiculo_id"], instance.veiculo_id, using
+        )
+
+
+@receiver(post_delete, sender=Rota)
+def remover_dos_indicadores_a_rota(sender, instance, using, **kwargs):
+    indicadores.atualizar_rotas([(instance._indicadores_antes, None)], using)
+
+
+@receiver(capacidade_ajustada)
+def acompanhar_carga_da_rota(sender, rota_id, quantidade, **kwargs):
+    indicadores.ajustar_carga_rota(rota_id, quantidade)
+
+
+@receiver(post_save, sender=Rota)
+@receiver(post_delete, sender=Rota)
+def invalidar_dashboard_por_rota(sender, instance, using, **kwargs):
+    invalidar_dashboard_apos_commit(using, instance.pk)
+
+
+@receiver(post_save, sender=Motorista)
+@receiver(post_save, sender=Veiculo)
+def invalidar_dashboard_por_motorista_ou_veiculo(
+    sender, instance, created, using, **kwargs
+):
+    """O dashboard também exibe dados do motorista e do veículo da rota."""
+    if created:
+        return
+
+    invalidar_dashboard_apos_commit(using, *instance.rotas.values_list("id", flat=True))
+
+
+def invalidar_tokens_do_usuario(user_id):
+    invalidar_token_autenticado(
+        *Token.objects.filter(user_id=user_id).values_list("key", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def invalidar_token_removido(sender, instance, **kwargs):
+    invalidar_token_autenticado(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidar_tokens_por_usuario(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    """Desativação, troca de senha ou de is_staff devem valer na próxima requisição."""
+    if created or update_fields == frozenset({"last_login"}):
+        return
+
+    invalidar_tokens_do_usuario(instance.pk)
+
+
+@receiver(post_save, sender=Motorista)
+@receiver(post_delete, sender=Motorista)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def invalidar_tokens_por_perfil(sender, instance, **kwargs):
+    """O usuário em cache carrega junto seus perfis de motorista e cliente."""
+    invalidar_tokens_do_usuario(instance.user_id)
+
+
+@receiver(connection_created)
+def configurar_conexao_sqlite(sender, connection, **kwargs):
+    """Aplica settings.SQLITE_PRAGMAS a cada conexão SQLite aberta (perfil otimizado)."""
+    if connection.vendor != "sqlite" or not settings.SQLITE_OTIMIZADO:
+        return
+    # Direto na conexão do driver: não entra na contagem de consultas da requisição.
+    for pragma, valor in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {pragma} = {valor}")
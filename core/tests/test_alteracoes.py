@@ -0,0 +1,139 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.historico import (
+    estado,
+    evento_alteracao,
+    evento_criacao,
+    registrar_eventos,
+)
+from core.models import Cliente, Entrega, EntregaEvento, Motorista
+
+URL = "/api/entregas/alteracoes/"
+
+
+class FeedAlteracoesTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tokens = {
+            "gestor": Token.objects.create(
+                user=User.objects.create_user("gestor", password="x", is_staff=True)
+            )
+        }
+        cls.motoristas = {}
+        for nome in ("a", "b"):
+            user = User.objects.create_user(f"motorista_{nome}", password="x")
+            cls.tokens[f"motorista_{nome}"] = Token.objects.create(user=user)
+            cls.motoristas[nome] = Motorista.objects.create(
+                user=user,
+                nome=nome,
+                cpf=f"0000000000{nome}",
+                cnh=f"0000000000{nome}",
+                telefone="0",
+            )
+        user = User.objects.create_user("cliente", password="x")
+        cls.tokens["cliente"] = Token.objects.create(user=user)
+        cls.cliente = Cliente.objects.create(
+            user=user, nome="Cliente", endereco="Rua A", telefone="0"
+        )
+
+        # Eventos intercalados entre as fontes de cada perfil.
+        cls.ids = {}
+        e1 = cls.criar("ALT00001", "a")
+        e2 = cls.criar("ALT00002", "b")
+        cls.ids["transferida"] = cls.alterar(e1, motorista=cls.motoristas["b"])
+        cls.ids["status_e2"] = cls.alterar(e2, status="em_transito")
+        e3 = cls.criar("ALT00003", "a")
+        cls.ids["status_e1"] = cls.alterar(e1, status="em_transito")
+        cls.ids["edicao_e3"] = cls.alterar(e3, observacoes="Portaria")
+
+    @classmethod
+    def criar(cls, codigo, motorista):
+        entrega = Entrega.objects.create(
+            codigo_rastreio=codigo,
+            cliente=cls.cliente,
+            motorista=cls.motoristas[motorista],
+            endereco_origem="Origem",
+            endereco_destino="Destino",
+            capacidade_necessaria=Decimal("1.00"),
+            valor_frete=Decimal("10.00"),
+        )
+        (cls.ids[f"criada_{codigo}"],) = (
+            evento.id for evento in registrar_eventos([evento_criacao(entrega)])
+        )
+        return entrega
+
+    @classmethod
+    def alterar(cls, entrega, **campos):
+        antes = estado(entrega)
+        for campo, valor in campos.items():
+            setattr(entrega, campo, valor)
+        entrega.save()
+        registrar_eventos([evento_alteracao(entrega, antes)])
+        return EntregaEvento.objects.latest("id").id
+
+    def esperados(self, *nomes):
+        return [self.ids[nome] for nome in nomes]
+
+    def ler_feed(self, papel, limite, since=0):
+        """Percorre o feed página a página; devolve os ids e o cursor final."""
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.tokens[papel].key}")
+        ids = []
+        while True:
+            corpo = self.client.get(URL, {"since": since, "limite": limite}).json()
+            ids += [evento["id"] for evento in corpo["eventos"]]
+            self.assertEqual(corpo["cursor"], ids[-1] if ids else since)
+            since = corpo["cursor"]
+            if not corpo["mais"]:
+                return ids, since
+
+    def test_escopo_e_ordem_por_perfil(self):
+        todos = sorted(self.ids.values())
+        casos = {
+            "gestor": todos,
+            # Eventos dela e os da entrega que deixou de ser dela.
+            "motorista_a": self.esperados(
+                "criada_ALT00001", "transferida", "criada_ALT00003", "edicao_e3"
+            ),
+            "motorista_b": self.esperados(
+                "criada_ALT00002", "transferida", "status_e2", "status_e1"
+            ),
+            # Só o que muda campos que o cliente vê.
+            "cliente": self.esperados(
+                "criada_ALT00001",
+                "criada_ALT00002",
+                "status_e2",
+                "criada_ALT00003",
+                "status_e1",
+            ),
+        }
+        for papel, esperados in casos.items():
+            for limite in (1, 2, 3, 1000):
+                with self.subTest(papel=papel, limite=limite):
+                    ids, _ = self.ler_feed(papel, limite)
+                    self.assertEqual(ids, esperados)
+
+    def test_retoma_do_cursor_sem_repetir_nem_pular(self):
+        primeira, cursor = self.ler_feed("motorista_a", limite=1000)
+        self.assertEqual(cursor, primeira[-1])
+
+        entrega = Entrega.objects.get(codigo_rastreio="ALT00003")
+        status_e3 = self.alterar(entrega, status="em_transito")
+        # A entrega transferida volta para a motorista A e reaparece no feed dela.
+        entrega = Entrega.objects.get(codigo_rastreio="ALT00001")
+        devolvida = self.alterar(entrega, motorista=self.motoristas["a"])
+
+        novos, _ = self.ler_feed("motorista_a", limite=1, since=cursor)
+        self.assertEqual(novos, [status_e3, devolvida])
+
+    def test_sem_since_devolve_so_o_cursor_atual(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {self.tokens['cliente'].key}"
+        )
+        corpo = self.client.get(URL).json()
+        self.assertEqual(
+            corpo, {"eventos": [], "cursor": max(self.ids.values()), "mais": False}
+        )
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.cache import chave_versao_token, tokens_autenticados
+
+
+class TokenCacheAuthenticationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("gestor", password="x", is_staff=True)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        tokens_autenticados.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def consultas_ao_token(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get("/api/clientes/")
+        return resposta, sum(
+            '"authtoken_token"' in consulta["sql"]
+            for consulta in consultas.captured_queries
+        )
+
+    def test_segunda_requisicao_nao_consulta_o_token(self):
+        self.assertEqual(self.consultas_ao_token()[1], 1)
+        resposta, consultas = self.consultas_ao_token()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(consultas, 0)
+
+    def test_desativacao_pelo_save_vale_na_proxima_requisicao(self):
+        self.consultas_ao_token()
+        self.user.is_active = False
+        self.user.save()
+
+        resposta, _ = self.consultas_ao_token()
+        self.assertEqual(resposta.status_code, 401)
+
+    def test_invalidacao_de_outro_processo_descarta_a_entrada_do_lru(self):
+        self.consultas_ao_token()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # Outro worker invalidou o token: só a versão no cache compartilhado some; o LRU
+        # deste processo continua com a entrada.
+        cache.delete(chave_versao_token(self.token.key))
+
+        resposta, consultas = self.consultas_ao_token()
+        self.assertEqual(consultas, 1)
+        self.assertEqual(resposta.status_code, 401)
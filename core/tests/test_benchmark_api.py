@@ -0,0 +1,229 @@
+import io
+import json
+import time
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APITestCase
+
+from core import renderers, urls
+from core.cache import tokens_autenticados
+from core.management.commands.benchmark_api import (
+    DESFEITAS,
+    FORA_DO_BENCHMARK,
+    ROTAS,
+    Command as BenchmarkApi,
+    percentil,
+    preencher,
+)
+from core.models import Entrega, EntregaEvento
+from core.serializacao import ListagemRapidaMixin
+
+
+class Benchmark:
+    """
+    Harness no formato do fixture `benchmark` do pytest-benchmark: chama a função
+    `rodadas` vezes (após uma de aquecimento), devolve o último resultado e guarda em
+    `stats` o tempo (min/p50/p95/p99 em ms) e o máximo de consultas SQL por chamada.
+    """
+
+    def __init__(self, rodadas=5):
+        self.rodadas = rodadas
+        self.stats = {}
+
+    def __call__(self, funcao, *args, **kwargs):
+        resultado = funcao(*args, **kwargs)
+        duracoes, consultas = [], 0
+        for _ in range(self.rodadas):
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                resultado = funcao(*args, **kwargs)
+                duracoes.append((time.perf_counter() - inicio) * 1000)
+            consultas = max(consultas, len(ctx.captured_queries))
+        self.stats = {
+            "min_ms": min(duracoes),
+            "p50_ms": percentil(duracoes, 50),
+            "p95_ms": percentil(duracoes, 95),
+            "p99_ms": percentil(duracoes, 99),
+            "consultas": consultas,
+        }
+        return resultado
+
+
+# Máximo de consultas SQL por requisição de cada rota (com o cache de tokens aquecido).
+ORCAMENTO_CONSULTAS = {
+    "clientes-list": 1,
+    "clientes-detail": 1,
+    "motoristas-list": 1,
+    "motoristas-detail": 1,
+    "motoristas-entregas": 2,
+    "motoristas-rotas": 2,
+    "motoristas-atribuir-veiculo": 4,
+    "veiculos-list": 1,
+    "veiculos-detail": 1,
+    "veiculos-disponiveis": 1,
+    "veiculos-rotas": 2,
+    "rotas-list": 1,
+    "rotas-detail": 1,
+    "rotas-dashboard": 1,
+    "rotas-atribuir-entregas": 9,
+    "entregas-list": 1,
+    "entregas-detail": 1,
+    "entregas-rastreamento": 1,
+    "entregas-exportar-csv": 1,
+    "entregas-exportar-ndjson": 1,
+    "entregas-buscar": 2,
+    "entregas-alteracoes": 2,
+    "entregas-proximas": 2,
+    "veiculos-proximos": 2,
+    "indicadores-list": 2,
+    "indicadores-periodo": 2,
+    "entregas-atribuir-motorista": 8,
+    # As rotas desfeitas contam também o SAVEPOINT/ROLLBACK da transação desfeita.
+    "entregas-lote": 10,
+    "entregas-marcar-entregue": 13,
+    "rotas-planejar": 7,
+    "rotas-otimizar": 9,
+}
+
+
+class BenchmarkApiTests(APITestCase):
+    """Cada rota do benchmark_api, por papel, com a massa do popular_banco."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "popular_banco",
+            clientes=5,
+            motoristas=3,
+            entregas=120,
+            seed=42,
+            stdout=io.StringIO(),
+        )
+        cls.contexto, cls.clientes_api = BenchmarkApi().preparar_contexto()
+
+    def setUp(self):
+        cache.clear()
+        tokens_autenticados.clear()
+        self.benchmark = Benchmark()
+
+    def test_rotas_dentro_do_orcamento_de_consultas(self):
+        for nome, metodo, caminho, corpo, papeis in ROTAS:
+            caminho = caminho.format(**self.contexto)
+            corpo = preencher(corpo, self.contexto)
+            for papel in papeis:
+                with self.subTest(rota=nome, papel=papel):
+                    status, _ = self.benchmark(
+                        BenchmarkApi.requisitar,
+                        self.clientes_api[papel],
+                        metodo,
+                        caminho,
+                        corpo,
+                        nome in DESFEITAS,
+                    )
+                    self.assertLess(status, 400)
+                    self.assertLessEqual(
+                        self.benchmark.stats["consultas"], ORCAMENTO_CONSULTAS[nome]
+                    )
+
+    def test_todas_as_rotas_da_api_no_benchmark(self):
+        self.assertEqual(set(ORCAMENTO_CONSULTAS), {rota[0] for rota in ROTAS})
+
+        medidas = {
+            resolve(urlsplit(caminho.format(**self.contexto)).path).url_name
+            for _, _, caminho, _, _ in ROTAS
+        }
+        nomes = {
+            padrao.name
+            for padrao in urls.urlpatterns + urls.router.urls
+            if getattr(padrao, "name", None)
+        }
+        self.assertEqual(nomes - FORA_DO_BENCHMARK - medidas, set())
+
+    def test_rotas_desfeitas_nao_alteram_a_massa(self):
+        for nome, metodo, caminho, corpo, papeis in ROTAS:
+            if nome not in DESFEITAS:
+                continue
+            caminho = caminho.format(**self.contexto)
+            corpo = preencher(corpo, self.contexto)
+            with self.subTest(rota=nome):
+                antes = list(Entrega.objects.order_by("id").values())
+                eventos = EntregaEvento.objects.count()
+                for _ in range(2):
+                    status, _ = BenchmarkApi.requisitar(
+                        self.clientes_api[papeis[0]], metodo, caminho, corpo, True
+                    )
+                    self.assertLess(status, 400)
+                self.assertEqual(list(Entrega.objects.order_by("id").values()), antes)
+                self.assertEqual(EntregaEvento.objects.count(), eventos)
+
+    def test_leitura_rapida_igual_ao_serializer(self):
+        caminhos = [
+            "/api/entregas/",
+            "/api/entregas/?ordering=codigo_rastreio&page_size=7",
+            "/api/entregas/?fields=codigo_rastreio,status,valor_frete",
+            "/api/entregas/?omit=observacoes,latitude",
+            "/api/rotas/",
+            "/api/veiculos/",
+        ]
+        client = self.clientes_api["gestor"]
+        for caminho in caminhos:
+            with self.subTest(caminho=caminho):
+                with mock.patch.object(
+                    renderers.orjson, "dumps", wraps=renderers.orjson.dumps
+                ) as dumps:
+                    rapida = client.get(caminho)
+                    with mock.patch.object(
+                        ListagemRapidaMixin, "leitura_rapida", False
+                    ):
+                        referencia = client.get(caminho)
+                # Só a resposta marcada pela leitura rápida vai para o orjson.
+                self.assertEqual(dumps.call_count, 1)
+                self.assertEqual(rapida.status_code, 200)
+                self.assertEqual(rapida.content, referencia.content)
+
+    def test_respostas_em_cache_iguais_as_calculadas(self):
+        for caminho in (
+            "/api/rotas/{rota}/dashboard/",
+            "/api/entregas/{entrega}/rastreamento/",
+        ):
+            caminho = caminho.format(**self.contexto)
+            for papel in ("gestor", "motorista"):
+                with self.subTest(caminho=caminho, papel=papel):
+                    cache.clear()
+                    calculada = self.clientes_api[papel].get(caminho)
+                    em_cache = self.clientes_api[papel].get(caminho)
+                    self.assertEqual(calculada.status_code, 200)
+                    self.assertEqual(calculada.content, em_cache.content)
+
+
+class ComparacaoBaselineTests(APITestCase):
+    opcoes = {"baseline": None, "tolerancia": 0.25, "folga_ms": 5.0}
+    resultado = {"p95_ms": 10.0, "consultas": 2, "bytes": 1000}
+
+    def comparar(self, atual, anterior):
+        comando = BenchmarkApi(stdout=io.StringIO())
+        with mock.patch(
+            "core.management.commands.benchmark_api.Path.read_text",
+            return_value=json.dumps({"resultados": {"rota:gestor": anterior}}),
+        ):
+            comando.comparar({"rota:gestor": atual}, {**self.opcoes, "baseline": "x"})
+
+    def test_sem_regressao(self):
+        self.comparar({**self.resultado, "p95_ms": 14.0}, self.resultado)
+
+    def test_regressoes(self):
+        for piora in (
+            {"consultas": 3},
+            {"p95_ms": 16.0},
+            {"bytes": 1300},
+        ):
+            with self.subTest(piora=piora):
+                with self.assertRaises(CommandError):
+                    self.comparar({**self.resultado, **piora}, self.resultado)
@@ -0,0 +1,119 @@
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from core import busca
+from core.busca import buscar_ids, filtrar_busca
+from core.models import Cliente, Entrega
+
+
+class BuscaBase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Padaria Pão Quente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        cls.acacias = cls.criar("BUS00001", "Rua das Acácias, 10 - São João")
+        cls.ipes = cls.criar("BUS00002", "Avenida dos Ipês, 200 - Centro")
+
+    @classmethod
+    def criar(cls, codigo, destino):
+        return Entrega.objects.create(
+            codigo_rastreio=codigo,
+            cliente=cls.cliente,
+            endereco_origem="Depósito Central",
+            endereco_destino=destino,
+            capacidade_necessaria=Decimal("1.00"),
+            valor_frete=Decimal("10.00"),
+        )
+
+    def ids(self, texto):
+        return buscar_ids(Entrega.objects.all(), texto)
+
+
+@skipUnless(connection.vendor == "sqlite", "índice FTS5 só no SQLite")
+class IndiceFTSTests(BuscaBase):
+    def test_indice_criado_pela_migracao(self):
+        self.assertTrue(busca.busca_disponivel())
+
+    def test_sem_acento_e_por_prefixo(self):
+        self.assertEqual(self.ids("sao joao"), [self.acacias.pk])
+        self.assertEqual(self.ids("ACACIA"), [self.acacias.pk])
+        self.assertEqual(self.ids("ipe"), [self.ipes.pk])
+        self.assertEqual(self.ids("pao quente"), [self.ipes.pk, self.acacias.pk])
+
+    def test_triggers_de_entrega(self):
+        # bulk_create e update() não passam pelos signals; os triggers cobrem.
+        (nova,) = Entrega.objects.bulk_create(
+            [
+                Entrega(
+                    codigo_rastreio="BUS00003",
+                    cliente=self.cliente,
+                    endereco_origem="Depósito Central",
+                    endereco_destino="Travessa das Palmeiras",
+                    capacidade_necessaria=Decimal("1.00"),
+                    valor_frete=Decimal("10.00"),
+                )
+            ]
+        )
+        nova_id = nova.pk or Entrega.objects.get(codigo_rastreio="BUS00003").pk
+        self.assertEqual(self.ids("palmeiras"), [nova_id])
+
+        Entrega.objects.filter(pk=self.acacias.pk).update(
+            endereco_destino="Rua dos Girassóis"
+        )
+        self.assertEqual(self.ids("acacias"), [])
+        self.assertEqual(self.ids("girassois"), [self.acacias.pk])
+
+        Entrega.objects.filter(pk=self.ipes.pk).delete()
+        self.assertEqual(self.ids("ipes"), [])
+
+    def test_trigger_de_cliente(self):
+        Cliente.objects.filter(pk=self.cliente.pk).update(nome="Mercearia Sol")
+        self.assertEqual(self.ids("pao"), [])
+        self.assertEqual(set(self.ids("mercearia")), {self.acacias.pk, self.ipes.pk})
+
+        outro = Cliente.objects.create(
+            user=User.objects.create_user("outro", password="x"),
+            nome="Floricultura",
+            endereco="Rua B",
+            telefone="0",
+        )
+        Entrega.objects.filter(pk=self.ipes.pk).update(cliente=outro)
+        self.assertEqual(self.ids("floricultura"), [self.ipes.pk])
+        self.assertEqual(self.ids("mercearia"), [self.acacias.pk])
+
+    def test_codigo_pesa_mais_que_endereco(self):
+        outra = self.criar("CENTRO01", "Rua B")
+        self.assertEqual(self.ids("centro")[0], outra.pk)
+
+    def test_escopo_do_queryset_e_operadores_do_usuario(self):
+        self.assertEqual(
+            buscar_ids(Entrega.objects.filter(pk=self.ipes.pk), "central"),
+            [self.ipes.pk],
+        )
+        # Aspas e operadores do FTS5 são tratados como texto.
+        self.assertEqual(self.ids('"sao OR ipes'), [])
+        self.assertEqual(
+            list(filtrar_busca(Entrega.objects.all(), "acacias").values_list("pk")),
+            [(self.acacias.pk,)],
+        )
+
+
+@mock.patch.object(busca, "busca_disponivel", lambda using="default": False)
+class BuscaSemFTSTests(BuscaBase):
+    def test_icontains_em_todos_os_termos(self):
+        self.assertEqual(self.ids("rua 10"), [self.acacias.pk])
+        # Mais recentes primeiro.
+        self.assertEqual(self.ids("central"), [self.ipes.pk, self.acacias.pk])
+        self.assertEqual(self.ids("bus00002"), [self.ipes.pk])
+        self.assertEqual(
+            list(filtrar_busca(Entrega.objects.all(), "ipês").values_list("pk")),
+            [(self.ipes.pk,)],
+        )
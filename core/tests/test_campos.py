@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.models import Cliente, Entrega
+
+URL = "/api/entregas/"
+
+
+class CamposSelecionaveisTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        cls.token_gestor = Token.objects.create(user=gestor)
+        user = User.objects.create_user("cliente", password="x")
+        cls.token_cliente = Token.objects.create(user=user)
+        cliente = Cliente.objects.create(
+            user=user, nome="Cliente", endereco="Rua A", telefone="0"
+        )
+        cls.entrega = Entrega.objects.create(
+            codigo_rastreio="CMP00001",
+            cliente=cliente,
+            endereco_origem="Origem",
+            endereco_destino="Destino",
+            capacidade_necessaria=Decimal("1.00"),
+            valor_frete=Decimal("10.00"),
+            observacoes="Portaria",
+        )
+
+    def get(self, url, token=None):
+        token = token or self.token_gestor
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return self.client.get(url)
+
+    def test_fields_e_omit(self):
+        resposta = self.get(f"{URL}?fields=codigo_rastreio,status")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(
+            resposta.json()["results"],
+            [{"codigo_rastreio": "CMP00001", "status": "pendente"}],
+        )
+
+        resposta = self.get(f"{URL}CMP00001/?fields=id,status,valor_frete&omit=id")
+        self.assertEqual(
+            resposta.json(), {"status": "pendente", "valor_frete": "10.00"}
+        )
+
+        resposta = self.get(f"{URL}CMP00001/?omit=observacoes")
+        self.assertNotIn("observacoes", resposta.json())
+        self.assertIn("endereco_destino", resposta.json())
+
+    def test_campos_desconhecidos(self):
+        resposta = self.get(f"{URL}?fields=status,inexistente,outro")
+        self.assertEqual(resposta.status_code, 400)
+        erro = resposta.json()["fields"]
+        self.assertIn("Campos inválidos: inexistente, outro.", str(erro))
+
+        resposta = self.get(f"{URL}CMP00001/?omit=inexistente")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("omit", resposta.json())
+        self.assertNotIn("fields", resposta.json())
+
+    def test_cliente_nao_pede_campos_fora_do_serializer_restrito(self):
+        resposta = self.get(f"{URL}?fields=status", self.token_cliente)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["results"], [{"status": "pendente"}])
+
+        resposta = self.get(f"{URL}?fields=status,valor_frete", self.token_cliente)
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("valor_frete", str(resposta.json()["fields"]))
+
+    def test_parametros_vazios_devolvem_todos_os_campos(self):
+        completo = self.get(f"{URL}CMP00001/").json()
+        self.assertEqual(self.get(f"{URL}CMP00001/?fields=&omit= ,").json(), completo)
+
+    def test_escrita_ignora_fields(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_gestor.key}")
+        resposta = self.client.patch(
+            f"{URL}CMP00001/?fields=inexistente",
+            {"observacoes": "Fundos"},
+            format="json",
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["observacoes"], "Fundos")
+
+    def test_listagem_carrega_so_as_colunas_pedidas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.get(f"{URL}?fields=codigo_rastreio")
+        self.assertEqual(resposta.status_code, 200)
+        (sql,) = [
+            c["sql"]
+            for c in consultas
+            if c["sql"].startswith("SELECT") and 'FROM "core_entrega"' in c["sql"]
+        ]
+        colunas = sql.split(" FROM ")[0]
+        self.assertIn('"codigo_rastreio"', colunas)
+        # As colunas do cursor vão junto.
+        self.assertIn('"data_solicitacao"', colunas)
+        self.assertIn('"id"', colunas)
+        for coluna in ("observacoes", "endereco_destino", "valor_frete"):
+            self.assertNotIn(f'"{coluna}"', colunas)
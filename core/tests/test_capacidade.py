@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import (
+    CAMPOS_ORIGINAIS,
+    CapacidadeExcedida,
+    Cliente,
+    Entrega,
+    Motorista,
+    Rota,
+    Veiculo,
+)
+
+
+def releituras(consultas):
+    return sum(
+        consulta["sql"].startswith("SELECT")
+        and 'FROM "core_entrega"' in consulta["sql"]
+        for consulta in consultas
+    )
+
+
+class CapacidadeRotaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        motorista = Motorista.objects.create(
+            user=User.objects.create_user("motorista", password="x"),
+            nome="Motorista",
+            cpf="00000000001",
+            cnh="00000000001",
+            telefone="0",
+        )
+        cls.cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        cls.veiculo = Veiculo.objects.create(
+            placa="CAP1234",
+            modelo="Van",
+            capacidade_maxima=Decimal("0.30"),
+            motorista=motorista,
+        )
+        cls.rota = Rota.objects.create(
+            nome="Rota", motorista=motorista, veiculo=cls.veiculo
+        )
+
+    def criar_entrega(self, codigo, capacidade):
+        return Entrega.objects.create(
+            codigo_rastreio=codigo,
+            cliente=self.cliente,
+            rota=self.rota,
+            endereco_origem="Origem",
+            endereco_destino="Destino",
+            capacidade_necessaria=Decimal(capacidade),
+            valor_frete=Decimal("10.00"),
+        )
+
+    def carga(self):
+        self.rota.refresh_from_db(fields=["capacidade_utilizada"])
+        return self.rota.capacidade_utilizada
+
+    def test_carga_que_completa_exatamente_a_capacidade_cabe(self):
+        self.criar_entrega("CAP00001", "0.10")
+        self.criar_entrega("CAP00002", "0.20")
+        self.assertEqual(self.carga(), Decimal("0.30"))
+
+        with self.assertRaises(CapacidadeExcedida):
+            self.criar_entrega("CAP00003", "0.01")
+
+    def test_somas_sucessivas_nao_acumulam_residuo(self):
+        Veiculo.objects.filter(pk=self.veiculo.pk).update(
+            capacidade_maxima=Decimal("999.00")
+        )
+        for _ in range(10):
+            self.assertTrue(Rota.reservar_capacidade(self.rota.pk, Decimal("99.90")))
+        self.assertEqual(self.carga(), Decimal("999.00"))
+        self.assertFalse(Rota.reservar_capacidade(self.rota.pk, Decimal("0.01")))
+
+    def test_save_de_instancia_desatualizada_usa_o_estado_do_banco(self):
+        self.criar_entrega("CAP00001", "0.10")
+        primeira = Entrega.objects.get(codigo_rastreio="CAP00001")
+        segunda = Entrega.objects.get(codigo_rastreio="CAP00001")
+
+        primeira.capacidade_necessaria = Decimal("0.20")
+        primeira.save()
+        # A segunda instância ainda acha que a entrega ocupa 0.10.
+        segunda.capacidade_necessaria = Decimal("0.25")
+        segunda.save()
+
+        self.assertEqual(self.carga(), Decimal("0.25"))
+
+    def test_save_sem_mudanca_de_carga_nao_rele_a_linha(self):
+        self.criar_entrega("CAP00001", "0.10")
+        entrega = Entrega.objects.get(codigo_rastreio="CAP00001")
+        self.assertEqual(set(entrega._valores_originais), CAMPOS_ORIGINAIS)
+
+        entrega.observacoes = "Portaria"
+        with CaptureQueriesContext(connection) as consultas:
+            entrega.save()
+        self.assertEqual(releituras(consultas), 0)
+
+        entrega.capacidade_necessaria = Decimal("0.20")
+        with CaptureQueriesContext(connection) as consultas:
+            entrega.save()
+        self.assertEqual(releituras(consultas), 1)
+        self.assertEqual(self.carga(), Decimal("0.20"))
+
+    def test_save_sem_mudanca_de_carga_preserva_a_rota_gravada_por_outro(self):
+        self.criar_entrega("CAP00001", "0.10")
+        desatualizada = Entrega.objects.get(codigo_rastreio="CAP00001")
+        outra = Entrega.objects.get(codigo_rastreio="CAP00001")
+        outra.rota = None
+        outra.save()
+
+        desatualizada.observacoes = "Portaria"
+        desatualizada.save()
+
+        self.assertIsNone(Entrega.objects.get(codigo_rastreio="CAP00001").rota_id)
+        self.assertEqual(self.carga(), Decimal("0.00"))
@@ -0,0 +1,131 @@
+import csv
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import orjson
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.models import Cliente, Entrega, Motorista
+from core.serializers import EntregaClienteSerializer, EntregaSerializer
+
+URL = "/api/entregas/exportar/"
+
+
+class ExportarEntregasTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        cls.token_gestor = Token.objects.create(user=gestor)
+        user = User.objects.create_user("cliente", password="x")
+        cls.token_cliente = Token.objects.create(user=user)
+        cls.cliente = Cliente.objects.create(
+            user=user, nome="Cliente", endereco="Rua A", telefone="0"
+        )
+        user = User.objects.create_user("motorista", password="x")
+        motorista = Motorista.objects.create(
+            user=user, nome="M", cpf="00000000000", cnh="00000000000", telefone="0"
+        )
+
+        # Um dia por entrega, com tipos variados: nulos, decimais, datas e vírgulas.
+        for dia, status in enumerate(
+            ("pendente", "em_transito", "entregue", "cancelada"), start=1
+        ):
+            entrega = Entrega.objects.create(
+                codigo_rastreio=f"EXP0000{dia}",
+                cliente=cls.cliente,
+                motorista=motorista if dia % 2 else None,
+                endereco_origem="Origem, 1",
+                endereco_destino='Destino "A"',
+                capacidade_necessaria=Decimal("1.50"),
+                valor_frete=Decimal(f"{dia}0.25"),
+                status=status,
+                latitude=Decimal("-23.550520") if dia == 1 else None,
+                longitude=Decimal("-46.633308") if dia == 1 else None,
+                data_entrega_prevista=datetime(
+                    2024, 1, dia + 1, 12, tzinfo=timezone.utc
+                ),
+            )
+            Entrega.objects.filter(pk=entrega.pk).update(
+                data_solicitacao=datetime(2024, 1, dia, 23, 59, 59, tzinfo=timezone.utc)
+            )
+
+    def exportar(self, token, **params):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        resposta = self.client.get(URL, params)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, b"".join(resposta.streaming_content).decode()
+
+    def esperados(self, serializer_class, **filtros):
+        entregas = Entrega.objects.filter(**filtros).order_by("data_solicitacao", "id")
+        return [
+            dict(registro) for registro in serializer_class(entregas, many=True).data
+        ]
+
+    def test_csv_igual_ao_serializer(self):
+        resposta, corpo = self.exportar(self.token_gestor)
+        self.assertEqual(resposta["Content-Type"], "text/csv; charset=utf-8")
+
+        esperados = self.esperados(EntregaSerializer)
+        linhas = list(csv.DictReader(io.StringIO(corpo)))
+        self.assertEqual(list(linhas[0]), list(esperados[0]))
+        self.assertEqual(
+            linhas,
+            [
+                {
+                    campo: "" if valor is None else str(valor)
+                    for campo, valor in registro.items()
+                }
+                for registro in esperados
+            ],
+        )
+
+    def test_ndjson_igual_ao_serializer(self):
+        resposta, corpo = self.exportar(self.token_gestor, formato="ndjson")
+        self.assertEqual(
+            resposta["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        self.assertTrue(corpo.endswith("\n"))
+        self.assertEqual(
+            [orjson.loads(linha) for linha in corpo.splitlines()],
+            self.esperados(EntregaSerializer),
+        )
+
+    def test_cliente_exporta_so_os_campos_restritos(self):
+        _, corpo = self.exportar(self.token_cliente, formato="ndjson")
+        self.assertEqual(
+            [orjson.loads(linha) for linha in corpo.splitlines()],
+            self.esperados(EntregaClienteSerializer),
+        )
+
+    def test_periodo_inclusivo_e_status(self):
+        _, corpo = self.exportar(
+            self.token_gestor,
+            formato="ndjson",
+            data_inicio="2024-01-02",
+            data_fim="2024-01-03",
+        )
+        self.assertEqual(
+            [orjson.loads(linha)["codigo_rastreio"] for linha in corpo.splitlines()],
+            ["EXP00002", "EXP00003"],
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_gestor.key}")
+        resposta = self.client.get(
+            f"{URL}?formato=ndjson&status=pendente&status=cancelada"
+        )
+        corpo = b"".join(resposta.streaming_content).decode()
+        self.assertEqual(
+            [orjson.loads(linha)["codigo_rastreio"] for linha in corpo.splitlines()],
+            ["EXP00001", "EXP00004"],
+        )
+
+    def test_periodo_invertido(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_gestor.key}")
+        resposta = self.client.get(
+            URL, {"data_inicio": "2024-01-03", "data_fim": "2024-01-02"}
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("data_fim", resposta.json())
@@ -0,0 +1,156 @@
+from datetime import datetime, time, timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.models import Cliente, Entrega, Motorista, Rota, Veiculo
+
+
+def momento(dia, hora=time.min):
+    return datetime.combine(datetime(2024, 3, dia).date(), hora, tzinfo=timezone.utc)
+
+
+class FiltrosListagemTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        cls.token = Token.objects.create(user=gestor)
+        user = User.objects.create_user("cliente", password="x")
+        cliente = Cliente.objects.create(
+            user=user, nome="Cliente", endereco="Rua A", telefone="0"
+        )
+
+        veiculos = []
+        for indice, (tipo, status) in enumerate(
+            (("CARRO", "DISPONIVEL"), ("VAN", "EM_USO"), ("CAMINHAO", "MANUTENCAO"))
+        ):
+            user = User.objects.create_user(f"motorista{indice}", password="x")
+            motorista = Motorista.objects.create(
+                user=user,
+                nome=f"M{indice}",
+                cpf=f"0000000000{indice}",
+                cnh=f"0000000000{indice}",
+                telefone="0",
+            )
+            veiculos.append(
+                Veiculo.objects.create(
+                    placa=f"AAA000{indice}",
+                    modelo="Modelo",
+                    tipo=tipo,
+                    status=status,
+                    capacidade_maxima=Decimal("100.00"),
+                    motorista=motorista,
+                )
+            )
+        for indice, status in enumerate(("planejada", "em_andamento", "concluida")):
+            rota = Rota.objects.create(
+                nome=f"Rota {indice}",
+                motorista=veiculos[indice].motorista,
+                veiculo=veiculos[indice],
+                status=status,
+            )
+            Rota.objects.filter(pk=rota.pk).update(data_rota=momento(10 + indice))
+
+        # Entregas nas bordas dos dias 10 e 11: primeiro e último instante de cada dia.
+        solicitacoes = {
+            "ENT00001": (momento(9, time.max), "pendente"),
+            "ENT00002": (momento(10), "em_transito"),
+            "ENT00003": (momento(10, time.max), "entregue"),
+            "ENT00004": (momento(11, time.max), "cancelada"),
+            "ENT00005": (momento(12), "pendente"),
+        }
+        for codigo, (data, status) in solicitacoes.items():
+            entrega = Entrega.objects.create(
+                codigo_rastreio=codigo,
+                cliente=cliente,
+                endereco_origem="Origem",
+                endereco_destino=f"Destino {codigo}",
+                capacidade_necessaria=Decimal("1.00"),
+                valor_frete=Decimal("10.00"),
+                status=status,
+                data_entrega_prevista=data,
+            )
+            Entrega.objects.filter(pk=entrega.pk).update(data_solicitacao=data)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def listar(self, url, campo="codigo_rastreio"):
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        return sorted(item[campo] for item in resposta.json()["results"])
+
+    def test_intervalo_de_datas_inclui_os_dois_extremos(self):
+        for campo in ("data_solicitacao", "data_entrega_prevista"):
+            with self.subTest(campo=campo):
+                self.assertEqual(
+                    self.listar(
+                        f"/api/entregas/?{campo}_de=2024-03-10&{campo}_ate=2024-03-11"
+                    ),
+                    ["ENT00002", "ENT00003", "ENT00004"],
+                )
+                self.assertEqual(
+                    self.listar(f"/api/entregas/?{campo}_de=2024-03-11"),
+                    ["ENT00004", "ENT00005"],
+                )
+                self.assertEqual(
+                    self.listar(f"/api/entregas/?{campo}_ate=2024-03-09"),
+                    ["ENT00001"],
+                )
+
+        self.assertEqual(
+            self.listar(
+                "/api/rotas/?data_rota_de=2024-03-11&data_rota_ate=2024-03-12", "nome"
+            ),
+            ["Rota 1", "Rota 2"],
+        )
+
+    def test_intervalo_com_data_invalida(self):
+        resposta = self.client.get("/api/entregas/?data_solicitacao_de=ontem")
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_escolha_multipla(self):
+        self.assertEqual(
+            self.listar("/api/entregas/?status=pendente&status=cancelada"),
+            ["ENT00001", "ENT00004", "ENT00005"],
+        )
+        self.assertEqual(
+            self.listar("/api/rotas/?status=planejada&status=concluida", "nome"),
+            ["Rota 0", "Rota 2"],
+        )
+        self.assertEqual(
+            self.listar("/api/veiculos/?tipo=VAN&tipo=CAMINHAO", "placa"),
+            ["AAA0001", "AAA0002"],
+        )
+        self.assertEqual(
+            self.listar("/api/veiculos/?tipo=VAN&tipo=CAMINHAO&status=EM_USO", "placa"),
+            ["AAA0001"],
+        )
+
+    def test_escolha_multipla_sem_distinct(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.listar("/api/entregas/?status=pendente&status=cancelada")
+        listagem = [c["sql"] for c in consultas if '"core_entrega"' in c["sql"]]
+        self.assertTrue(listagem)
+        for sql in listagem:
+            self.assertNotIn("DISTINCT", sql.upper())
+
+    def test_escolha_invalida(self):
+        resposta = self.client.get("/api/entregas/?status=pendente&status=perdida")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("status", resposta.json())
+
+    def test_filtros_combinados_com_busca_e_ordenacao(self):
+        resposta = self.client.get(
+            "/api/entregas/?status=pendente&status=entregue"
+            "&data_solicitacao_ate=2024-03-10&search=Destino&ordering=-codigo_rastreio"
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(
+            [item["codigo_rastreio"] for item in resposta.json()["results"]],
+            ["ENT00003", "ENT00001"],
+        )
@@ -0,0 +1,308 @@
+import importlib
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import indicadores
+from core.indicadores import METRICAS, calcular_indicadores, reconstruir_indicadores
+from core.models import Cliente, Entrega, IndicadorDiario, Motorista, Rota, Veiculo
+
+MIGRACAO_PREENCHIMENTO = "0012_preencher_indicadores"
+
+
+def indicadores_gravados():
+    """Linhas de IndicadorDiario, sem as zeradas (o incremental pode deixar linhas 0)."""
+    linhas = {}
+    for linha in IndicadorDiario.objects.values(
+        "dia", "dimensao", "referencia", *METRICAS
+    ):
+        chave = (linha.pop("dia"), linha.pop("dimensao"), linha.pop("referencia"))
+        if any(linha.values()):
+            linhas[chave] = linha
+    return linhas
+
+
+def indicadores_calculados():
+    return {
+        chave: {metrica: valores.get(metrica, 0) for metrica in METRICAS}
+        for chave, valores in calcular_indicadores().items()
+        if any(valores.values())
+    }
+
+
+def criar_massa():
+    """Dois motoristas com veículo e rota, dois clientes e entregas em vários estados."""
+    motoristas, rotas = [], []
+    for indice, capacidade in enumerate(("500.00", "800.00")):
+        user = User.objects.create_user(f"motorista{indice}", password="x")
+        motorista = Motorista.objects.create(
+            user=user,
+            nome=f"M{indice}",
+            cpf=f"0000000000{indice}",
+            cnh=f"0000000000{indice}",
+            telefone="0",
+        )
+        veiculo = Veiculo.objects.create(
+            placa=f"IND000{indice}",
+            modelo="Modelo",
+            capacidade_maxima=Decimal(capacidade),
+            motorista=motorista,
+        )
+        motoristas.append(motorista)
+        rotas.append(
+            Rota.objects.create(
+                nome=f"Rota {indice}", motorista=motorista, veiculo=veiculo
+            )
+        )
+
+    clientes = [
+        Cliente.objects.create(
+            user=User.objects.create_user(f"cliente{indice}", password="x"),
+            nome=f"Cliente {indice}",
+            endereco="Rua A",
+            telefone="0",
+        )
+        for indice in range(2)
+    ]
+
+    agora = timezone.now()
+    entregas = []
+    for numero in range(6):
+        rota = rotas[numero % 2] if numero < 4 else None
+        entregas.append(
+            Entrega.objects.create(
+                codigo_rastreio=f"IND{numero:05d}",
+                cliente=clientes[numero % 2],
+                rota=rota,
+                motorista=rota.motorista if rota else None,
+                endereco_origem="Origem",
+                endereco_destino="Destino",
+                status="em_transito" if rota else "pendente",
+                capacidade_necessaria=Decimal("10.00"),
+                valor_frete=Decimal(f"{numero + 1}5.50"),
+                data_entrega_prevista=agora + timedelta(days=numero - 2),
+            )
+        )
+    return motoristas, rotas, clientes, entregas
+
+
+class IndicadoresIncrementaisTests(TestCase):
+    """Os signals mantêm IndicadorDiario igual ao recálculo completo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.motoristas, cls.rotas, cls.clientes, cls.entregas = criar_massa()
+
+    def assertIgualAoRecalculo(self):
+        incrementais = indicadores_gravados()
+        self.assertEqual(incrementais, indicadores_calculados())
+        reconstruir_indicadores()
+        self.assertEqual(indicadores_gravados(), incrementais)
+
+    def entrega(self, indice):
+        return Entrega.objects.get(pk=self.entregas[indice].pk)
+
+    def test_criacao(self):
+        self.assertTrue(indicadores_gravados())
+        self.assertIgualAoRecalculo()
+
+    def test_mudancas_de_status(self):
+        agora = timezone.now()
+        # No prazo, atrasada, sem previsão e entregue em outro dia.
+        for indice, real, prevista in (
+            (0, agora, agora + timedelta(hours=1)),
+            (1, agora, agora - timedelta(days=1)),
+            (4, agora, None),
+            (5, agora + timedelta(days=3), agora + timedelta(days=1)),
+        ):
+            entrega = self.entrega(indice)
+            entrega.status = "entregue"
+            entrega.data_entrega_real = real
+            entrega.data_entrega_prevista = prevista
+            entrega.save()
+        self.assertIgualAoRecalculo()
+
+        entrega = self.entrega(1)
+        entrega.status = "em_transito"
+        entrega.data_entrega_real = None
+        entrega.save()
+        self.assertIgualAoRecalculo()
+
+    def test_cancelamento(self):
+        entregue = self.entrega(0)
+        entregue.status = "entregue"
+        entregue.data_entrega_real = timezone.now()
+        entregue.save()
+
+        for indice in (0, 2, 5):
+            entrega = self.entrega(indice)
+            entrega.status = "cancelada"
+            entrega.save()
+        self.assertIgualAoRecalculo()
+
+        entrega = self.entrega(5)
+        entrega.status = "pendente"
+        entrega.save()
+        self.assertIgualAoRecalculo()
+
+    def test_edicao_do_frete(self):
+        for indice, valor in ((0, "99.99"), (3, "0.01"), (4, "1234.56")):
+            entrega = self.entrega(indice)
+            entrega.valor_frete = Decimal(valor)
+            entrega.save(update_fields=["valor_frete"])
+        self.assertIgualAoRecalculo()
+
+    def test_desvinculo_e_troca_de_rota_e_motorista(self):
+        entrega = self.entrega(0)
+        entrega.rota = None
+        entrega.motorista = None
+        entrega.save()
+
+        entrega = self.entrega(1)
+        entrega.rota = self.rotas[0]
+        entrega.motorista = self.motoristas[0]
+        entrega.save()
+
+        entrega = self.entrega(4)
+        entrega.rota = self.rotas[1]
+        entrega.save()
+        self.assertIgualAoRecalculo()
+
+    def test_saves_seguidos_na_mesma_instancia(self):
+        entrega = self.entrega(2)
+        entrega.status = "entregue"
+        entrega.data_entrega_real = timezone.now()
+        entrega.save()
+        entrega.valor_frete = Decimal("7.00")
+        entrega.save()
+        entrega.rota = None
+        entrega.status = "cancelada"
+        entrega.save()
+        self.assertIgualAoRecalculo()
+
+    def test_instancia_com_campos_adiados(self):
+        entrega = Entrega.objects.only("id", "valor_frete").get(pk=self.entregas[3].pk)
+        entrega.valor_frete = Decimal("3.00")
+        entrega.save()
+
+        entrega = Entrega.objects.defer("status").get(pk=self.entregas[4].pk)
+        entrega.status = "cancelada"
+        entrega.save()
+        self.assertIgualAoRecalculo()
+
+    def test_exclusao(self):
+        self.entrega(0).delete()
+        Entrega.objects.filter(
+            pk__in=[self.entregas[3].pk, self.entregas[5].pk]
+        ).delete()
+        self.assertIgualAoRecalculo()
+
+    def test_alteracoes_da_rota(self):
+        rota = Rota.objects.get(pk=self.rotas[0].pk)
+        rota.data_rota = timezone.now() - timedelta(days=2)
+        rota.save()
+        self.assertIgualAoRecalculo()
+
+        # As entregas da rota passam a contar para o veículo novo.
+        rota.veiculo = Veiculo.objects.get(pk=self.rotas[1].veiculo_id)
+        rota.save()
+        self.assertIgualAoRecalculo()
+
+        Rota.ajustar_capacidade(rota.pk, Decimal("12.50"))
+        self.assertIgualAoRecalculo()
+
+        Rota.objects.get(pk=self.rotas[1].pk).delete()
+        self.assertIgualAoRecalculo()
+
+
+class PreenchimentoInicialTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        criar_massa()
+
+    def test_migracao_preenche_com_os_models_historicos(self):
+        esperados = indicadores_calculados()
+        IndicadorDiario.objects.all().delete()
+
+        migracao = importlib.import_module(f"core.migrations.{MIGRACAO_PREENCHIMENTO}")
+        apps = (
+            MigrationLoader(connection)
+            .project_state(("core", MIGRACAO_PREENCHIMENTO))
+            .apps
+        )
+        migracao.preencher_indicadores(apps, mock.Mock(connection=connection))
+        self.assertEqual(indicadores_gravados(), esperados)
+
+    def test_reconstrucao_substitui_linhas_divergentes(self):
+        esperados = indicadores_calculados()
+        IndicadorDiario.objects.update(solicitadas=999)
+        IndicadorDiario.objects.create(
+            dia=timezone.localdate(), dimensao="cliente", referencia=0, solicitadas=5
+        )
+
+        self.assertEqual(reconstruir_indicadores(), len(esperados))
+        self.assertEqual(indicadores_gravados(), esperados)
+
+
+class ReconstrucaoNaTravaTests(TransactionTestCase):
+    """O recálculo roda na mesma transação que apaga e regrava as linhas."""
+
+    def setUp(self):
+        criar_massa()
+        self.calcular = indicadores.calcular_indicadores
+
+    def test_recalculo_dentro_da_transacao(self):
+        observado = {}
+
+        def calcular(*args, **kwargs):
+            observado["em_transacao"] = connection.in_atomic_block
+            observado["linhas_durante"] = IndicadorDiario.objects.count()
+            return self.calcular(*args, **kwargs)
+
+        with mock.patch.object(indicadores, "calcular_indicadores", calcular):
+            with CaptureQueriesContext(connection) as consultas:
+                reconstruir_indicadores()
+
+        # Sem linhas durante o cálculo: o DELETE, que toma a trava de escrita, veio antes.
+        self.assertEqual(observado, {"em_transacao": True, "linhas_durante": 0})
+        self.assertFalse(connection.in_atomic_block)
+        sql = [consulta["sql"].upper() for consulta in consultas]
+        tabela = IndicadorDiario._meta.db_table.upper()
+        apagou = next(
+            i for i, s in enumerate(sql) if s.startswith(f'DELETE FROM "{tabela}"')
+        )
+        gravou = next(
+            i for i, s in enumerate(sql) if s.startswith(f'INSERT INTO "{tabela}"')
+        )
+        self.assertLess(apagou, gravou)
+        self.assertEqual(indicadores_gravados(), indicadores_calculados())
+
+    def test_falha_no_recalculo_mantem_as_linhas_anteriores(self):
+        anteriores = indicadores_gravados()
+
+        with mock.patch.object(
+            indicadores, "calcular_indicadores", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                reconstruir_indicadores()
+
+        self.assertEqual(indicadores_gravados(), anteriores)
+
+    @skipUnless(connection.vendor == "postgresql", "LOCK TABLE só no PostgreSQL.")
+    def test_tabela_travada_no_postgresql(self):
+        with CaptureQueriesContext(connection) as consultas:
+            reconstruir_indicadores()
+        self.assertTrue(
+            any(
+                consulta["sql"].startswith("LOCK TABLE")
+                and "EXCLUSIVE MODE" in consulta["sql"]
+                for consulta in consultas
+            )
+        )
@@ -0,0 +1,157 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.models import Cliente, Entrega, Motorista, Rota, Veiculo
+
+
+def problemas_do_plano(sql, permitir_ordenacao=False):
+    """
+    Linhas do EXPLAIN QUERY PLAN que indicam varredura completa ("SCAN tabela" sem
+    índice) ou ordenação feita em memória ("USE TEMP B-TREE"), esta última aceita só
+    com `permitir_ordenacao`.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        plano = [linha[-1] for linha in cursor.fetchall()]
+    return [
+        detalhe
+        for detalhe in plano
+        if (" SCAN " in f" {detalhe} " and "USING" not in detalhe)
+        or ("USE TEMP B-TREE" in detalhe and not permitir_ordenacao)
+    ]
+
+
+@skipUnless(connection.vendor == "sqlite", "planos interpretados são os do SQLite")
+class IndicesConsultasTests(APITestCase):
+    """
+    As consultas que as rotas da API realmente fazem (ViewSet, filtros, paginação e
+    serializer) têm de usar índice: cada SELECT capturado passa pelo EXPLAIN QUERY PLAN.
+    """
+
+    maxDiff = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        cls.motorista = Motorista.objects.create(
+            user=User.objects.create_user("motorista", password="x"),
+            nome="Motorista",
+            cpf="00000000001",
+            cnh="00000000001",
+            telefone="0",
+        )
+        cls.cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        cls.veiculo = Veiculo.objects.create(
+            placa="IDX1234",
+            modelo="Van",
+            tipo="VAN",
+            capacidade_maxima=Decimal("100.00"),
+            motorista=cls.motorista,
+        )
+        cls.rota = Rota.objects.create(
+            nome="Rota", motorista=cls.motorista, veiculo=cls.veiculo
+        )
+        for numero in range(3):
+            Entrega.objects.create(
+                codigo_rastreio=f"IDX{numero:05d}",
+                cliente=cls.cliente,
+                motorista=cls.motorista,
+                rota=cls.rota,
+                endereco_origem="Origem",
+                endereco_destino="Destino",
+                capacidade_necessaria=Decimal("1.00"),
+                valor_frete=Decimal("10.00"),
+                latitude=Decimal("-15.793900"),
+                longitude=Decimal("-47.882800"),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertConsultasUsamIndices(self, usuario, urls, permitir_ordenacao=False):
+        # Token de verdade: as views assíncronas autenticam pelo header, não pelo DRF.
+        token, _ = Token.objects.get_or_create(user=usuario)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        for url in urls:
+            with self.subTest(usuario=usuario.username, url=url):
+                with CaptureQueriesContext(connection) as consultas:
+                    resposta = self.client.get(url)
+                self.assertEqual(resposta.status_code, 200, resposta.content)
+
+                falhas = {}
+                for consulta in consultas.captured_queries:
+                    sql = consulta["sql"]
+                    if sql.startswith("SELECT") and '"core_' in sql:
+                        if problemas := problemas_do_plano(sql, permitir_ordenacao):
+                            falhas[sql] = problemas
+                self.assertEqual(falhas, {})
+
+    def test_entregas_do_gestor(self):
+        self.assertConsultasUsamIndices(
+            self.gestor,
+            [
+                "/api/entregas/",
+                "/api/entregas/?status=pendente",
+                "/api/entregas/?data_solicitacao_de=2024-01-01&data_solicitacao_ate=2024-01-31",
+                "/api/entregas/?data_entrega_prevista_de=2024-01-01",
+                "/api/entregas/?ordering=codigo_rastreio",
+                "/api/entregas/proximas/?latitude=-15.7939&longitude=-47.8828",
+                "/api/entregas/alteracoes/?since=0",
+            ],
+        )
+
+    def test_entregas_do_motorista(self):
+        self.assertConsultasUsamIndices(
+            self.motorista.user,
+            [
+                "/api/entregas/",
+                "/api/entregas/?status=pendente",
+                "/api/entregas/proximas/?latitude=-15.7939&longitude=-47.8828",
+                "/api/entregas/alteracoes/?since=0",
+                f"/api/motoristas/{self.motorista.pk}/entregas/",
+            ],
+        )
+
+    def test_entregas_do_cliente(self):
+        self.assertConsultasUsamIndices(
+            self.cliente.user,
+            ["/api/entregas/", "/api/entregas/alteracoes/?since=0"],
+        )
+
+    def test_rotas_e_veiculos(self):
+        self.assertConsultasUsamIndices(
+            self.gestor,
+            [
+                "/api/rotas/",
+                "/api/rotas/?status=planejada",
+                f"/api/veiculos/{self.veiculo.pk}/rotas/",
+                "/api/veiculos/?tipo=VAN&status=DISPONIVEL",
+                "/api/veiculos/disponiveis/",
+                "/api/veiculos/proximos/?latitude=-15.7939&longitude=-47.8828",
+            ],
+        )
+        self.assertConsultasUsamIndices(
+            self.motorista.user,
+            ["/api/rotas/", f"/api/motoristas/{self.motorista.pk}/rotas/"],
+        )
+
+    def test_dashboard_da_rota(self):
+        # As entregas de uma rota (limitadas pela capacidade do veículo) são lidas pelo
+        # índice (rota, status) e ordenadas em memória pela sequência de parada.
+        self.assertConsultasUsamIndices(
+            self.gestor,
+            [f"/api/rotas/{self.rota.pk}/dashboard/"],
+            permitir_ordenacao=True,
+        )
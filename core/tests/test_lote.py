@@ -0,0 +1,165 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.models import Cliente, Entrega, EntregaEvento, Motorista, Rota, Veiculo
+
+URL = "/api/entregas/lote/"
+
+
+class CriarEntregasLoteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        cls.token = Token.objects.create(user=gestor)
+        motorista = Motorista.objects.create(
+            user=User.objects.create_user("motorista", password="x"),
+            nome="Motorista",
+            cpf="00000000001",
+            cnh="00000000001",
+            telefone="0",
+        )
+        cls.cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        cls.rota = Rota.objects.create(
+            nome="Rota",
+            motorista=motorista,
+            veiculo=Veiculo.objects.create(
+                placa="LOT1234",
+                modelo="Van",
+                capacidade_maxima=Decimal("10.00"),
+                motorista=motorista,
+            ),
+        )
+        Entrega.objects.create(
+            codigo_rastreio="LOTE0000",
+            cliente=cls.cliente,
+            rota=cls.rota,
+            endereco_origem="Origem",
+            endereco_destino="Destino",
+            capacidade_necessaria=Decimal("4.00"),
+            valor_frete=Decimal("10.00"),
+        )
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def item(self, codigo, capacidade="1.00", **campos):
+        return {
+            "codigo_rastreio": codigo,
+            "cliente": self.cliente.pk,
+            "endereco_origem": "Origem",
+            "endereco_destino": "Destino",
+            "capacidade_necessaria": capacidade,
+            "valor_frete": "10.00",
+            **campos,
+        }
+
+    def carga(self):
+        self.rota.refresh_from_db(fields=["capacidade_utilizada"])
+        return self.rota.capacidade_utilizada
+
+    def situacoes(self, resposta):
+        return [
+            (resultado["linha"], resultado["situacao"])
+            for resultado in resposta.json()["resultados"]
+        ]
+
+    def lote_misto(self):
+        return [
+            self.item("LOTE0001", "3.00", rota=self.rota.pk),
+            self.item("LOTE0002", valor_frete="dez"),
+            self.item("LOTE0000"),  # código já existente
+            # Cabe sozinha, mas não depois da LOTE0001 (4 + 3 + 4 > 10).
+            self.item("LOTE0003", "4.00", rota=self.rota.pk),
+            self.item("LOTE0004", "4.00", rota=self.rota.pk, status="cancelada"),
+            self.item("LOTE0005", cliente=999_999),
+            self.item("LOTE0001"),  # repetida no lote
+        ]
+
+    def test_tudo_ou_nada_rejeita_o_lote_e_nao_toca_a_rota(self):
+        resposta = self.client.post(URL, self.lote_misto(), format="json")
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(
+            self.situacoes(resposta),
+            [
+                (1, "valida"),
+                (2, "erro"),
+                (3, "erro"),
+                (4, "erro"),
+                (5, "valida"),
+                (6, "erro"),
+                (7, "erro"),
+            ],
+        )
+        resultados = resposta.json()["resultados"]
+        self.assertIn("valor_frete", resultados[1]["erros"])
+        self.assertIn("codigo_rastreio", resultados[2]["erros"])
+        self.assertIn(
+            "Capacidade já utilizada: 7.00", resultados[3]["erros"]["rota"][0]
+        )
+        self.assertIn("cliente", resultados[5]["erros"])
+        self.assertIn("codigo_rastreio", resultados[6]["erros"])
+
+        self.assertEqual(Entrega.objects.count(), 1)
+        self.assertEqual(self.carga(), Decimal("4.00"))
+
+    def test_ignorar_invalidas_cria_as_validas_e_reserva_a_carga(self):
+        resposta = self.client.post(
+            f"{URL}?modo=ignorar_invalidas", self.lote_misto(), format="json"
+        )
+
+        self.assertEqual(resposta.status_code, 201)
+        corpo = resposta.json()
+        self.assertEqual((corpo["criadas"], corpo["com_erro"]), (2, 5))
+        self.assertEqual(
+            [situacao for _, situacao in self.situacoes(resposta)],
+            ["criada", "erro", "erro", "erro", "criada", "erro", "erro"],
+        )
+        self.assertEqual(
+            corpo["resultados"][0]["id"],
+            Entrega.objects.get(codigo_rastreio="LOTE0001").pk,
+        )
+        # A cancelada não ocupa a rota.
+        self.assertEqual(self.carga(), Decimal("7.00"))
+        self.assertEqual(EntregaEvento.objects.filter(tipo="criada").count(), 2)
+
+    def test_rota_ocupada_por_outra_requisicao_desfaz_o_lote(self):
+        # Entre a conferência dos totais e a reserva, outra requisição lotou a rota.
+        with mock.patch.object(Rota, "reservar_capacidade", return_value=False):
+            resposta = self.client.post(
+                URL, [self.item("LOTE0001", "3.00", rota=self.rota.pk)], format="json"
+            )
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("rota", resposta.json())
+        self.assertFalse(Entrega.objects.filter(codigo_rastreio="LOTE0001").exists())
+        self.assertFalse(EntregaEvento.objects.exists())
+        self.assertEqual(self.carga(), Decimal("4.00"))
+
+    def test_ndjson(self):
+        corpo = "\n".join(
+            json.dumps(self.item(codigo)) for codigo in ("LOTE0001", "LOTE0002")
+        )
+        resposta = self.client.post(
+            URL, corpo + "\n\n", content_type="application/x-ndjson"
+        )
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.json()["criadas"], 2)
+
+    def test_ndjson_malformado(self):
+        corpo = json.dumps(self.item("LOTE0001")) + '\n{"codigo_rastreio": \n'
+        resposta = self.client.post(URL, corpo, content_type="application/x-ndjson")
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("linha 2", resposta.json()["detail"])
+        self.assertFalse(Entrega.objects.filter(codigo_rastreio="LOTE0001").exists())
@@ -0,0 +1,84 @@
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.middleware import InstrumentacaoSQLMiddleware, formato_consulta
+
+SERVER_TIMING = re.compile(r'^db;dur=\d+\.\d;desc="(\d+) consultas", app;dur=\d+\.\d$')
+
+
+def view_n_mais_1(request):
+    """Uma consulta por usuário: a assinatura de N+1."""
+    for pk in range(6):
+        User.objects.filter(pk=pk).exists()
+    User.objects.filter(pk__in=[1, 2, 3]).count()
+    return HttpResponse()
+
+
+class InstrumentacaoSQLMiddlewareTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/api/entregas/")
+
+    def chamar(self, view=view_n_mais_1, **config):
+        with override_settings(INSTRUMENTACAO_SQL=config):
+            return InstrumentacaoSQLMiddleware(view)(self.request)
+
+    def test_server_timing_conta_as_consultas(self):
+        resposta = self.chamar(LIMITE_REPETICOES=100)
+        self.assertEqual(SERVER_TIMING.match(resposta["Server-Timing"]).group(1), "7")
+
+    def test_consultas_repetidas_vao_para_o_log_em_json(self):
+        with self.assertLogs("core.sql", "WARNING") as logs:
+            self.chamar()
+
+        (registro,) = logs.records
+        dados = json.loads(registro.getMessage())
+        self.assertEqual(dados["evento"], "consultas_repetidas")
+        self.assertEqual(
+            (dados["caminho"], dados["status"], dados["consultas"]),
+            ("/api/entregas/", 200, 7),
+        )
+        self.assertEqual([item["vezes"] for item in dados["repetidas"]], [6])
+        self.assertEqual(registro.repetidas, dados["repetidas"])
+
+    def test_requisicao_fora_da_amostragem_nao_analisa_formatos(self):
+        with self.assertNoLogs("core.sql"):
+            resposta = self.chamar(AMOSTRAGEM=0.0)
+        # O cabeçalho continua em todas as requisições.
+        self.assertEqual(SERVER_TIMING.match(resposta["Server-Timing"]).group(1), "7")
+
+    def test_desabilitada_e_sem_server_timing(self):
+        self.assertNotIn("Server-Timing", self.chamar(HABILITADA=False))
+        with self.assertLogs("core.sql", "WARNING"):
+            resposta = self.chamar(SERVER_TIMING=False)
+        self.assertNotIn("Server-Timing", resposta)
+
+    def test_streaming_nao_e_medido(self):
+        def view(request):
+            view_n_mais_1(request)
+            return StreamingHttpResponse(iter([b"a"]))
+
+        with self.assertNoLogs("core.sql"):
+            resposta = self.chamar(view)
+        self.assertNotIn("Server-Timing", resposta)
+
+    async def test_views_assincronas(self):
+        async def view(request):
+            for pk in range(6):
+                await User.objects.filter(pk=pk).aexists()
+            return HttpResponse()
+
+        with override_settings(INSTRUMENTACAO_SQL={}):
+            middleware = InstrumentacaoSQLMiddleware(view)
+        with self.assertLogs("core.sql", "WARNING"):
+            resposta = await middleware(self.request)
+        self.assertEqual(SERVER_TIMING.match(resposta["Server-Timing"]).group(1), "6")
+
+    def test_formato_colapsa_listas_do_in(self):
+        self.assertEqual(
+            formato_consulta('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            formato_consulta('SELECT 1 FROM "t" WHERE "id" IN (%s)'),
+        )
@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.otimizacao import (
+    comprimento,
+    dois_opt,
+    matriz_distancias,
+    otimizar_sequencia,
+    vizinho_mais_proximo,
+)
+
+
+def paradas(quantidade, semente):
+    """Pontos aleatórios (fixos pela semente) numa área de ~60 km ao redor de Brasília."""
+    aleatorio = np.random.default_rng(semente)
+    return (
+        -15.79 + aleatorio.uniform(-0.3, 0.3, quantidade),
+        -47.88 + aleatorio.uniform(-0.3, 0.3, quantidade),
+    )
+
+
+class OtimizacaoTests(SimpleTestCase):
+    def test_dois_opt_nunca_piora_o_vizinho_mais_proximo(self):
+        for semente in range(20):
+            with self.subTest(semente=semente):
+                distancias = matriz_distancias(*paradas(60, semente))
+                guloso = vizinho_mais_proximo(distancias)
+                otimizado = dois_opt(distancias, guloso)
+
+                self.assertEqual(otimizado[0], guloso[0])
+                self.assertEqual(sorted(otimizado), list(range(60)))
+                self.assertLessEqual(
+                    comprimento(distancias, otimizado),
+                    comprimento(distancias, guloso) + 1e-9,
+                )
+
+    def test_sequencia_com_origem_e_permutacao_das_paradas(self):
+        latitudes, longitudes = paradas(40, 7)
+        ordem, distancia = otimizar_sequencia(
+            latitudes, longitudes, origem=(-15.79, -47.88)
+        )
+        self.assertEqual(sorted(ordem), list(range(40)))
+
+        # A distância devolvida é a do percurso partindo da origem.
+        pontos = [0] + [indice + 1 for indice in ordem]
+        distancias = matriz_distancias(
+            np.concatenate(([-15.79], latitudes)),
+            np.concatenate(([-47.88], longitudes)),
+        )
+        self.assertAlmostEqual(distancia, comprimento(distancias, np.array(pontos)))
+
+    def test_sem_paradas(self):
+        self.assertEqual(otimizar_sequencia([], []), ([], 0.0))
+
+    def test_500_paradas_em_menos_de_1s(self):
+        latitudes, longitudes = paradas(500, 2024)
+        inicio = time.perf_counter()
+        ordem, _ = otimizar_sequencia(latitudes, longitudes)
+        decorrido = time.perf_counter() - inicio
+
+        self.assertEqual(sorted(ordem), list(range(500)))
+        # Meta de 1 s, com folga para máquinas de CI lentas.
+        self.assertLess(decorrido, 3.0)
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import Cliente, Entrega
+
+
+class PaginacaoCursorEntregasTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        Entrega.objects.bulk_create(
+            Entrega(
+                codigo_rastreio=f"PAG{numero:05d}",
+                cliente=cliente,
+                endereco_origem="Origem",
+                endereco_destino="Destino",
+                capacidade_necessaria=Decimal("1.00"),
+                valor_frete=Decimal("10.00"),
+            )
+            for numero in range(7)
+        )
+        # Datas repetidas de propósito: o desempate pelo id é que mantém a ordem total.
+        agora = timezone.now()
+        for indice, entrega in enumerate(Entrega.objects.order_by("id")):
+            Entrega.objects.filter(pk=entrega.pk).update(
+                data_solicitacao=agora - timedelta(hours=indice // 2)
+            )
+        cls.ids = set(Entrega.objects.values_list("id", flat=True))
+
+    def setUp(self):
+        self.client.force_authenticate(self.gestor)
+
+    def percorrer(self, url):
+        ids = []
+        while url:
+            resposta = self.client.get(url)
+            self.assertEqual(resposta.status_code, 200, resposta.content)
+            ids += [entrega["id"] for entrega in resposta.json()["results"]]
+            url = resposta.json()["next"]
+        return ids
+
+    def test_ordem_padrao_percorre_todas_as_entregas(self):
+        ids = self.percorrer("/api/entregas/?page_size=2")
+        self.assertEqual(len(ids), len(self.ids))
+        self.assertEqual(set(ids), self.ids)
+
+    def test_ordering_por_data_solicitacao_percorre_todas_as_entregas(self):
+        for ordenacao in ("data_solicitacao", "-data_solicitacao"):
+            with self.subTest(ordering=ordenacao):
+                ids = self.percorrer(f"/api/entregas/?ordering={ordenacao}&page_size=2")
+                self.assertEqual(len(ids), len(self.ids))
+                self.assertEqual(set(ids), self.ids)
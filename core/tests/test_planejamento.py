@@ -0,0 +1,140 @@
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import planejamento
+from core.models import Cliente, Entrega, EntregaEvento, Motorista, Rota, Veiculo
+from core.planejamento import empacotar, planejar_rotas
+
+
+class EmpacotarTests(SimpleTestCase):
+    def test_best_fit_decreasing(self):
+        cargas, nao_alocados = empacotar(
+            [("a", 60), ("b", 50), ("c", 40), ("d", 30), ("e", 20)],
+            [("grande", 100), ("medio", 100)],
+        )
+        # a(60) e b(50) abrem um veículo cada; c(40) vai para a menor folga (a, 40);
+        # d(30) para b (folga 50); e(20) para b (folga 20).
+        self.assertEqual(
+            sorted(sorted(itens) for itens in cargas.values()),
+            [["a", "c"], ["b", "d", "e"]],
+        )
+        self.assertEqual(nao_alocados, [])
+
+    def test_item_maior_que_todos_os_veiculos_fica_de_fora(self):
+        cargas, nao_alocados = empacotar([("a", 150), ("b", 10)], [("v", 100)])
+        self.assertEqual(cargas, {"v": ["b"]})
+        self.assertEqual(nao_alocados, ["a"])
+
+    def test_carga_troca_para_o_menor_veiculo_suficiente(self):
+        # O maior veículo é aberto primeiro, mas 30 cabem no de 50.
+        cargas, _ = empacotar(
+            [("a", 20), ("b", 10)], [("grande", 100), ("pequeno", 30), ("medio", 50)]
+        )
+        self.assertEqual(cargas, {"pequeno": ["a", "b"]})
+
+    def test_cargas_pesadas_ficam_com_os_veiculos_maiores(self):
+        cargas, _ = empacotar(
+            [("a", 90), ("b", 90), ("c", 40)],
+            [("v100", 100), ("v95", 95), ("v50", 50)],
+        )
+        self.assertEqual(cargas["v50"], ["c"])
+        self.assertEqual({cargas["v100"][0], cargas["v95"][0]}, {"a", "b"})
+
+
+class PlanejarRotasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veiculos = []
+        for numero, capacidade in enumerate(("100.00", "50.00")):
+            motorista = Motorista.objects.create(
+                user=User.objects.create_user(f"motorista{numero}", password="x"),
+                nome=f"Motorista {numero}",
+                cpf=f"0000000000{numero}",
+                cnh=f"0000000000{numero}",
+                telefone="0",
+            )
+            cls.veiculos.append(
+                Veiculo.objects.create(
+                    placa=f"PLN000{numero}",
+                    modelo="Van",
+                    capacidade_maxima=Decimal(capacidade),
+                    motorista=motorista,
+                )
+            )
+        cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        for numero, capacidade in enumerate(("70.00", "40.00", "30.00", "200.00")):
+            Entrega.objects.create(
+                codigo_rastreio=f"PLN0000{numero}",
+                cliente=cliente,
+                endereco_origem="Origem",
+                endereco_destino="Destino",
+                capacidade_necessaria=Decimal(capacidade),
+                valor_frete=Decimal("10.00"),
+            )
+
+    def test_planeja_e_grava_rotas_eventos_e_capacidade(self):
+        plano = planejar_rotas()
+
+        self.assertEqual(plano["nao_alocadas"], ["PLN00003"])
+        rotas = {rota["placa"]: rota for rota in plano["rotas"]}
+        self.assertEqual(sorted(rotas["PLN0000"]["entregas"]), ["PLN00000", "PLN00002"])
+        self.assertEqual(rotas["PLN0001"]["entregas"], ["PLN00001"])
+
+        for rota in Rota.objects.all():
+            self.assertEqual(
+                rota.capacidade_utilizada,
+                sum(e.capacidade_necessaria for e in rota.entregas.all()),
+            )
+        self.assertEqual(EntregaEvento.objects.filter(tipo="atribuicao").count(), 3)
+
+        # Os veículos já têm rota em aberto: um novo planejamento não os usa.
+        self.assertEqual(planejar_rotas()["rotas"], [])
+
+    def test_simulacao_nao_grava(self):
+        plano = planejar_rotas(simular=True)
+        self.assertEqual(len(plano["rotas"]), 2)
+        self.assertFalse(Rota.objects.exists())
+
+    def test_entrega_alterada_durante_o_planejamento_desfaz_tudo(self):
+        empacotar_original = planejamento.empacotar
+
+        def empacotar_com_concorrencia(itens, veiculos):
+            # Outra requisição cancela uma das entregas depois da leitura.
+            Entrega.objects.filter(codigo_rastreio="PLN00002").update(
+                status="cancelada"
+            )
+            return empacotar_original(itens, veiculos)
+
+        with mock.patch.object(planejamento, "empacotar", empacotar_com_concorrencia):
+            with self.assertRaises(ValidationError):
+                planejar_rotas()
+
+        self.assertFalse(Rota.objects.exists())
+        self.assertFalse(Entrega.objects.filter(rota__isnull=False).exists())
+        self.assertFalse(EntregaEvento.objects.exists())
+
+    @skipUnless(
+        connection.features.has_select_for_update_skip_locked,
+        "o banco não trava linhas com SKIP LOCKED",
+    )
+    def test_veiculos_travados_durante_o_planejamento(self):
+        with CaptureQueriesContext(connection) as consultas:
+            planejar_rotas()
+        self.assertTrue(
+            any(
+                'FROM "core_veiculo"' in consulta["sql"]
+                and "SKIP LOCKED" in consulta["sql"]
+                for consulta in consultas
+            )
+        )
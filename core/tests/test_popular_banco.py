@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from core.indicadores import reconstruir_indicadores
+from core.models import Entrega, EntregaEvento, IndicadorDiario
+
+
+class PopularBancoTests(TestCase):
+    def popular(self, **opcoes):
+        call_command(
+            "popular_banco",
+            clientes=3,
+            motoristas=2,
+            entregas=10,
+            seed=1,
+            stdout=StringIO(),
+            **opcoes,
+        )
+
+    def test_limpar_apaga_eventos_indicadores_e_usuarios_gerados(self):
+        gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        self.popular()
+        Token.objects.create(
+            user=User.objects.filter(username__startswith="cliente").first()
+        )
+        Entrega.objects.first().save()  # gera um EntregaEvento
+
+        self.popular(limpar=True)
+
+        self.assertEqual(User.objects.filter(is_staff=False).count(), 5)
+        self.assertTrue(User.objects.filter(pk=gestor.pk).exists())
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(Entrega.objects.count(), 10)
+        self.assertFalse(EntregaEvento.objects.exists())
+
+        # Os indicadores reconstruídos pelo comando batem com uma reconstrução do zero.
+        indicadores = list(IndicadorDiario.objects.order_by("pk").values())
+        reconstruir_indicadores()
+        self.assertEqual(
+            [dict(linha, id=None) for linha in indicadores],
+            [
+                dict(linha, id=None)
+                for linha in IndicadorDiario.objects.order_by("pk").values()
+            ],
+        )
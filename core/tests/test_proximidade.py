@@ -0,0 +1,136 @@
+import math
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Cliente, Entrega
+from core.otimizacao import RAIO_TERRA_KM
+from core.proximidade import (
+    MAX_CELULAS,
+    PRECISAO,
+    _sucessor,
+    buscar_proximos,
+    celulas,
+    geohash,
+)
+
+CENTRO = (-15.7939, -47.8828)
+# Fronteira entre células de precisão 5 (múltiplo exato da altura de 180 / 2**12).
+FRONTEIRA = (-15.8203125, -47.8125)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class GeohashTests(SimpleTestCase):
+    def test_codificacao(self):
+        self.assertEqual(geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(geohash(-15.7939, -47.8828, 5), "6vjyn")
+        self.assertIsNone(geohash(None, 10))
+
+    def test_sucessor(self):
+        self.assertEqual(_sucessor("6vjyn"), "6vjyp")
+        self.assertEqual(_sucessor("6vjyz"), "6vjz")
+        self.assertIsNone(_sucessor("zz"))
+
+    def test_raio_grande_usa_precisao_mais_grossa(self):
+        prefixos = celulas(*CENTRO, 2000)
+        self.assertLessEqual(len(prefixos), MAX_CELULAS)
+        self.assertLess(len(prefixos[0]), PRECISAO)
+
+
+class BuscarProximosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        aleatorio = random.Random(21)
+        pontos = [
+            (
+                round(CENTRO[0] + aleatorio.uniform(-0.5, 0.5), 6),
+                round(CENTRO[1] + aleatorio.uniform(-0.5, 0.5), 6),
+            )
+            for _ in range(200)
+        ]
+        # Pontos sobre a fronteira das células e logo ao lado dela.
+        pontos += [
+            (FRONTEIRA[0] + dlat, FRONTEIRA[1] + dlon)
+            for dlat in (-0.000001, 0, 0.000001)
+            for dlon in (-0.000001, 0, 0.000001)
+        ]
+        # E alguns longe, só alcançados por raios grandes.
+        pontos += [(-23.5505, -46.6333), (-3.7319, -38.5267), (-30.0346, -51.2177)]
+        Entrega.objects.bulk_create(
+            Entrega(
+                codigo_rastreio=f"PRX{numero:05d}",
+                cliente=cliente,
+                endereco_origem="Origem",
+                endereco_destino="Destino",
+                capacidade_necessaria=Decimal("1.00"),
+                valor_frete=Decimal("10.00"),
+                latitude=Decimal(f"{latitude:.6f}"),
+                longitude=Decimal(f"{longitude:.6f}"),
+                geohash=geohash(latitude, longitude),
+            )
+            for numero, (latitude, longitude) in enumerate(pontos)
+        )
+        cls.pontos = {
+            pk: (float(latitude), float(longitude))
+            for pk, latitude, longitude in Entrega.objects.values_list(
+                "id", "latitude", "longitude"
+            )
+        }
+
+    def forca_bruta(self, latitude, longitude, raio_km):
+        distancias = {
+            pk: haversine_km(latitude, longitude, *ponto)
+            for pk, ponto in self.pontos.items()
+        }
+        return {pk for pk, distancia in distancias.items() if distancia <= raio_km}
+
+    def conferir(self, latitude, longitude, raio_km):
+        resultado = buscar_proximos(
+            Entrega.objects.all(), latitude, longitude, raio_km, limite=10_000
+        )
+        self.assertEqual(
+            {pk for pk, _ in resultado},
+            self.forca_bruta(latitude, longitude, raio_km),
+        )
+        distancias = [distancia for _, distancia in resultado]
+        self.assertEqual(distancias, sorted(distancias))
+
+    def test_igual_a_forca_bruta(self):
+        aleatorio = random.Random(16)
+        for _ in range(50):
+            latitude = CENTRO[0] + aleatorio.uniform(-0.5, 0.5)
+            longitude = CENTRO[1] + aleatorio.uniform(-0.5, 0.5)
+            raio_km = aleatorio.choice((0.5, 2, 5, 15, 40))
+            with self.subTest(latitude=latitude, longitude=longitude, raio=raio_km):
+                self.conferir(latitude, longitude, raio_km)
+
+    def test_raio_acima_de_max_celulas(self):
+        self.conferir(*CENTRO, 1200)
+        self.conferir(*CENTRO, 3000)
+
+    def test_ponto_na_fronteira_das_celulas(self):
+        for raio_km in (0.0001, 0.001, 0.5):
+            with self.subTest(raio=raio_km):
+                self.conferir(*FRONTEIRA, raio_km)
+
+    def test_limite_pega_os_mais_proximos(self):
+        todos = buscar_proximos(Entrega.objects.all(), *CENTRO, 30, limite=10_000)
+        self.assertEqual(
+            buscar_proximos(Entrega.objects.all(), *CENTRO, 30, limite=5), todos[:5]
+        )
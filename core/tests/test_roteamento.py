@@ -0,0 +1,89 @@
+import asyncio
+from unittest import mock
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core import roteamento
+from core.middleware import ReplicaLeituraMiddleware
+from core.roteamento import escopo_leitura, lendo_da_replica
+from core.views import RotaViewSet
+from core.views_async import dashboard, eventos_rota
+
+
+def view_de_leitura(request):
+    return HttpResponse()
+
+
+@mock.patch.object(roteamento, "replica_configurada", lambda: True)
+class ReplicaLeituraMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/api/rotas/")
+
+    def middleware(self, get_response):
+        def chamar_view(request):
+            middleware.process_view(request, view_de_leitura, (), {})
+            return get_response(request)
+
+        middleware = ReplicaLeituraMiddleware(chamar_view)
+        return middleware
+
+    def test_escopo_desfeito_ao_fim_da_requisicao(self):
+        lidos = []
+
+        def view(request):
+            lidos.append(lendo_da_replica())
+            return HttpResponse()
+
+        self.middleware(view)(self.request)
+        self.assertEqual(lidos, [True])
+        self.assertFalse(lendo_da_replica())
+
+    def test_escopo_desfeito_com_excecao(self):
+        def view(request):
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            self.middleware(view)(self.request)
+        self.assertFalse(lendo_da_replica())
+
+    def test_streaming_mantem_a_leitura_escolhida(self):
+        def partes():
+            yield str(lendo_da_replica())
+            yield str(lendo_da_replica())
+
+        resposta = self.middleware(lambda request: StreamingHttpResponse(partes()))(
+            self.request
+        )
+        self.assertFalse(lendo_da_replica())
+        self.assertEqual(b"".join(resposta.streaming_content), b"TrueTrue")
+        self.assertFalse(lendo_da_replica())
+
+    def test_escopo_desfeito_no_modo_assincrono(self):
+        lidos = []
+
+        async def view(request):
+            middleware.process_view(request, view_de_leitura, (), {})
+            lidos.append(lendo_da_replica())
+            return HttpResponse()
+
+        middleware = ReplicaLeituraMiddleware(view)
+        asyncio.run(middleware(self.request))
+        self.assertEqual(lidos, [True])
+        self.assertFalse(lendo_da_replica())
+
+    def test_escopo_aninhado_restaura_o_anterior(self):
+        with escopo_leitura(True):
+            with escopo_leitura():
+                self.assertFalse(lendo_da_replica())
+            self.assertTrue(lendo_da_replica())
+        self.assertFalse(lendo_da_replica())
+
+
+class OptOutTests(SimpleTestCase):
+    def test_so_o_stream_de_eventos_fica_no_primario(self):
+        self.assertTrue(
+            roteamento.view_usa_replica(RotaViewSet.as_view({"get": "list"}))
+        )
+        self.assertTrue(roteamento.view_usa_replica(dashboard))
+        self.assertFalse(roteamento.view_usa_replica(eventos_rota))
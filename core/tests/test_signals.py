@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.cache import chave_dashboard_rota
+from core.models import Cliente, Entrega, Motorista, Rota, Veiculo
+
+
+class InvalidacaoDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.motorista = Motorista.objects.create(
+            user=User.objects.create_user("motorista", password="x"),
+            nome="Motorista",
+            cpf="00000000001",
+            cnh="00000000001",
+            telefone="0",
+        )
+        cls.veiculo = Veiculo.objects.create(
+            placa="SIG1234",
+            modelo="Van",
+            capacidade_maxima=Decimal("100.00"),
+            motorista=cls.motorista,
+        )
+        cls.rota = Rota.objects.create(
+            nome="Rota", motorista=cls.motorista, veiculo=cls.veiculo
+        )
+        cls.entrega = Entrega.objects.create(
+            codigo_rastreio="SIG00001",
+            cliente=Cliente.objects.create(
+                user=User.objects.create_user("cliente", password="x"),
+                nome="Cliente",
+                endereco="Rua A",
+                telefone="0",
+            ),
+            rota=cls.rota,
+            endereco_origem="Origem",
+            endereco_destino="Destino",
+            capacidade_necessaria=Decimal("1.00"),
+            valor_frete=Decimal("10.00"),
+        )
+
+    def setUp(self):
+        self.chave = chave_dashboard_rota(self.rota.pk)
+        cache.set(self.chave, {"antigo": True})
+
+    def assertInvalidadoSoAposCommit(self, alterar):
+        with self.captureOnCommitCallbacks(execute=True):
+            alterar()
+            # Antes do commit, o cache ainda tem a versão anterior.
+            self.assertIsNotNone(cache.get(self.chave))
+        self.assertIsNone(cache.get(self.chave))
+
+    def test_save_e_delete_de_entrega(self):
+        entrega = Entrega.objects.get(pk=self.entrega.pk)
+        entrega.status = "em_transito"
+        self.assertInvalidadoSoAposCommit(entrega.save)
+
+        cache.set(self.chave, {"antigo": True})
+        self.assertInvalidadoSoAposCommit(entrega.delete)
+
+    def test_entrega_que_sai_da_rota_invalida_a_rota_anterior(self):
+        entrega = Entrega.objects.get(pk=self.entrega.pk)
+        entrega.rota = None
+        self.assertInvalidadoSoAposCommit(entrega.save)
+
+    def test_rota_motorista_e_veiculo(self):
+        for instancia in (self.rota, self.motorista, self.veiculo):
+            with self.subTest(model=type(instancia).__name__):
+                cache.set(self.chave, {"antigo": True})
+                self.assertInvalidadoSoAposCommit(instancia.save)
@@ -0,0 +1,193 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Max
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.eventos import canal_rotas, evento_entrega
+from core.historico import estado, evento_alteracao, evento_criacao, registrar_eventos
+from core.models import Cliente, Entrega, EntregaEvento, Motorista, Rota, Veiculo
+from core.views_async import stream_eventos
+
+
+class RastreamentoTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        gestor = User.objects.create_user("gestor", password="x", is_staff=True)
+        cls.token = Token.objects.create(user=gestor)
+        cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        Entrega.objects.create(
+            codigo_rastreio="RAS00001",
+            cliente=cliente,
+            endereco_origem="Origem",
+            endereco_destino="Destino",
+            capacidade_necessaria=Decimal("1.00"),
+            valor_frete=Decimal("10.00"),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_fields_e_omit(self):
+        url = "/api/entregas/RAS00001/rastreamento/"
+        completa = self.client.get(url).json()
+
+        # Com a representação completa já em cache, o recorte sai dela.
+        resposta = self.client.get(f"{url}?fields=status,codigo_rastreio")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(
+            resposta.json(), {"codigo_rastreio": "RAS00001", "status": "pendente"}
+        )
+
+        resposta = self.client.get(f"{url}?omit=observacoes")
+        completa.pop("observacoes")
+        self.assertEqual(resposta.json(), completa)
+
+    def test_campo_invalido(self):
+        resposta = self.client.get(
+            "/api/entregas/RAS00001/rastreamento/?fields=status,senha"
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("fields", resposta.json())
+
+
+class StreamEventosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        motorista = Motorista.objects.create(
+            user=User.objects.create_user("motorista", password="x"),
+            nome="Motorista",
+            cpf="00000000001",
+            cnh="00000000001",
+            telefone="0",
+        )
+        cls.rota = Rota.objects.create(
+            nome="Rota",
+            motorista=motorista,
+            veiculo=Veiculo.objects.create(
+                placa="SSE1234",
+                modelo="Van",
+                capacidade_maxima=Decimal("100.00"),
+                motorista=motorista,
+            ),
+        )
+        cliente = Cliente.objects.create(
+            user=User.objects.create_user("cliente", password="x"),
+            nome="Cliente",
+            endereco="Rua A",
+            telefone="0",
+        )
+        cls.entregas = [
+            Entrega.objects.create(
+                codigo_rastreio=f"SSE0000{numero}",
+                cliente=cliente,
+                rota=cls.rota,
+                endereco_origem="Origem",
+                endereco_destino="Destino",
+                capacidade_necessaria=Decimal("1.00"),
+                valor_frete=Decimal("10.00"),
+            )
+            for numero in range(3)
+        ]
+        registrar_eventos(evento_criacao(entrega) for entrega in cls.entregas)
+
+    def alterar_em_massa(self, **campos):
+        """Como as ações em massa: bulk_update com o mesmo atualizado_em e eventos."""
+        entregas = list(Entrega.objects.filter(rota=self.rota).order_by("id"))
+        estados = [estado(entrega) for entrega in entregas]
+        agora = timezone.now()
+        for entrega in entregas:
+            for campo, valor in campos.items():
+                setattr(entrega, campo, valor)
+            entrega.atualizado_em = agora
+        Entrega.objects.bulk_update(entregas, [*campos, "atualizado_em"])
+        registrar_eventos(
+            evento_alteracao(entrega, antes)
+            for entrega, antes in zip(entregas, estados)
+        )
+        return entregas
+
+    async def ultimo_evento(self):
+        return (await EntregaEvento.objects.aaggregate(ultimo=Max("id")))["ultimo"]
+
+    async def mensagens(self, stream, quantidade):
+        mensagens = []
+        while len(mensagens) < quantidade:
+            mensagem = await anext(stream)
+            if not mensagem.startswith((":", "retry:")):
+                mensagens.append(mensagem)
+        return mensagens
+
+    def dados(self, mensagem):
+        linhas = dict(linha.split(": ", 1) for linha in mensagem.strip().split("\n"))
+        return linhas.get("id"), json.loads(linhas.get("data", "null"))
+
+    @mock.patch("core.views_async.INTERVALO_SINCRONIZACAO", 0.01)
+    async def test_sincroniza_pelo_id_dos_eventos(self):
+        cursor = await self.ultimo_evento()
+        stream = stream_eventos(self.rota.id, cursor, False)
+        await anext(stream)
+
+        # Uma das entregas já chegou pelo canal em memória.
+        primeira, *_ = await sync_to_async(self.alterar_em_massa)(status="em_transito")
+        canal_rotas.publicar(
+            self.rota.id,
+            evento_entrega(
+                {
+                    "codigo_rastreio": primeira.codigo_rastreio,
+                    "status": primeira.status,
+                    "rota_id": primeira.rota_id,
+                    "sequencia": primeira.sequencia,
+                    "atualizado_em": primeira.atualizado_em,
+                }
+            ),
+        )
+        mensagens = await self.mensagens(stream, 3)
+
+        # Mesmo atualizado_em para todas: nenhuma se perde, nenhuma se repete.
+        self.assertEqual(
+            [self.dados(mensagem)[1]["codigo"] for mensagem in mensagens],
+            ["SSE00000", "SSE00001", "SSE00002"],
+        )
+        self.assertEqual(
+            [self.dados(mensagem)[0] for mensagem in mensagens],
+            [None, None, str(await self.ultimo_evento())],
+        )
+
+        # Entregas que saem da rota também são avisadas, com a rota nova.
+        await sync_to_async(self.alterar_em_massa)(rota=None, motorista=None)
+        mensagens = await self.mensagens(stream, 3)
+        self.assertEqual(
+            [self.dados(mensagem)[1]["rota"] for mensagem in mensagens], [None] * 3
+        )
+        await stream.aclose()
+
+    @mock.patch("core.views_async.INTERVALO_SINCRONIZACAO", 0.01)
+    async def test_retoma_do_cursor(self):
+        cursor = await self.ultimo_evento()
+        await sync_to_async(self.alterar_em_massa)(status="em_transito")
+        await sync_to_async(self.alterar_em_massa)(status="entregue")
+
+        stream = stream_eventos(self.rota.id, cursor, True)
+        mensagens = await self.mensagens(stream, 3)
+        self.assertEqual(
+            {self.dados(mensagem)[1]["status"] for mensagem in mensagens},
+            {"entregue"},
+        )
+
+        # Nada novo: a próxima sincronização não reenvia.
+        self.assertTrue((await anext(stream)).startswith(":"))
+        await stream.aclose()
@@ -6,7 +6,15 @@ from drf_spectacular.views import (
     SpectacularRedocView,
     SpectacularSwaggerView,
 )
-from .views import MotoristaViewSet, VeiculoViewSet, ClienteViewSet, EntregaViewSet, RotaViewSet
+from .views import (
+    MotoristaViewSet,
+    VeiculoViewSet,
+    ClienteViewSet,
+    EntregaViewSet,
+    RotaViewSet,
+    IndicadoresViewSet,
+)
+from . import views_async
 
 router = DefaultRouter()
 
@@ -15,10 +23,19 @@ router.register(r"veiculos", VeiculoViewSet, basename="veiculo")
 router.register(r"clientes", ClienteViewSet, basename="cliente")
 router.register(r"entregas", EntregaViewSet, basename="entrega")
 router.register(r"rotas", RotaViewSet, basename="rota")
+router.register(r"indicadores", IndicadoresViewSet, basename="indicadores")
 urlpatterns = [
     path("auth/token/", obtain_auth_token, name="api_token_auth"),
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
     path("docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("docs/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    # Views assíncronas (core/views_async.py); os nomes seguem o padrão do router.
+    path(
+        "entregas/<str:codigo_rastreio>/rastreamento/",
+        views_async.rastreamento,
+        name="entrega-rastreamento",
+    ),
+    path("rotas/<int:pk>/dashboard/", views_async.dashboard, name="rota-dashboard"),
+    path("rotas/<int:pk>/eventos/", views_async.eventos_rota, name="rota-eventos"),
     path("", include(router.urls)),
 ]
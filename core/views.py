@@ -6,7 +6,15 @@ from django.db import transaction
 from django.db.models import Sum
 from decimal import Decimal
 
-from .models import Cliente, Motorista, Veiculo, Rota, Entrega
+from .models import (
+    Cliente,
+    Motorista,
+    Veiculo,
+    Rota,
+    Entrega,
+    EntregaEvento,
+    IndicadorDiario,
+)
 from .serializers import (
     ClienteSerializer,
     MotoristaSerializer,
@@ -15,19 +23,142 @@ from .serializers import (
     EntregaMotoristaUpdateSerializer,
     VeiculoSerializer,
     EntregaClienteSerializer,
+    EntregaEventoSerializer,
+    EntregaEventoClienteSerializer,
+    AlteracoesEntregasParamsSerializer,
+    AlteracoesEntregasResponseSerializer,
     AtribuirVeiculoRequestSerializer,
     AtribuirMotoristaRequestSerializer,
     AtribuirEntregasRotaRequestSerializer,
+    ExportarEntregasParamsSerializer,
+    BuscarEntregasParamsSerializer,
+    CriarEntregasLoteParamsSerializer,
+    CriarEntregasLoteResponseSerializer,
     MensagemResponseSerializer,
-    RotaDashboardResponseSerializer,
+    OtimizarRotaRequestSerializer,
+    OtimizarRotaResponseSerializer,
+    PlanejarRotasRequestSerializer,
+    PlanejarRotasResponseSerializer,
+    IndicadoresParamsSerializer,
+    IndicadorSerializer,
+    EntregasProximasParamsSerializer,
+    EntregaProximaSerializer,
+    VeiculosProximosParamsSerializer,
+    VeiculoProximoSerializer,
 )
 from .permissions import IsGestor, IsMotorista, IsCliente
+from .perfil import PerfilMixin
+from .exportacao import CHUNK_SIZE, FORMATOS
+from .serializacao import LeituraRapida, ListagemRapidaMixin
+from .lote import MAX_ITENS, criar_entregas_em_lote
+from .busca import buscar_ids
+from . import indicadores
+from .historico import (
+    estado,
+    evento_alteracao,
+    evento_criacao,
+    evento_remocao,
+    registrar_eventos,
+)
+from .otimizacao import otimizar_sequencia
+from .planejamento import planejar_rotas
+from .proximidade import buscar_proximos
+from .parsers import NDJSONParser
+from rest_framework.parsers import JSONParser
+from rest_framework.filters import OrderingFilter, SearchFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from .filters import EntregaFilter, RotaFilter, SelecaoCamposFilter, VeiculoFilter
+from .cache import invalidar_dashboard_rota
+from .pagination import (
+    AcaoPaginadaMixin,
+    BuscaPaginacao,
+    EntregaCursorPaginacao,
+    IndicadoresPaginacao,
+    RotaCursorPaginacao,
+)
 from drf_spectacular.utils import extend_schema
 from rest_framework.exceptions import ValidationError
 from django.utils import timezone
+from django.http import StreamingHttpResponse
+from datetime import datetime, time, timedelta
+from itertools import islice
+import heapq
+from drf_spectacular.utils import OpenApiTypes
+
+
+def rotas_visiveis(perfil):
+    """Rotas que o perfil pode ver: todas para o gestor, as próprias para o motorista."""
+    queryset = Rota.objects.select_related("motorista", "veiculo")
+
+    if perfil.is_gestor:
+        return queryset
+
+    if perfil.is_motorista:
+        return queryset.filter(motorista=perfil.motorista)
+
+    return Rota.objects.none()
+
+
+def entregas_visiveis(perfil):
+    """Entregas que o perfil pode ver (gestor: todas; motorista/cliente: as suas)."""
+    if perfil.is_gestor:
+        return Entrega.objects.all()
+    if perfil.is_motorista:
+        return Entrega.objects.filter(motorista=perfil.motorista)
+    if perfil.is_cliente:
+        return Entrega.objects.filter(cliente=perfil.cliente)
+    return Entrega.objects.none()
+
 
+def fontes_eventos(perfil):
+    """
+    Consultas que compõem o feed de alterações do perfil: o motorista recebe os eventos
+    das entregas que são ou eram dele (para saber que uma saiu da sua lista); o cliente,
+    só os que alteram algo que ele vê.
 
-class ClienteViewSet(viewsets.ModelViewSet):
+    Cada fonte é lida por um índice terminado no id; o motorista tem duas em vez de um
+    OR, que obrigaria o banco a ordenar o resultado em memória.
+    """
+    if perfil.is_gestor:
+        return [EntregaEvento.objects.all()]
+    if perfil.is_motorista:
+        return [
+            EntregaEvento.objects.filter(motorista=perfil.motorista),
+            EntregaEvento.objects.filter(motorista_anterior=perfil.motorista),
+        ]
+    if perfil.is_cliente:
+        return [
+            EntregaEvento.objects.filter(cliente=perfil.cliente, visivel_cliente=True)
+        ]
+    return []
+
+
+def listar_proximos(queryset, params):
+    """Objetos do queryset perto do ponto pedido, em ordem de distância e com distancia_km."""
+    proximos = buscar_proximos(
+        queryset,
+        params["latitude"],
+        params["longitude"],
+        params["raio_km"],
+        params["limite"],
+    )
+    objetos = queryset.model.objects.in_bulk([id for id, _ in proximos])
+    resultado = []
+    for id, distancia in proximos:
+        objeto = objetos[id]
+        objeto.distancia_km = round(distancia, 3)
+        resultado.append(objeto)
+    return resultado
+
+
+def serializer_leitura_entrega(perfil):
+    """Cliente vê a versão restrita da entrega; os demais perfis, a completa."""
+    if perfil.is_cliente and not perfil.is_gestor:
+        return EntregaClienteSerializer
+    return EntregaSerializer
+
+
+class ClienteViewSet(PerfilMixin, viewsets.ModelViewSet):
     """
     Gerencia os Clientes.
     - Gestor: Pode cadastrar, listar todos e deletar.
@@ -36,26 +167,29 @@ class ClienteViewSet(viewsets.ModelViewSet):
 
     serializer_class = ClienteSerializer
     permission_classes = [IsGestor | IsCliente]
+    filter_backends = [SelecaoCamposFilter]
 
     def get_queryset(self):
-        user = self.request.user
+        perfil = self.request.perfil
 
-        if user.is_staff:
+        if perfil.is_gestor:
             return Cliente.objects.all()
-        if hasattr(user, "cliente"):
-            return Cliente.objects.filter(id=user.cliente.id)
+        if perfil.is_cliente:
+            return Cliente.objects.filter(id=perfil.cliente.id)
         return Cliente.objects.none()
 
 
-class MotoristaViewSet(viewsets.ModelViewSet):
+class MotoristaViewSet(PerfilMixin, AcaoPaginadaMixin, viewsets.ModelViewSet):
     """
     Gerenciamento de Motoristas (CRUD).
     - Listar/Criar/Deletar: Apenas Gestores.
     - Detalhes (Retrieve): Gestores ou o próprio Motorista.
     """
+
     queryset = Motorista.objects.all()
     serializer_class = MotoristaSerializer
     permission_classes = [IsGestor | IsMotorista]
+    filter_backends = [SelecaoCamposFilter]
 
     def get_permissions(self):
         """
@@ -63,7 +197,7 @@ class MotoristaViewSet(viewsets.ModelViewSet):
         """
         if self.action in ["list", "create", "destroy"]:
             return [IsGestor()]
-            
+
         return super().get_permissions()
 
     @extend_schema(
@@ -75,24 +209,28 @@ class MotoristaViewSet(viewsets.ModelViewSet):
         detail=True,
         methods=["get"],
         permission_classes=[IsMotorista],
+        pagination_class=EntregaCursorPaginacao,
     )
     def entregas(self, request, pk=None):
         motorista = self.get_object()
         entregas = Entrega.objects.filter(motorista=motorista)
-        serializer = EntregaSerializer(entregas, many=True)
-        return Response(serializer.data)
+        return self.listar_paginado(entregas, EntregaSerializer)
 
     @extend_schema(
         summary="Listar Rotas do Motorista",
         description="Retorna todas as rotas vinculadas ao motorista informado.",
         responses={200: RotaSerializer(many=True)},
     )
-    @action(detail=True, methods=["get"], permission_classes=[IsMotorista])
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[IsMotorista],
+        pagination_class=RotaCursorPaginacao,
+    )
     def rotas(self, request, pk=None):
         motorista = self.get_object()
         rotas = Rota.objects.filter(motorista=motorista)
-        serializer = RotaSerializer(rotas, many=True)
-        return Response(serializer.data)
+        return self.listar_paginado(rotas, RotaSerializer)
 
     @extend_schema(
         summary="Atribuir Veículo ao Motorista (Gestor)",
@@ -128,7 +266,9 @@ class MotoristaViewSet(viewsets.ModelViewSet):
         )
 
 
-class VeiculoViewSet(viewsets.ModelViewSet):
+class VeiculoViewSet(
+    PerfilMixin, AcaoPaginadaMixin, ListagemRapidaMixin, viewsets.ModelViewSet
+):
     """
     ViewSet para gerenciamento completo da frota de veículos.
 
@@ -138,30 +278,61 @@ class VeiculoViewSet(viewsets.ModelViewSet):
     queryset = Veiculo.objects.all()
     serializer_class = VeiculoSerializer
     permission_classes = [IsGestor]
+    filter_backends = [
+        DjangoFilterBackend,
+        SearchFilter,
+        OrderingFilter,
+        SelecaoCamposFilter,
+    ]
+    filterset_class = VeiculoFilter
+    search_fields = ["placa", "modelo"]
+    ordering_fields = ["id", "placa"]
 
     @extend_schema(
         summary="Listar Veículos Disponíveis",
         description="Retorna uma lista filtrada contendo apenas os veículos que estão com o status **'DISPONIVEL'** no momento.",
         responses={200: VeiculoSerializer(many=True)},
+        filters=False,
     )
     @action(detail=False)
     def disponiveis(self, request):
         disponiveis = Veiculo.objects.filter(status="DISPONIVEL")
-        serializer = self.get_serializer(disponiveis, many=True)
 
-        return Response(serializer.data)
+        return self.listar_paginado(disponiveis, VeiculoSerializer)
+
+    @extend_schema(
+        summary="Veículos Próximos de um Ponto",
+        description=(
+            "Veículos (por padrão os com status **'DISPONIVEL'**) cuja última posição "
+            "conhecida está a até `raio_km` do ponto, do mais próximo para o mais "
+            "distante. Ex.: o veículo disponível mais perto de uma coleta."
+        ),
+        parameters=[VeiculosProximosParamsSerializer],
+        responses={200: VeiculoProximoSerializer(many=True)},
+        filters=False,
+    )
+    @action(detail=False)
+    def proximos(self, request):
+        params = VeiculosProximosParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        veiculos = listar_proximos(
+            Veiculo.objects.filter(status=params.validated_data["status"]),
+            params.validated_data,
+        )
+        return Response(VeiculoProximoSerializer(veiculos, many=True).data)
 
     @extend_schema(
         summary="Obter Histórico de Rotas",
         description="Recupera todas as rotas (histórico de viagens) vinculadas a este veículo específico.",
         responses={200: RotaSerializer(many=True)},
+        filters=False,
     )
-    @action(detail=True)
+    @action(detail=True, pagination_class=RotaCursorPaginacao)
     def rotas(self, request, pk=None):
         veiculo = self.get_object()
-        serializer = RotaSerializer(veiculo.rotas.all(), many=True)
 
-        return Response(serializer.data)
+        return self.listar_paginado(veiculo.rotas.all(), RotaSerializer)
 
     def perform_destroy(self, instance):
         """
@@ -175,70 +346,136 @@ class VeiculoViewSet(viewsets.ModelViewSet):
         super().perform_destroy(instance)
 
 
-class RotaViewSet(viewsets.ModelViewSet):
+class RotaViewSet(PerfilMixin, ListagemRapidaMixin, viewsets.ModelViewSet):
     """
     Gerenciamento de Rotas.
     - Gestores: Acesso total (CRUD).
     - Motoristas: Visualizam apenas suas próprias rotas.
     """
+
     serializer_class = RotaSerializer
     permission_classes = [IsGestor | IsMotorista]
+    pagination_class = RotaCursorPaginacao
+    filter_backends = [
+        DjangoFilterBackend,
+        SearchFilter,
+        OrderingFilter,
+        SelecaoCamposFilter,
+    ]
+    filterset_class = RotaFilter
+    search_fields = ["nome"]
+    ordering_fields = ["id", "data_rota"]
 
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_staff:
-            return Rota.objects.all()
-        
-        if hasattr(user, "motorista"):
-            return Rota.objects.filter(motorista=user.motorista)
-            
-        return Rota.objects.none()
+        return rotas_visiveis(self.request.perfil)
+
+    @extend_schema(
+        summary="Planejar Rotas Automaticamente (Gestor)",
+        description=(
+            "Distribui as entregas pendentes e sem rota entre os veículos disponíveis com "
+            "motorista ativo e sem rota em aberto (best-fit decreasing pela "
+            "capacidade_necessaria), criando uma rota planejada por veículo usado. "
+            "Com `simular`, apenas devolve o plano."
+        ),
+        request=PlanejarRotasRequestSerializer,
+        responses={
+            200: PlanejarRotasResponseSerializer,
+            201: PlanejarRotasResponseSerializer,
+        },
+    )
+    @action(detail=False, methods=["post"], permission_classes=[IsGestor])
+    def planejar(self, request):
+        serializer = PlanejarRotasRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        simular = serializer.validated_data["simular"]
+
+        plano = planejar_rotas(simular=simular, usuario=request.user)
+
+        if simular or not plano["rotas"]:
+            return Response(plano, status=status.HTTP_200_OK)
+        return Response(plano, status=status.HTTP_201_CREATED)
 
     @extend_schema(
-        summary="Dashboard da Rota (Visão Completa)",
-        description="Retorna a composição completa: Dados da Rota, Motorista, Veículo e lista de Entregas.",
-        responses={200: RotaDashboardResponseSerializer},
+        summary="Otimizar Sequência de Paradas (Gestor)",
+        description=(
+            "Ordena as entregas ainda não concluídas da rota pela menor distância "
+            "(haversine, vizinho mais próximo + 2-opt) e grava a `sequencia` de cada uma. "
+            "Entregas sem coordenadas ficam ao final; entregues e canceladas saem da sequência."
+        ),
+        request=OtimizarRotaRequestSerializer,
+        responses={200: OtimizarRotaResponseSerializer},
     )
-    @action(detail=True, methods=["get"])
-    def dashboard(self, request, pk=None):
+    @action(detail=True, methods=["post"], permission_classes=[IsGestor])
+    def otimizar(self, request, pk=None):
         rota = self.get_object()
-        
-        entregas = rota.entregas.all()
-        
-        total_entregas = entregas.count()
-        entregas_concluidas = entregas.filter(status="entregue").count()
-        
-        data = {
-            "rota": {
-                "id": rota.id,
-                "nome": rota.nome,
-                "status": rota.status,
-                "data": rota.data_rota,
-            },
-            "motorista": {
-                "nome": rota.motorista.nome,
-                "telefone": rota.motorista.telefone,
-            },
-            "veiculo": {
-                "modelo": rota.veiculo.modelo,
-                "placa": rota.veiculo.placa,
-                "capacidade_maxima": rota.veiculo.capacidade_maxima,
-            },
-            "progresso": {
-                "total_entregas": total_entregas,
-                "concluidas": entregas_concluidas,
-                "pendentes": total_entregas - entregas_concluidas,
-            },
-            "entregas": [
-                {
-                    "codigo": e.codigo_rastreio,
-                    "endereco": e.endereco_destino,
-                    "status": e.status
-                } for e in entregas
+
+        serializer = OtimizarRotaRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+        origem = None
+        if "origem_latitude" in dados:
+            origem = (dados["origem_latitude"], dados["origem_longitude"])
+
+        with transaction.atomic():
+            entregas = list(
+                Entrega.objects.select_for_update()
+                .filter(rota=rota)
+                .only(
+                    "id",
+                    "codigo_rastreio",
+                    "status",
+                    "latitude",
+                    "longitude",
+                    "sequencia",
+                    "cliente_id",
+                    "motorista_id",
+                    "rota_id",
+                )
+                .order_by("id")
+            )
+            ativas = [e for e in entregas if e.status not in ("entregue", "cancelada")]
+            com_coordenadas = [
+                e for e in ativas if e.latitude is not None and e.longitude is not None
             ]
-        }
-        return Response(data)
+            sem_coordenadas = [
+                e for e in ativas if e.latitude is None or e.longitude is None
+            ]
+
+            ordem, distancia = otimizar_sequencia(
+                [e.latitude for e in com_coordenadas],
+                [e.longitude for e in com_coordenadas],
+                origem=origem,
+            )
+            sequencia = [com_coordenadas[i] for i in ordem] + sem_coordenadas
+
+            agora = timezone.now()
+            estados = [estado(entrega, ["sequencia"]) for entrega in entregas]
+            for entrega in entregas:
+                entrega.sequencia = None
+                # Nova versão: invalida o ETag do rastreamento e chega ao stream de eventos.
+                entrega.atualizado_em = agora
+            for posicao, entrega in enumerate(sequencia, start=1):
+                entrega.sequencia = posicao
+
+            Entrega.objects.bulk_update(
+                entregas, ["sequencia", "atualizado_em"], batch_size=500
+            )
+            registrar_eventos(
+                evento_alteracao(entrega, antes, request.user)
+                for entrega, antes in zip(entregas, estados)
+            )
+            transaction.on_commit(lambda: invalidar_dashboard_rota(rota.id))
+
+        return Response(
+            {
+                "rota": rota.id,
+                "paradas": len(com_coordenadas),
+                "distancia_km": round(distancia, 3),
+                "sequencia": [e.codigo_rastreio for e in sequencia],
+                "sem_coordenadas": [e.codigo_rastreio for e in sem_coordenadas],
+            },
+            status=status.HTTP_200_OK,
+        )
 
     @extend_schema(
         summary="Atribuir Entregas à Rota (com validação de capacidade)",
@@ -261,105 +498,375 @@ class RotaViewSet(viewsets.ModelViewSet):
 
         serializer = AtribuirEntregasRotaRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        codigos = serializer.validated_data["entregas"]
+        codigos = list(dict.fromkeys(serializer.validated_data["entregas"]))
 
         capacidade_maxima = rota.veiculo.capacidade_maxima
-        capacidade_atual = (
-            Entrega.objects.filter(rota=rota)
-            .aggregate(total=Sum("capacidade_necessaria"))
-            .get("total")
-            or Decimal("0")
-        )
 
         with transaction.atomic():
+            entregas = {
+                entrega.codigo_rastreio: entrega
+                for entrega in Entrega.objects.select_for_update().filter(
+                    codigo_rastreio__in=codigos
+                )
+            }
+
+            erros = []
             for codigo in codigos:
-                entrega = get_object_or_404(Entrega, codigo_rastreio=codigo)
-
-                if entrega.rota_id and entrega.rota_id != rota.id:
-                    raise ValidationError(
-                        {
-                            "entregas": (
-                                f"A entrega {codigo} já está atribuída a outra rota (id={entrega.rota_id})."
-                            )
-                        }
+                entrega = entregas.get(codigo)
+                if entrega is None:
+                    erros.append(f"A entrega {codigo} não foi encontrada.")
+                elif entrega.rota_id and entrega.rota_id != rota.id:
+                    erros.append(
+                        f"A entrega {codigo} já está atribuída a outra rota (id={entrega.rota_id})."
                     )
 
-                nova_capacidade = capacidade_atual + entrega.capacidade_necessaria
-                if nova_capacidade > capacidade_maxima:
-                    raise ValidationError(
-                        {
-                            "entregas": (
-                                "Capacidade do veículo excedida ao atribuir entregas à rota. "
-                                f"Capacidade máxima: {capacidade_maxima}. "
-                                f"Capacidade atual: {capacidade_atual}. "
-                                f"Tentando adicionar entrega {codigo} (capacidade {entrega.capacidade_necessaria})."
-                            )
-                        }
-                    )
+            if erros:
+                raise ValidationError({"entregas": erros})
+
+            capacidade_adicional = sum(
+                (
+                    entrega.capacidade_necessaria
+                    for entrega in entregas.values()
+                    if entrega.rota_id != rota.id and entrega.status != "cancelada"
+                ),
+                Decimal("0"),
+            )
 
+            if not Rota.reservar_capacidade(rota.id, capacidade_adicional):
+                capacidade_atual = Rota.objects.values_list(
+                    "capacidade_utilizada", flat=True
+                ).get(pk=rota.id)
+                raise ValidationError(
+                    {
+                        "entregas": (
+                            "Capacidade do veículo excedida ao atribuir entregas à rota. "
+                            f"Capacidade máxima: {capacidade_maxima}. "
+                            f"Capacidade atual: {capacidade_atual}. "
+                            f"Tentando adicionar {capacidade_adicional}."
+                        )
+                    }
+                )
+
+            agora = timezone.now()
+            estados = {
+                codigo: estado(entrega, ["rota", "motorista", "sequencia"])
+                for codigo, entrega in entregas.items()
+            }
+            estados_indicadores = [
+                indicadores.estado_original_entrega(entrega)
+                for entrega in entregas.values()
+            ]
+            for entrega in entregas.values():
+                if entrega.rota_id != rota.id:
+                    # Entra no fim da rota até a próxima otimização.
+                    entrega.sequencia = None
                 entrega.rota = rota
                 entrega.motorista = rota.motorista
-                entrega.save(update_fields=["rota", "motorista"])
-                capacidade_atual = nova_capacidade
+                entrega.atualizado_em = agora
+
+            Entrega.objects.bulk_update(
+                entregas.values(),
+                ["rota", "motorista", "sequencia", "atualizado_em"],
+                batch_size=500,
+            )
+            registrar_eventos(
+                evento_alteracao(entrega, estados[codigo], request.user)
+                for codigo, entrega in entregas.items()
+            )
+            indicadores.atualizar_entregas(
+                list(
+                    zip(
+                        estados_indicadores,
+                        map(indicadores.estado_entrega, entregas.values()),
+                    )
+                )
+            )
+            transaction.on_commit(lambda: invalidar_dashboard_rota(rota.id))
+
+        rota.refresh_from_db(fields=["capacidade_utilizada"])
 
         return Response(
             {
                 "mensagem": (
                     f"{len(codigos)} entrega(s) atribuída(s) à rota {rota.id} com sucesso. "
-                    f"Capacidade utilizada: {capacidade_atual}/{capacidade_maxima}."
+                    f"Capacidade utilizada: {rota.capacidade_utilizada}/{capacidade_maxima}."
                 )
             },
             status=status.HTTP_200_OK,
         )
 
 
-class EntregaViewSet(viewsets.ModelViewSet):
+class EntregaViewSet(PerfilMixin, ListagemRapidaMixin, viewsets.ModelViewSet):
     """
     Gerenciamento de Entregas.
     - URL Principal: /api/entregas/{codigo_rastreio}/
     - Rastreamento: /api/entregas/{codigo_rastreio}/rastreamento/
     - Clientes: Veem apenas status e previsão (via Serializer Personalizado).
     """
+
     queryset = Entrega.objects.all()
     serializer_class = EntregaSerializer
     permission_classes = [IsGestor | IsMotorista | IsCliente]
-    
-    lookup_field = 'codigo_rastreio'
+    pagination_class = EntregaCursorPaginacao
+    filter_backends = [
+        DjangoFilterBackend,
+        SearchFilter,
+        OrderingFilter,
+        SelecaoCamposFilter,
+    ]
+    filterset_class = EntregaFilter
+    search_fields = ["codigo_rastreio", "endereco_destino"]
+    ordering_fields = ["id", "data_solicitacao", "codigo_rastreio"]
+
+    lookup_field = "codigo_rastreio"
 
     def get_serializer_class(self):
         """
         Define qual serializer usar baseado no perfil do usuário.
         """
 
-        if hasattr(self.request.user, "cliente") and not self.request.user.is_staff:
-            return EntregaClienteSerializer
+        perfil = self.request.perfil
+
+        if perfil.is_cliente and not perfil.is_gestor:
+            return serializer_leitura_entrega(perfil)
 
-        if hasattr(self.request.user, "motorista") and not self.request.user.is_staff:
+        if perfil.is_motorista and not perfil.is_gestor:
             if self.action in ["update", "partial_update"]:
                 return EntregaMotoristaUpdateSerializer
             if self.action in ["marcar_entregue"]:
                 return EntregaSerializer
-        
+
         return EntregaSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_staff:
-            return Entrega.objects.all()
-        if hasattr(user, "motorista"):
-            return Entrega.objects.filter(motorista=user.motorista)
-        if hasattr(user, "cliente"):
-            return Entrega.objects.filter(cliente=user.cliente)
-        return Entrega.objects.none()
+        return entregas_visiveis(self.request.perfil)
 
     def perform_create(self, serializer):
         if not serializer.validated_data.get("endereco_origem"):
-            raise ValidationError({"endereco_origem": "O endereço de origem é obrigatório."})
+            raise ValidationError(
+                {"endereco_origem": "O endereço de origem é obrigatório."}
+            )
         if not serializer.validated_data.get("endereco_destino"):
-            raise ValidationError({"endereco_destino": "O endereço de destino é obrigatório."})
+            raise ValidationError(
+                {"endereco_destino": "O endereço de destino é obrigatório."}
+            )
         if not serializer.validated_data.get("cliente"):
             raise ValidationError({"cliente": "O cliente é obrigatório."})
-        serializer.save()
+        with transaction.atomic():
+            entrega = serializer.save()
+            registrar_eventos([evento_criacao(entrega, self.request.user)])
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            antes = estado(serializer.instance)
+            entrega = serializer.save()
+            registrar_eventos([evento_alteracao(entrega, antes, self.request.user)])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            registrar_eventos([evento_remocao(instance, self.request.user)])
+            instance.delete()
+
+    @extend_schema(
+        summary="Criar Entregas em Lote (Gestor)",
+        description=(
+            "Recebe uma lista JSON ou um corpo NDJSON (application/x-ndjson) com várias "
+            "entregas, valida tudo de uma vez (incluindo a capacidade acumulada por rota) "
+            "e insere com bulk_create. Retorna o resultado de cada linha."
+        ),
+        parameters=[CriarEntregasLoteParamsSerializer],
+        request=EntregaSerializer(many=True),
+        responses={
+            201: CriarEntregasLoteResponseSerializer,
+            400: CriarEntregasLoteResponseSerializer,
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsGestor],
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def lote(self, request):
+        params = CriarEntregasLoteParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        modo = params.validated_data["modo"]
+
+        itens = request.data
+        if not isinstance(itens, list) or not itens:
+            raise ValidationError("Envie uma lista não vazia de entregas.")
+        if len(itens) > MAX_ITENS:
+            raise ValidationError(f"O lote aceita no máximo {MAX_ITENS} entregas.")
+
+        criadas, resultados = criar_entregas_em_lote(
+            itens, ignorar_invalidas=(modo == "ignorar_invalidas"), usuario=request.user
+        )
+        com_erro = sum(1 for resultado in resultados if resultado["situacao"] == "erro")
+
+        return Response(
+            {
+                "modo": modo,
+                "total": len(itens),
+                "criadas": criadas,
+                "com_erro": com_erro,
+                "resultados": resultados,
+            },
+            status=status.HTTP_201_CREATED if criadas else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @extend_schema(
+        summary="Buscar Entregas",
+        description=(
+            "Busca textual por código de rastreio, endereços e nome do cliente, com os "
+            "resultados ordenados por relevância (índice FTS5 no SQLite). Considera apenas "
+            "as entregas visíveis ao usuário."
+        ),
+        parameters=[BuscarEntregasParamsSerializer],
+        responses={200: EntregaSerializer(many=True)},
+        filters=False,
+    )
+    @action(detail=False, methods=["get"], pagination_class=BuscaPaginacao)
+    def buscar(self, request):
+        params = BuscarEntregasParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        ids = buscar_ids(self.get_queryset(), params.validated_data["q"])
+        pagina = self.paginate_queryset(ids)
+        entregas = Entrega.objects.in_bulk(pagina)
+
+        serializer = self.get_serializer(
+            [entregas[id] for id in pagina if id in entregas], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        summary="Entregas Próximas de um Ponto",
+        description=(
+            "Entregas visíveis ao usuário (por padrão as pendentes) com destino a até "
+            "`raio_km` do ponto, da mais próxima para a mais distante. Ex.: as entregas "
+            "pendentes num raio de 5 km de um caminhão. Entregas sem coordenadas não "
+            "entram na busca."
+        ),
+        parameters=[EntregasProximasParamsSerializer],
+        responses={200: EntregaProximaSerializer(many=True)},
+        filters=False,
+    )
+    @action(detail=False, methods=["get"], permission_classes=[IsGestor | IsMotorista])
+    def proximas(self, request):
+        params = EntregasProximasParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        entregas = listar_proximos(
+            self.get_queryset().filter(status=params.validated_data["status"]),
+            params.validated_data,
+        )
+        return Response(EntregaProximaSerializer(entregas, many=True).data)
+
+    @extend_schema(
+        summary="Feed de Alterações de Entregas",
+        description=(
+            "Eventos (criação, status, atribuição, edição, remoção) das entregas visíveis "
+            "ao usuário com id maior que `since`, em ordem. Os apps guardam o `cursor` "
+            "devolvido e sincronizam só o que mudou, em vez de baixar a listagem inteira."
+        ),
+        parameters=[AlteracoesEntregasParamsSerializer],
+        responses={200: AlteracoesEntregasResponseSerializer},
+        filters=False,
+    )
+    @action(detail=False, methods=["get"])
+    def alteracoes(self, request):
+        params = AlteracoesEntregasParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        since = params.validated_data.get("since")
+        limite = params.validated_data["limite"]
+
+        if since is None:
+            # Ponto de partida: qualquer evento posterior à carga da listagem tem id maior.
+            cursor = EntregaEvento.objects.order_by("-id").values_list("id", flat=True)
+            return Response(
+                {"eventos": [], "cursor": cursor.first() or 0, "mais": False}
+            )
+
+        eventos = heapq.merge(
+            *(
+                fonte.filter(id__gt=since).order_by("id")[: limite + 1]
+                for fonte in fontes_eventos(request.perfil)
+            ),
+            key=lambda evento: evento.id,
+        )
+        eventos = list(islice(eventos, limite + 1))
+        mais = len(eventos) > limite
+        eventos = eventos[:limite]
+
+        perfil = request.perfil
+        if perfil.is_cliente and not perfil.is_gestor:
+            serializer_class = EntregaEventoClienteSerializer
+        else:
+            serializer_class = EntregaEventoSerializer
+
+        return Response(
+            {
+                "eventos": serializer_class(eventos, many=True).data,
+                "cursor": eventos[-1].id if eventos else since,
+                "mais": mais,
+            }
+        )
+
+    @extend_schema(
+        summary="Exportar Entregas (CSV/NDJSON)",
+        description=(
+            "Exporta em streaming as entregas visíveis ao usuário, com filtros opcionais "
+            "de período (data_solicitacao) e status. O uso de memória não depende do "
+            "número de linhas."
+        ),
+        parameters=[ExportarEntregasParamsSerializer],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(detail=False, methods=["get"])
+    def exportar(self, request):
+        params = ExportarEntregasParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filtros = params.validated_data
+
+        queryset = self.get_queryset()
+        if filtros.get("data_inicio"):
+            inicio = datetime.combine(filtros["data_inicio"], time.min)
+            queryset = queryset.filter(
+                data_solicitacao__gte=timezone.make_aware(inicio)
+            )
+        if filtros.get("data_fim"):
+            fim = datetime.combine(filtros["data_fim"] + timedelta(days=1), time.min)
+            queryset = queryset.filter(data_solicitacao__lt=timezone.make_aware(fim))
+        if filtros.get("status"):
+            queryset = queryset.filter(status__in=filtros["status"])
+
+        # Valores convertidos como no serializer do perfil, sem instanciar models, e
+        # colunas na mesma ordem da resposta JSON.
+        serializer = self.get_serializer()
+        colunas = set(self.colunas_exportacao())
+        leitura = LeituraRapida.do_serializer(
+            serializer, [campo for campo in serializer.fields if campo in colunas]
+        )
+        linhas = (
+            queryset.order_by("data_solicitacao", "id")
+            .values_list(*leitura.colunas)
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+
+        formato = filtros["formato"]
+        content_type, gerar = FORMATOS[formato]
+        response = StreamingHttpResponse(
+            gerar(leitura, linhas), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="entregas.{formato}"'
+        return response
+
+    def colunas_exportacao(self):
+        """Mesmas colunas do serializer do perfil (ex.: cliente vê só os campos restritos)."""
+        campos = self.get_serializer_class().Meta.fields
+        if campos == "__all__":
+            return [field.name for field in Entrega._meta.concrete_fields]
+        return list(campos)
 
     @extend_schema(
         summary="Atribuir Motorista (Gestor)",
@@ -367,11 +874,7 @@ class EntregaViewSet(viewsets.ModelViewSet):
         request=AtribuirMotoristaRequestSerializer,
         responses={200: EntregaSerializer},
     )
-    @action(
-        detail=True, 
-        methods=["patch"], 
-        permission_classes=[IsGestor]
-    )
+    @action(detail=True, methods=["patch"], permission_classes=[IsGestor])
     def atribuir_motorista(self, request, codigo_rastreio=None):
         entrega = self.get_object()
         motorista_id = request.data.get("motorista_id")
@@ -380,8 +883,11 @@ class EntregaViewSet(viewsets.ModelViewSet):
             return Response({"erro": "ID do motorista obrigatório."}, status=400)
 
         motorista = get_object_or_404(Motorista, pk=motorista_id)
-        entrega.motorista = motorista
-        entrega.save()
+        with transaction.atomic():
+            antes = estado(entrega)
+            entrega.motorista = motorista
+            entrega.save()
+            registrar_eventos([evento_alteracao(entrega, antes, request.user)])
 
         return Response(self.get_serializer(entrega).data)
 
@@ -391,34 +897,78 @@ class EntregaViewSet(viewsets.ModelViewSet):
         request=None,
         responses={200: EntregaSerializer},
     )
-    @action(
-        detail=True, 
-        methods=["patch"], 
-        permission_classes=[IsGestor | IsMotorista]
-    )
+    @action(detail=True, methods=["patch"], permission_classes=[IsGestor | IsMotorista])
     def marcar_entregue(self, request, codigo_rastreio=None):
         entrega = self.get_object()
 
-        if not request.user.is_staff:
-            if entrega.motorista != request.user.motorista:
-                return Response({"erro": "Você não é o motorista responsável por esta entrega."}, status=403)
+        if not request.perfil.is_gestor:
+            if entrega.motorista_id != request.perfil.motorista.id:
+                return Response(
+                    {"erro": "Você não é o motorista responsável por esta entrega."},
+                    status=403,
+                )
 
         if entrega.status == "entregue":
             return Response({"erro": "Entrega já finalizada."}, status=400)
 
-        entrega.status = "entregue"
-        entrega.data_entrega_real = timezone.now()
-        entrega.save()
+        with transaction.atomic():
+            antes = estado(entrega)
+            entrega.status = "entregue"
+            entrega.data_entrega_real = timezone.now()
+            entrega.save()
+            registrar_eventos([evento_alteracao(entrega, antes, request.user)])
 
         return Response(self.get_serializer(entrega).data)
 
+
+class IndicadoresViewSet(PerfilMixin, viewsets.GenericViewSet):
+    """
+    Indicadores de gestão (Gestor): volumes, frete, pontualidade e fator de carga por
+    dia, no geral ou por motorista, cliente ou veículo. Lê apenas as tabelas de
+    indicadores (IndicadorDiario), mantidas incrementalmente.
+    """
+
+    permission_classes = [IsGestor]
+    pagination_class = IndicadoresPaginacao
+
     @extend_schema(
-        summary="Rastreamento da Entrega",
-        description="Retorna informações de rastreamento.",
-        responses={200: EntregaSerializer},
+        summary="Indicadores (Gestor)",
+        description=(
+            "Entregas solicitadas e canceladas e frete (pelo dia da solicitação), "
+            "entregues e taxa de pontualidade (pelo dia da entrega) e fator de carga das "
+            "rotas (pelo dia da rota). Com `agrupar=periodo`, soma o intervalo por "
+            "referência."
+        ),
+        parameters=[IndicadoresParamsSerializer],
+        responses={200: IndicadorSerializer(many=True)},
     )
-    @action(detail=True, methods=["get"])
-    def rastreamento(self, request, codigo_rastreio=None):
-        entrega = self.get_object()
-        serializer = self.get_serializer(entrega)
-        return Response(serializer.data)
\ No newline at end of file
+    def list(self, request):
+        params = IndicadoresParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filtros = params.validated_data
+        dimensao = filtros["dimensao"]
+
+        queryset = IndicadorDiario.objects.filter(
+            dimensao=dimensao,
+            dia__range=(filtros["data_inicio"], filtros["data_fim"]),
+        )
+        if "referencia" in filtros:
+            queryset = queryset.filter(referencia=filtros["referencia"])
+
+        if filtros["agrupar"] == "dia":
+            linhas = queryset.order_by("dia", "referencia").values(
+                "dia", "referencia", *indicadores.METRICAS
+            )
+        else:
+            linhas = (
+                queryset.values("referencia")
+                .annotate(**{metrica: Sum(metrica) for metrica in indicadores.METRICAS})
+                .order_by("referencia")
+            )
+
+        pagina = self.paginate_queryset(linhas)
+        serializer = IndicadorSerializer(
+            [indicadores.montar_indicador(linha, dimensao) for linha in pagina],
+            many=True,
+        )
+        return self.get_paginated_response(serializer.data)
@@ -0,0 +1,330 @@
+"""
+Views assíncronas (ORM async do Django) para as rotas muito consultadas por polling e
+para o stream de eventos da rota. Sob ASGI, uma conexão parada não ocupa um worker.
+
+Não são views DRF, então fazem a própria autenticação (as mesmas classes configuradas
+em REST_FRAMEWORK) e devolvem erros no formato {"detail": ...} usado pela API.
+"""
+
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, F, Max, Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import TokenCacheAuthentication
+from .cache import (
+    REPLICA_JANELA_CONSISTENCIA,
+    aobter_dashboard_rota,
+    aobter_rastreamento,
+    asalvar_dashboard_rota,
+    asalvar_rastreamento,
+)
+from .eventos import INTERVALO_SINCRONIZACAO, canal_rotas, evento_entrega, formatar_sse
+from .models import Entrega, EntregaEvento
+from .perfil import Perfil
+from .roteamento import lendo_da_replica, somente_primario
+from .serializers import EntregaClienteSerializer
+from .views import entregas_visiveis, rotas_visiveis, serializer_leitura_entrega
+
+RECONEXAO_MS = 5000
+
+
+def resposta_json(data, status=200):
+    """Mesmo corpo que o JSONRenderer do DRF produziria."""
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def api_async(view):
+    """Converte as exceções da API (e Http404) nas mesmas respostas das views DRF."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except Http404:
+            return resposta_json(
+                {"detail": str(exceptions.NotFound.default_detail)}, 404
+            )
+        except exceptions.ValidationError as exc:
+            return resposta_json(exc.detail, exc.status_code)
+        except exceptions.APIException as exc:
+            response = resposta_json({"detail": exc.detail}, exc.status_code)
+            if isinstance(
+                exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+            ):
+                response["WWW-Authenticate"] = (
+                    TokenCacheAuthentication().authenticate_header(request)
+                )
+            return response
+
+    return wrapper
+
+
+async def autenticar(request):
+    """Token (com o cache de TokenCacheAuthentication) ou sessão; devolve o Perfil."""
+    resultado = await sync_to_async(TokenCacheAuthentication().authenticate)(request)
+    user = resultado[0] if resultado else await request.auser()
+
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    return await sync_to_async(Perfil)(user)
+
+
+async def rota_do_perfil(perfil, pk):
+    """Mesma regra de RotaViewSet: gestor ou o motorista da rota."""
+    if not (perfil.is_gestor or perfil.is_motorista):
+        raise exceptions.PermissionDenied()
+
+    rota = await rotas_visiveis(perfil).filter(pk=pk).afirst()
+    if rota is None:
+        raise Http404
+    return rota
+
+
+@require_safe
+@api_async
+async def rastreamento(request, codigo_rastreio):
+    perfil = await autenticar(request)
+    queryset = entregas_visiveis(perfil).filter(codigo_rastreio=codigo_rastreio)
+
+    atualizado_em = await queryset.values_list("atualizado_em", flat=True).afirst()
+    if atualizado_em is None:
+        raise Http404
+
+    serializer_class = serializer_leitura_entrega(perfil)
+    # O serializer valida ?fields=/?omit= (CamposSelecionaveisMixin) e diz quais campos
+    # sobram; o cache guarda a representação completa e o recorte é feito na saída.
+    campos = list(serializer_class(context={"request": Request(request)}).fields)
+    versao = int(atualizado_em.timestamp() * 1_000_000)
+    audiencia = (
+        "cliente" if serializer_class is EntregaClienteSerializer else "completa"
+    )
+    etag = f'"{versao}-{audiencia}"'
+    last_modified = int(atualizado_em.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        data = await aobter_rastreamento(codigo_rastreio, audiencia, versao)
+        if data is None:
+            entrega = await queryset.aget()
+            data = serializer_class(entrega).data
+            await asalvar_rastreamento(codigo_rastreio, audiencia, versao, data)
+        response = resposta_json(
+            {campo: data[campo] for campo in campos if campo in data}
+        )
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def montar_dashboard(rota, progresso, entregas):
+    total_entregas = progresso["total"]
+    entregas_concluidas = progresso["concluidas"]
+
+    return {
+        "rota": {
+            "id": rota.id,
+            "nome": rota.nome,
+            "status": rota.status,
+            "data": rota.data_rota,
+        },
+        "motorista": {
+            "nome": rota.motorista.nome,
+            "telefone": rota.motorista.telefone,
+        },
+        "veiculo": {
+            "modelo": rota.veiculo.modelo,
+            "placa": rota.veiculo.placa,
+            "capacidade_maxima": rota.veiculo.capacidade_maxima,
+        },
+        "progresso": {
+            "total_entregas": total_entregas,
+            "concluidas": entregas_concluidas,
+            "pendentes": total_entregas - entregas_concluidas,
+        },
+        "entregas": [
+            {
+                "codigo": e["codigo_rastreio"],
+                "endereco": e["endereco_destino"],
+                "status": e["status"],
+                "sequencia": e["sequencia"],
+            }
+            for e in entregas
+        ],
+    }
+
+
+@require_safe
+@api_async
+async def dashboard(request, pk):
+    perfil = await autenticar(request)
+    rota = await rota_do_perfil(perfil, pk)
+
+    data = await aobter_dashboard_rota(rota.id)
+    if data is None:
+        entregas_da_rota = Entrega.objects.filter(rota_id=rota.id)
+        progresso = await entregas_da_rota.aaggregate(
+            total=Count("id"),
+            concluidas=Count("id", filter=Q(status="entregue")),
+        )
+        # Na ordem de parada definida por /otimizar/; as ainda sem sequência vão ao final.
+        entregas = [
+            entrega
+            async for entrega in entregas_da_rota.order_by(
+                F("sequencia").asc(nulls_last=True), "id"
+            ).values("codigo_rastreio", "endereco_destino", "status", "sequencia")
+        ]
+        data = montar_dashboard(rota, progresso, entregas)
+        # O cache só é invalidado na escrita: montado com a réplica (que pode estar
+        # atrasada em relação a essa escrita), vale só pela janela de consistência.
+        await asalvar_dashboard_rota(
+            rota.id, data, REPLICA_JANELA_CONSISTENCIA if lendo_da_replica() else None
+        )
+
+    return resposta_json(data)
+
+
+# Lido no primário: o canal em memória entrega o estado mais recente das entregas, e a
+# sincronização numa réplica atrasada reenviaria um estado anterior a ele.
+@somente_primario
+@require_safe
+@api_async
+async def eventos_rota(request, pk):
+    """
+    Stream SSE (text/event-stream) com as alterações das entregas da rota.
+
+    Os eventos deste processo chegam na hora pelo canal em memória; a cada
+    INTERVALO_SINCRONIZACAO segundos o stream também lê os EntregaEvento da rota (ou
+    que saíram dela) gravados depois do último id enviado, com o estado atual dessas
+    entregas (outros processos, gravações em massa), e envia um ping. O id é o cursor:
+    reconexões com Last-Event-ID recebem o que mudou no intervalo.
+    """
+    perfil = await autenticar(request)
+    rota = await rota_do_perfil(perfil, pk)
+
+    if not isinstance(request, ASGIRequest):
+        return resposta_json(
+            {
+                "detail": "O stream de eventos só está disponível com o servidor "
+                "ASGI (config.asgi)."
+            },
+            status=501,
+        )
+
+    ultimo = (await EntregaEvento.objects.aaggregate(ultimo=Max("id")))["ultimo"] or 0
+    ultimo_id = request.headers.get("Last-Event-ID", "")
+    # Um id maior que o último evento (ex.: de uma versão anterior do stream) não é
+    # um cursor válido: começa do presente.
+    retomando = ultimo_id.isdigit() and int(ultimo_id) <= ultimo
+    cursor = int(ultimo_id) if retomando else ultimo
+
+    response = StreamingHttpResponse(
+        stream_eventos(rota.id, cursor, retomando), content_type="text/event-stream"
+    )
+    patch_cache_control(response, no_cache=True)
+    # Impede que proxies (nginx) segurem o stream em buffer.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def stream_eventos(rota_id, cursor, retomando):
+    assinatura = canal_rotas.assinar(rota_id)
+    _, fila = assinatura
+    # Último estado enviado de cada entrega: a sincronização não repete o que o canal
+    # em memória já entregou.
+    enviados = {}
+
+    def mensagem(evento, identificador=None):
+        enviados[evento["codigo"]] = evento
+        return formatar_sse(evento, identificador=identificador)
+
+    async def sincronizar():
+        nonlocal cursor
+        alteradas = {}
+        novos = (
+            EntregaEvento.objects.filter(
+                Q(rota_id=rota_id) | Q(rota_anterior_id=rota_id), id__gt=cursor
+            )
+            .order_by("id")
+            .values_list("id", "entrega_id", "codigo_rastreio", "criado_em")
+        )
+        async for evento_id, entrega_id, codigo, criado_em in novos:
+            # Cada entrega sai uma vez, na posição da sua última alteração.
+            alteradas.pop(entrega_id, None)
+            alteradas[entrega_id] = (codigo, criado_em)
+            cursor = evento_id
+        if not alteradas:
+            return []
+
+        atuais = {
+            entrega["id"]: entrega
+            async for entrega in Entrega.objects.filter(pk__in=alteradas).values(
+                "id",
+                "codigo_rastreio",
+                "status",
+                "rota_id",
+                "sequencia",
+                "atualizado_em",
+            )
+        }
+        eventos = [
+            evento_entrega(atuais[entrega_id])
+            if entrega_id in atuais
+            # Removida: sem status nem rota.
+            else evento_entrega(
+                {
+                    "codigo_rastreio": codigo,
+                    "status": None,
+                    "rota_id": None,
+                    "sequencia": None,
+                    "atualizado_em": criado_em,
+                }
+            )
+            for entrega_id, (codigo, criado_em) in alteradas.items()
+        ]
+        eventos = [
+            evento for evento in eventos if enviados.get(evento["codigo"]) != evento
+        ]
+        if not eventos:
+            # Só avança o Last-Event-ID do navegador.
+            return [f"id: {cursor}\n\n"]
+        return [mensagem(evento) for evento in eventos[:-1]] + [
+            mensagem(eventos[-1], cursor)
+        ]
+
+    try:
+        yield f"retry: {RECONEXAO_MS}\n\n"
+        if retomando:
+            for linha in await sincronizar():
+                yield linha
+
+        while True:
+            try:
+                evento = await asyncio.wait_for(fila.get(), INTERVALO_SINCRONIZACAO)
+            except TimeoutError:
+                for linha in await sincronizar():
+                    yield linha
+                yield ": ping\n\n"
+                continue
+
+            yield mensagem(evento)
+    finally:
+        canal_rotas.cancelar(rota_id, assinatura)